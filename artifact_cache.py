@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Cache of prebuilt micro-ROS libraries, shared between component variants,
+projects and machines.
+
+Building libmicroros.a inside a variant takes minutes. Once a variant has
+been built, its library, include tree and generated toolchain file are
+stored under a key made from everything that determines them: the variant's
+colcon.meta, the base commit, the IDF target and the toolchain (compiler and
+ESP-IDF version). A new variant with the same key gets them copied into
+place, together with the libmicroros.mk build stamps, so the ESP-IDF build
+finds the library up to date instead of rebuilding it.
+
+Entries live in stores, looked up in order:
+
+    LocalStore   a directory on this machine (default ~/.cache/uros_artifacts),
+                 guarded by a file lock
+    SharedStore  a directory on a shared filesystem (NFS, SMB); it relies
+                 only on atomic renames, because advisory locks are not
+                 reliable there
+
+An entry found only in the shared store is copied into the local one. Both
+evict their least recently used entries once they exceed their size bound.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import datetime
+import platform
+import subprocess
+from contextlib import nullcontext
+from functools import lru_cache
+
+from locking import file_lock
+from variant_store import link_file, materialize_variant
+
+# What a build leaves in the component directory and the cache restores
+ARTIFACT_FILES = ('libmicroros.a', 'include', 'esp32_toolchain.cmake')
+
+# Targets of libmicroros.mk, prerequisites first. Restored entries recreate
+# them with increasing mtimes so make considers libmicroros.a up to date.
+BUILD_STAMPS = ('esp32_toolchain.cmake', 'micro_ros_dev/install', 'micro_ros_src/src',
+                'micro_ros_src/install', 'libmicroros.a')
+
+ENTRY_FILES    = 'files'
+ENTRY_METADATA = 'artifact.json'
+
+DEFAULT_LOCAL_DIR = os.path.join('~', '.cache', 'uros_artifacts')
+DEFAULT_MAX_MB    = {'local': 4096, 'shared': 32768}
+
+RISCV_TARGETS = ('esp32c2', 'esp32c3', 'esp32c5', 'esp32c6', 'esp32c61', 'esp32h2', 'esp32p4')
+
+
+def toolchain_compiler(idf_target):
+    if idf_target in RISCV_TARGETS:
+        return 'riscv32-esp-elf-gcc'
+    return f'xtensa-{idf_target}-elf-gcc'
+
+
+def idf_version():
+    """The ESP-IDF version of the environment, or None outside of one."""
+    if os.environ.get('ESP_IDF_VERSION'):
+        return os.environ['ESP_IDF_VERSION']
+    version_cmake = os.path.join(os.environ.get('IDF_PATH', ''), 'tools', 'cmake', 'version.cmake')
+    try:
+        with open(version_cmake) as f:
+            parts = {line.split()[1]: line.split()[2].rstrip(')') for line in f
+                     if line.startswith('set(IDF_VERSION_')}
+    except (OSError, IndexError):
+        return None
+    return '.'.join(parts.get(f'IDF_VERSION_{p}', '0') for p in ('MAJOR', 'MINOR', 'PATCH'))
+
+
+@lru_cache(maxsize=None)
+def toolchain_version(idf_target):
+    """'<compiler> <version> idf <version>' of the environment, or None if it has no toolchain."""
+    compiler = toolchain_compiler(idf_target)
+    try:
+        version = subprocess.run([compiler, '-dumpfullversion'], capture_output=True,
+                                 text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{compiler} {version} idf {idf_version() or 'unknown'}"
+
+
+def artifact_key(colcon_meta, params, idf_target, toolchain):
+    """Cache key of the library built from `colcon_meta` for the given base, target and toolchain."""
+    blob = json.dumps({
+        'colcon_meta': hashlib.sha256(colcon_meta.encode()).hexdigest(),
+        'distro':      params.get('distro'),
+        'base_commit': params.get('base_commit'),
+        'idf_target':  idf_target,
+        'toolchain':   toolchain,
+    }, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:24]
+
+
+def tree_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f))
+               for d, _, files in os.walk(path) for f in files)
+
+
+def is_built(component_dir):
+    return all(os.path.exists(os.path.join(component_dir, name)) for name in ARTIFACT_FILES)
+
+
+class LocalStore:
+    """Entries in `root/<key>/`, last use tracked by the metadata file's mtime."""
+
+    kind = 'local'
+
+    def __init__(self, root, max_bytes):
+        self.root      = os.path.expanduser(root)
+        self.max_bytes = max_bytes
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def guard(self):
+        return file_lock(os.path.join(self.root, '.lock'))
+
+    def get(self, key):
+        """The files directory of entry `key`, marked as used, or None."""
+        entry = self._entry(key)
+        try:
+            os.utime(os.path.join(entry, ENTRY_METADATA))
+        except OSError:
+            return None
+        return os.path.join(entry, ENTRY_FILES)
+
+    def put(self, key, component_dir, metadata):
+        """Store the artifacts of `component_dir` as entry `key` (a no-op if it exists)."""
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return
+        tmp = os.path.join(self.root, f".tmp-{platform.node()}-{os.getpid()}-{key}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        for name in ARTIFACT_FILES:
+            src, dst = os.path.join(component_dir, name), os.path.join(tmp, ENTRY_FILES, name)
+            if os.path.isdir(src):
+                materialize_variant(src, dst, modes=('reflink', 'copy'))
+            else:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                link_file(src, dst, ['reflink', 'copy'])
+        metadata = dict(metadata, key=key, size=tree_size(os.path.join(tmp, ENTRY_FILES)),
+                        created=datetime.datetime.now(datetime.timezone.utc).isoformat())
+        with open(os.path.join(tmp, ENTRY_METADATA), 'w') as f:
+            json.dump(metadata, f, indent=4)
+        with self.guard():
+            try:
+                if os.path.isdir(entry):
+                    raise FileExistsError(entry)
+                os.rename(tmp, entry)
+            except OSError:
+                # another run stored the same key first
+                shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """(last use, size, key) of every complete entry."""
+        found = []
+        for key in os.listdir(self.root):
+            if key.startswith('.'):
+                continue  # the lock, and puts or removals in progress
+            meta_path = os.path.join(self.root, key, ENTRY_METADATA)
+            try:
+                with open(meta_path) as f:
+                    size = json.load(f)['size']
+                found.append((os.stat(meta_path).st_mtime, size, key))
+            except (OSError, ValueError, KeyError):
+                continue
+        return found
+
+    def _remove(self, key):
+        shutil.rmtree(self._entry(key), ignore_errors=True)
+
+    def evict(self):
+        """Remove least recently used entries until the store fits max_bytes."""
+        with self.guard():
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(key)
+                total -= size
+
+
+class SharedStore(LocalStore):
+    """
+    A LocalStore on a shared filesystem. Entries are removed by renaming
+    them away first, so readers on other machines see an entry completely or
+    not at all, and concurrent evictions only race to remove the same entry.
+    """
+
+    kind = 'shared'
+
+    def guard(self):
+        return nullcontext()
+
+    def _remove(self, key):
+        trash = os.path.join(self.root, f".trash-{platform.node()}-{os.getpid()}-{key}")
+        try:
+            os.rename(self._entry(key), trash)
+        except OSError:
+            return  # already evicted elsewhere
+        shutil.rmtree(trash, ignore_errors=True)
+
+
+def artifact_stores(config):
+    """
+    The stores configured by ARTIFACT_CACHE in the config file, local first:
+
+        "ARTIFACT_CACHE": {"local": "~/.cache/uros_artifacts", "local_max_mb": 4096,
+                           "shared": "/mnt/builds/uros_artifacts", "shared_max_mb": 32768}
+
+    "local": null turns the local store off; without "shared" there is none.
+    "ARTIFACT_CACHE": false turns the cache off.
+    """
+    settings = config.get('ARTIFACT_CACHE', {})
+    if settings is False:
+        return []
+    stores = []
+    for kind, cls in (('local', LocalStore), ('shared', SharedStore)):
+        root = settings.get(kind, DEFAULT_LOCAL_DIR if kind == 'local' else None)
+        if root:
+            max_bytes = int(settings.get(f'{kind}_max_mb', DEFAULT_MAX_MB[kind])) << 20
+            store = cls(root, max_bytes)
+            os.makedirs(store.root, exist_ok=True)
+            stores.append(store)
+    return stores
+
+
+def restore_artifacts(files_dir, component_dir):
+    """
+    Copy a cached entry into `component_dir`, replacing any artifacts already
+    there, and stamp it as built.
+    """
+    tmp = os.path.join(component_dir, f".artifacts.tmp{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    try:
+        materialize_variant(files_dir, os.path.join(tmp, 'new'), modes=('reflink', 'copy'))
+        os.makedirs(os.path.join(tmp, 'old'))
+        for name in ARTIFACT_FILES:
+            target = os.path.join(component_dir, name)
+            if os.path.lexists(target):
+                # a directory can't be renamed onto; stale files go with tmp
+                os.rename(target, os.path.join(tmp, 'old', name))
+            os.rename(os.path.join(tmp, 'new', name), target)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    now = time.time_ns()
+    for i, stamp in enumerate(BUILD_STAMPS):
+        path = os.path.join(component_dir, stamp)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        os.utime(path, ns=(now + i * 1000000, now + i * 1000000))
+
+
+def sync_artifacts(stores, key, component_dir, metadata):
+    """
+    Make `component_dir` and the stores agree on entry `key`: a built
+    component is stored where the entry is missing; an unbuilt one gets the
+    entry restored. Returns 'stored', 'restored' (with the store's kind) or None.
+    """
+    if not stores:
+        return None
+    if is_built(component_dir):
+        stored = None
+        for store in stores:
+            if store.get(key) is None:
+                store.put(key, component_dir, metadata)
+                stored = 'stored'
+        return stored
+    for i, store in enumerate(stores):
+        # the local store's lock keeps evictions out until the copy is done
+        with store.guard():
+            files_dir = store.get(key)
+            if files_dir is None:
+                continue
+            try:
+                restore_artifacts(files_dir, component_dir)
+            except OSError as e:
+                # e.g. evicted elsewhere while copying (shared store)
+                print(f"Warning: restoring {key} from the {store.kind} cache failed: {e}")
+                continue
+        for earlier in stores[:i]:
+            earlier.put(key, component_dir, metadata)
+        return f'restored from {store.kind} cache'
+    return None
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Times generate_interface_graph.collect_interfaces against a synthetic
+install/share tree.
+
+    python3 benchmarks/bench_interface_graph.py --messages 10000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_interface_graph as gig
+
+PRIMITIVES = ["bool", "float32", "float64", "int32", "uint8", "uint32", "string"]
+
+
+def write_synthetic_tree(root, messages, packages, seed=0, services=0):
+    """
+    Write `messages` .msg files spread over `packages` packages under `root`,
+    plus `services` .srv files using them. Returns the message names.
+    """
+    rng = random.Random(seed)
+    per_pkg = max(1, messages // packages)
+    written = []
+    for p in range(packages):
+        pkg = f"synth_pkg_{p}"
+        msg_dir = os.path.join(root, pkg, "msg")
+        os.makedirs(msg_dir, exist_ok=True)
+        for m in range(per_pkg):
+            if len(written) >= messages:
+                break
+            name = f"Type{m}"
+            lines = ["# synthetic message", "int32 CONSTANT=1"]
+            for f in range(rng.randint(3, 8)):
+                lines.append(f"{rng.choice(PRIMITIVES)} field_{f}")
+            if m:
+                # package-local short name
+                lines.append(f"Type{rng.randrange(m)} local_ref")
+            if written:
+                # fully qualified reference into another package
+                other = rng.choice(written)
+                lines.append(f"{other}[] remote_refs")
+            with open(os.path.join(msg_dir, f"{name}.msg"), "w") as f:
+                f.write("\n".join(lines) + "\n")
+            written.append(f"{pkg}/{name}")
+    for s in range(services):
+        pkg = f"synth_pkg_{s % packages}"
+        srv_dir = os.path.join(root, pkg, "srv")
+        os.makedirs(srv_dir, exist_ok=True)
+        request  = [f"{rng.choice(PRIMITIVES)} arg_{f}" for f in range(rng.randint(1, 4))]
+        response = [f"{rng.choice(written)} result", "bool success"]
+        with open(os.path.join(srv_dir, f"Service{s}.srv"), "w") as f:
+            f.write("\n".join(request + ["---"] + response) + "\n")
+    return written
+
+
+def run(messages, packages, repeat, jobs=None):
+    with tempfile.TemporaryDirectory(prefix="uros_ig_bench_") as root:
+        t0 = time.perf_counter()
+        write_synthetic_tree(root, messages, packages)
+        print(f"wrote {messages} .msg files in {time.perf_counter() - t0:.2f}s")
+
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = gig.collect_interfaces([root], jobs)
+            timings.append(time.perf_counter() - t0)
+
+        total = sum(len(v["msg"]) for v in result.values())
+        print(f"collect_interfaces: {total} msgs, "
+              f"best {min(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s over {repeat} run(s)")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark interface graph generation")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--packages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Parser processes passed to collect_interfaces")
+    args = parser.parse_args()
+    run(args.messages, args.packages, args.repeat, args.jobs)
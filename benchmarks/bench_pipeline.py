@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Times every stage of the generator pipeline on synthetic inputs: graph
+generation (collect_interfaces), graph loading (lazy index, binary cache,
+JSON), the type index and its searches, component preparation (materialize_variant, patch_colcon_meta) and
+rendering (generate_init_and_callback_codes, apply_code_blocks_to_c into a
+new project and again into an unchanged one) and the wire budget for a
+spec with hundreds of entities.
+
+    python3 benchmarks/bench_pipeline.py --messages 5000 --entities 400 \
+        --output bench.json --compare baseline.json
+
+--output writes the timings as JSON; --compare exits 1 if any stage's best
+time is more than --threshold times the baseline's.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_interface_graph as gig
+import main as generator
+from project_spec import spec_to_project
+from type_index import TypeIndex
+from variant_store import materialize_variant
+from wire_budget import wire_budget
+from bench_interface_graph import write_synthetic_tree
+
+ENTITY_SHARES = {'publishers': 0.4, 'subscriptions': 0.3, 'services': 0.1,
+                 'clients': 0.1, 'timers': 0.1}
+
+
+def timed(fn, repeat):
+    """Best and mean wall time of `repeat` calls to fn; returns (stats, last result)."""
+    runs, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - t0)
+    return {"best_s": min(runs), "mean_s": sum(runs) / len(runs), "runs": runs}, result
+
+
+def nesting_depths(graph):
+    """Message nesting depth of every "pkg/msg/Name" in the graph (primitives only: 1)."""
+    depths = {}
+
+    def depth(type_name, seen=()):
+        if type_name not in depths:
+            pkg, kind, name = type_name.split("/")
+            block = graph.get(pkg, {}).get(kind, {}).get(name)
+            if block is None or type_name in seen:
+                return 0
+            children = [e["type"] for e in block.values() if e["type"].count("/") == 2]
+            depths[type_name] = 1 + max((depth(c, seen + (type_name,)) for c in children),
+                                        default=0)
+        return depths[type_name]
+
+    for pkg, kinds in graph.items():
+        for name in kinds["msg"]:
+            depth(f"{pkg}/msg/{name}")
+    return depths
+
+
+def synthetic_spec(graph, entities, groups, max_nesting, seed=0):
+    """
+    A timer-scheduled spec with `entities` entities over the graph's types.
+    Only types nested at most `max_nesting` deep are used: every nested
+    sequence multiplies the static buffers emitted for a message, and the
+    random synthetic tree nests far deeper than real interfaces do.
+    """
+    rng    = random.Random(seed)
+    depths = nesting_depths(graph)
+    msgs   = [t for t, d in depths.items() if d <= max_nesting]
+
+    def shallow(srv):
+        pkg, _, name = srv.split("/")
+        fields = [e["type"] for part in graph[pkg]["srv"][name].values() for e in part.values()]
+        return all(depths.get(t, 0) <= max_nesting for t in fields if t.count("/") == 2)
+
+    srvs = [s for s in (f"{pkg}/srv/{name}" for pkg, kinds in graph.items()
+                        for name in kinds["srv"]) if shallow(s)]
+    group_names = [f"group{g}" for g in range(groups)]
+
+    def group():
+        return {"group": rng.choice(group_names)} if group_names and rng.random() < 0.5 else {}
+
+    counts = {key: int(entities * share) for key, share in ENTITY_SHARES.items()}
+    spec = {
+        "project_name":    "bench_node",
+        "mode":            "udp",
+        "scheduling":      "timer",
+        "callback_groups": [{"name": name} for name in group_names],
+        "publishers": [
+            {"name": f"pub{i}", "type": rng.choice(msgs), "rate_hz": rng.choice([1, 10, 50, 100]),
+             "qos": rng.choice(["reliable", "best_effort", {"depth": 5}]), **group()}
+            for i in range(counts["publishers"])],
+        "subscriptions": [
+            {"name": f"sub{i}", "type": rng.choice(msgs), **group()}
+            for i in range(counts["subscriptions"])],
+        "services": [
+            {"name": f"srv{i}", "type": rng.choice(srvs), **group()}
+            for i in range(counts["services"] if srvs else 0)],
+        "clients": [
+            {"name": f"cli{i}", "type": rng.choice(srvs), **group()}
+            for i in range(counts["clients"] if srvs else 0)],
+        "timers": [
+            {"name": f"tmr{i}", "rate_hz": rng.choice([1, 5, 20]), **group()}
+            for i in range(counts["timers"])],
+    }
+    return spec
+
+
+def write_synthetic_component(root, files, seed=0):
+    """A base component of `files` small files and a colcon.meta, like the real one."""
+    rng = random.Random(seed)
+    for i in range(files):
+        path = os.path.join(root, "src", f"dir{i % 32}", f"file{i}.c")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("/* synthetic */\n" * rng.randint(1, 64))
+    meta = {"names": {
+        generator.RMW_PACKAGE:    {"cmake-args": ["-DRMW_UXRCE_MAX_NODES=1"]},
+        generator.CLIENT_PACKAGE: {"cmake-args": ["-DUCLIENT_PIC=OFF"]},
+    }}
+    with open(os.path.join(root, "colcon.meta"), "w") as f:
+        json.dump(meta, f, indent=4)
+
+
+def run(messages, packages, services, entities, groups, files, repeat, jobs=None, max_nesting=3):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="uros_pipeline_bench_") as tmp:
+        share = os.path.join(tmp, "share")
+        write_synthetic_tree(share, messages, packages, services=services)
+
+        # --- graph generation ---
+        results["collect_interfaces"], graph = timed(
+            lambda: gig.collect_interfaces([share], jobs), repeat)
+        graph_path = os.path.join(tmp, "interface_graph.json")
+        index_path = gig.index_path_for(graph_path)
+        gig.write_graph(graph, graph_path)
+
+        # --- graph loading, one source at a time ---
+        results["load_interface_graph.json"], _ = timed(
+            lambda: generator.load_interface_graph(False, graph_path, index_path), repeat)
+        gig.write_graph_cache(graph, graph_path)
+        results["load_interface_graph.cache"], _ = timed(
+            lambda: generator.load_interface_graph(False, graph_path, index_path), repeat)
+        results["load_interface_graph.lazy"], _ = timed(
+            lambda: generator.load_interface_graph(True, graph_path, index_path), repeat)
+
+        # --- type lookup: index build, then a type-ahead search per entity prompt ---
+        lazy = generator.load_interface_graph(True, graph_path, index_path)
+        results["type_index"], index = timed(lambda: TypeIndex(lazy), repeat)
+        queries = ["type1", "Type12", "tpye3", "synth_pkg_1/msg/Ty", "srvice3", "Service1"]
+        results["type_index.search"], _ = timed(
+            lambda: [index.search(q, kind) for q in queries for kind in ("msg", "srv")], repeat)
+
+        # --- component preparation ---
+        base = os.path.join(tmp, "base")
+        write_synthetic_component(base, files)
+        variants = iter(range(repeat))
+        results["materialize_variant"], _ = timed(
+            lambda: materialize_variant(base, os.path.join(tmp, f"variant{next(variants)}")), repeat)
+
+        spec = synthetic_spec(graph, entities, groups, max_nesting)
+        spec_stats, project = timed(lambda: spec_to_project(spec, graph), repeat)
+        results["spec_to_project"] = spec_stats
+        details, pubs, subs, srvs, clis, tmrs = project
+        params = generator.component_params({"ROS_DISTRO": "bench"}, details)
+        with open(os.path.join(base, "colcon.meta")) as f:
+            meta_text = f.read()
+        results["patch_colcon_meta"], _ = timed(
+            lambda: generator.patch_colcon_meta(meta_text, params), repeat)
+
+        # --- rendering ---
+        tpl = generator.load_additional_templates()
+        results["generate_init_and_callback_codes"], codes = timed(
+            lambda: generator.generate_init_and_callback_codes(
+                pubs, subs, srvs, clis, tmrs, tpl, details["scheduling"], graph,
+                details["message_memory"], details["callback_groups"]), repeat)
+        imports = generator.collect_required_imports(pubs, subs, srvs, clis)
+        # a fresh project per run: rerunning into one only finds main.c unchanged
+        projects = iter(range(repeat))
+        results["apply_code_blocks_to_c"], _ = timed(
+            lambda: generator.apply_code_blocks_to_c(
+                os.path.join(tmp, f"project{next(projects)}"), codes, imports, details), repeat)
+        project_path = os.path.join(tmp, "project0")
+        results["apply_code_blocks_to_c.unchanged"], _ = timed(
+            lambda: generator.apply_code_blocks_to_c(project_path, codes, imports, details), repeat)
+        with open(os.path.join(project_path, "main", "main.c")) as f:
+            main_c_bytes = len(f.read())
+        results["wire_budget"], _ = timed(
+            lambda: wire_budget(details, pubs, subs, srvs, clis, graph,
+                                params["stream_history"]), repeat)
+
+    for name, stats in results.items():
+        print(f"{name:<36} best {stats['best_s']:.4f}s  mean {stats['mean_s']:.4f}s")
+    return {
+        "benchmark": "pipeline",
+        "python":    platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {
+            "messages": messages, "packages": packages, "services": services,
+            "entities": entities, "groups": groups, "component_files": files,
+            "max_nesting": max_nesting, "repeat": repeat, "jobs": jobs,
+            "main_c_bytes": main_c_bytes,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Stages whose best time regressed past `threshold` x the baseline's."""
+    regressions = []
+    for name, stats in report["results"].items():
+        base = baseline["results"].get(name)
+        if base and stats["best_s"] > base["best_s"] * threshold:
+            regressions.append(f"{name}: {stats['best_s']:.4f}s vs {base['best_s']:.4f}s")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generator pipeline")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--packages", type=int, default=50)
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--entities", type=int, default=300,
+                        help="Entities in the synthetic spec, spread over all kinds")
+    parser.add_argument("--groups", type=int, default=2, help="Callback groups in the spec")
+    parser.add_argument("--max-nesting", type=int, default=3,
+                        help="Deepest message nesting of the types the spec uses")
+    parser.add_argument("--component-files", type=int, default=2000,
+                        help="Files in the synthetic base component")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Parser processes passed to collect_interfaces")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Slowdown factor over the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    # the generator resolves its templates relative to the repository root
+    os.chdir(ROOT)
+    report = run(args.messages, args.packages, args.services, args.entities, args.groups,
+                 args.component_files, args.repeat, args.jobs, args.max_nesting)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"Regression: {line}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Local mirror of micro_ros_espidf_component and the base checkouts made from it.
+
+uros_components/mirror/micro_ros_espidf_component.git is a bare repository
+that each distro branch is fetched into, shallowly by default. The source is
+MICRO_ROS_REPO or any other URL, local path or file:// URL, so air-gapped
+hosts can fetch from a mirror on a share or a USB stick. Fetched objects are
+checked by git (transfer.fsckObjects).
+
+Base checkouts are keyed by distro and commit:
+
+    uros_components/base/<distro>-<commit[:12]>/micro_ros_espidf_component
+
+Each is exported from the mirror without git metadata, so creating one or
+switching to another distro is a local operation. The checkout's
+MANIFEST_FILE records the git blob id, size and mtime of every file.
+verify_checkout compares the tree against it and rehashes only files whose
+size or mtime changed, so a base file edited through a hardlinked variant
+is caught before the next variant is made from it.
+"""
+import os
+import json
+import shutil
+import hashlib
+
+from git import Repo, GitCommandError
+
+from locking import file_lock
+
+MIRROR_DIR    = 'mirror'
+MIRROR_NAME   = 'micro_ros_espidf_component.git'
+BASE_DIR      = 'base'
+COMPONENT_DIR = 'micro_ros_espidf_component'
+MANIFEST_FILE = '.uros_base.json'
+
+# Directories of the upstream tree that are not exported into checkouts
+DROPPED_DIRS = ('.github',)
+
+
+def mirror_lock_path(components_dir):
+    return os.path.join(components_dir, '.mirror.lock')
+
+
+def blob_id(data):
+    """The git blob id of `data`, as in `git hash-object`."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def open_mirror(components_dir):
+    """The bare mirror repository under `components_dir`, created if missing."""
+    path = os.path.join(components_dir, MIRROR_DIR, MIRROR_NAME)
+    if os.path.isdir(path):
+        return Repo(path)
+    repo = Repo.init(path, bare=True, mkdir=True)
+    with repo.config_writer() as cw:
+        cw.set_value('transfer', 'fsckObjects', 'true')
+    return repo
+
+
+def has_commit(repo, commit):
+    try:
+        repo.git.cat_file('-e', f"{commit}^{{commit}}")
+        return True
+    except GitCommandError:
+        return False
+
+
+def fetch_distro(repo, source, distro, shallow=True):
+    """Fetch the `distro` branch of `source` into the mirror; returns its head commit."""
+    try:
+        repo.git.fetch(source, f"+refs/heads/{distro}:refs/heads/{distro}",
+                       depth=1 if shallow else None)
+    except GitCommandError as e:
+        lines = [line.strip(" '") for line in str(e.stderr).splitlines() if line.strip()]
+        detail = lines[0].replace("stderr: ", "", 1).strip(" '") if lines else str(e)
+        raise RuntimeError(f"Fetching {distro} from {source} failed: {detail}")
+    return repo.commit(distro).hexsha
+
+
+def resolve_commit(repo, source, distro, pinned=None, offline=False, refresh=False):
+    """
+    The commit of `distro` to check out: `pinned` if given, fetched only
+    when the mirror lacks it, else the branch head of `source`. With
+    `refresh` the pin is ignored. The mirror's copy of the branch is used
+    when `offline`, or when fetching it fails.
+    """
+    if pinned and not refresh:
+        if not has_commit(repo, pinned) and not offline:
+            fetch_distro(repo, source, distro)
+            if not has_commit(repo, pinned):
+                try:
+                    repo.git.fetch(source, pinned, depth=1)
+                except GitCommandError:
+                    pass
+        if not has_commit(repo, pinned):
+            raise RuntimeError(f"Commit {pinned} of {distro} is not in the mirror"
+                               + (" (offline)" if offline else f" or {source}"))
+        return pinned
+    if not offline:
+        try:
+            return fetch_distro(repo, source, distro)
+        except RuntimeError as e:
+            if not has_commit(repo, f"refs/heads/{distro}"):
+                raise
+            print(f"Warning: {e}; using the mirror's copy of {distro}")
+    if not has_commit(repo, f"refs/heads/{distro}"):
+        raise RuntimeError(f"Branch {distro} is not in the mirror (offline)")
+    return repo.git.rev_parse(f"refs/heads/{distro}")
+
+
+def checkout_path(components_dir, distro, commit):
+    return os.path.join(components_dir, BASE_DIR, f"{distro}-{commit[:12]}", COMPONENT_DIR)
+
+
+def _file_id(path):
+    if os.path.islink(path):
+        return blob_id(os.fsencode(os.readlink(path)))
+    with open(path, 'rb') as f:
+        return blob_id(f.read())
+
+
+def _stat_key(path):
+    st = os.lstat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def export_checkout(repo, distro, commit, dest):
+    """
+    Write the tree of `commit` to `dest` (which must not exist) and its
+    manifest. Every exported file is checked against the blob id git
+    records for it; a mismatch raises RuntimeError.
+    """
+    os.makedirs(dest)
+    index = f"{dest}.index"
+    try:
+        with repo.git.custom_environment(GIT_INDEX_FILE=os.path.abspath(index),
+                                         GIT_WORK_TREE=os.path.abspath(dest)):
+            repo.git.read_tree(commit)
+            repo.git.checkout_index('-a', '-f')
+    finally:
+        if os.path.exists(index):
+            os.unlink(index)
+    for d in DROPPED_DIRS:
+        shutil.rmtree(os.path.join(dest, d), ignore_errors=True)
+
+    files = {}
+    for line in repo.git.ls_tree('-r', '-z', commit).split('\0'):
+        if not line:
+            continue
+        meta, rel = line.split('\t', 1)
+        _, kind, blob = meta.split()
+        if kind != 'blob' or rel.split('/')[0] in DROPPED_DIRS:
+            continue
+        path = os.path.join(dest, rel)
+        if _file_id(path) != blob:
+            raise RuntimeError(f"Checkout of {commit} is corrupt: {rel} doesn't match its blob")
+        files[rel] = [blob] + _stat_key(path)
+    manifest = {'distro': distro, 'commit': commit, 'files': files}
+    with open(os.path.join(dest, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def verify_checkout(dest, commit):
+    """
+    Paths under `dest` that are missing or differ from the manifest, or
+    None if the checkout has no manifest for `commit`.
+    """
+    try:
+        with open(os.path.join(dest, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get('commit') != commit:
+        return None
+    bad = []
+    for rel, (blob, size, mtime_ns) in manifest['files'].items():
+        path = os.path.join(dest, rel)
+        try:
+            if _stat_key(path) == [size, mtime_ns] or _file_id(path) == blob:
+                continue
+        except OSError:
+            pass
+        bad.append(rel)
+    return bad
+
+
+def _verified(dest, commit):
+    """True if `dest` is an intact checkout of `commit`; a damaged one is removed."""
+    if not os.path.isdir(dest):
+        return False
+    bad = verify_checkout(dest, commit)
+    if bad == []:
+        return True
+    if bad:
+        print(f"Warning: base checkout {dest} was modified "
+              f"({', '.join(bad[:3])}{', ...' if len(bad) > 3 else ''}); checking it out again")
+    stale = f"{dest}.stale{os.getpid()}"
+    os.rename(dest, stale)
+    shutil.rmtree(stale)
+    return False
+
+
+def ensure_checkout(components_dir, source, distro, pinned=None, offline=False, refresh=False):
+    """
+    The verified base checkout of `distro`, fetching into the mirror only
+    when it lacks the wanted commit. Returns (checkout path, commit). An
+    intact checkout of the pinned commit is used without opening the
+    mirror; a damaged one is exported again.
+    """
+    with file_lock(mirror_lock_path(components_dir)):
+        if pinned and not refresh and _verified(checkout_path(components_dir, distro, pinned),
+                                                pinned):
+            return checkout_path(components_dir, distro, pinned), pinned
+        repo   = open_mirror(components_dir)
+        commit = resolve_commit(repo, source, distro, pinned, offline, refresh)
+        dest   = checkout_path(components_dir, distro, commit)
+        if not _verified(dest, commit):
+            tmp_dest = f"{dest}.tmp{os.getpid()}"
+            shutil.rmtree(tmp_dest, ignore_errors=True)
+            export_checkout(repo, distro, commit, tmp_dest)
+            os.rename(tmp_dest, dest)
+        return dest, commit
@@ -1,23 +1,95 @@
 #!/usr/bin/env python3
 import os
 import re
+import sys
 import json
+import struct
+import marshal
+import hashlib
 import argparse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
-ARR_RE = re.compile(r'^(?P<base>.+?)\[\s*(?:<=\d+)?\s*\]$')
+ARR_RE = re.compile(r'^(?P<base>.+?)\[\s*(?:<=\s*(?P<max>\d+))?\s*\]$')
+FIXED_RE = re.compile(r'^(?P<base>.+?)\[\s*(?P<size>\d+)\s*\]$')
 STR_RE = re.compile(r'^(?P<base>string|wstring)<=\s*(?P<max>\d+)$')
 FIELD_RE = re.compile(r'^(?P<rawtype>[^\s#]+)\s+(?P<name>\w+)')
 
+INTERFACE_KINDS = {".msg": "msg", ".srv": "srv", ".action": "action"}
+
+MANIFEST_VERSION = 2  # 2: fields record array and string bounds
+INDEX_VERSION = 1
+
+# Binary cache: magic, cache version, marshal version, size of the JSON graph
+# it was written alongside, then the marshalled graph.
+CACHE_MAGIC = b"UIGC"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sBBQ")
+
+# Below this many files the process pool costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 256
+
+PRIMITIVE_TYPES = {
+    "bool", "byte", "char", "float32", "float64",
+    "int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64",
+    "string", "wstring",
+}
+
+# "pkg/Name" -> parsed fields, plus "Name" -> ["pkg/Name", ...] for short lookups
 MSG_REGISTRY = {}
+SHORT_NAMES = defaultdict(list)
 
 def split_modifiers(rawtype):
+    """
+    Split a field type into (base, is_sequence, bounds). `bounds` holds
+    "max_size" for bounded sequences, "fixed_size" for fixed arrays and
+    "max_length" for bounded strings, when present.
+    """
+    bounds = {}
+    arr = False
     m = ARR_RE.match(rawtype)
+    f = FIXED_RE.match(rawtype)
     if m:
-        return m.group('base'), True
-    if STR_RE.match(rawtype):
-        return "string", False
-    return rawtype, False
+        rawtype, arr = m.group('base'), True
+        if m.group('max'):
+            bounds["max_size"] = int(m.group('max'))
+    elif f:
+        rawtype = f.group('base')
+        bounds["fixed_size"] = int(f.group('size'))
+    s = STR_RE.match(rawtype)
+    if s:
+        rawtype = s.group('base')
+        bounds["max_length"] = int(s.group('max'))
+    return rawtype, arr, bounds
+
+def register_message(pkg, name, fields):
+    full_name = f"{pkg}/{name}"
+    if full_name not in MSG_REGISTRY:
+        SHORT_NAMES[name].append(full_name)
+    MSG_REGISTRY[full_name] = fields
+    return full_name
+
+def resolve_type(base, pkg=None):
+    """
+    Map a field type to its MSG_REGISTRY key the way rosidl does: qualified
+    names ("pkg/Name" or "pkg/msg/Name") are looked up directly, bare names
+    refer to the enclosing package. A bare "Header" falls back to
+    std_msgs/Header and any other bare name to its unique owner, if any.
+    """
+    if base in PRIMITIVE_TYPES:
+        return None
+    if '/' in base:
+        parts = base.split('/')
+        full_name = f"{parts[0]}/{parts[-1]}"
+        return full_name if full_name in MSG_REGISTRY else None
+    if pkg is not None and f"{pkg}/{base}" in MSG_REGISTRY:
+        return f"{pkg}/{base}"
+    if base == "Header" and "std_msgs/Header" in MSG_REGISTRY:
+        return "std_msgs/Header"
+    candidates = SHORT_NAMES.get(base, [])
+    if len(candidates) == 1:
+        return candidates[0]
+    return None
 
 def parse_block(lines):
     d = {}
@@ -25,107 +97,388 @@ def parse_block(lines):
         raw = line.split('#', 1)[0].strip()
         if not raw:
             continue
-        # Skip constant definitions (lines containing '=' in field decl)
-        if '=' in raw:
-            continue
         m = FIELD_RE.match(raw)
         if not m:
             continue
-        base, arr = split_modifiers(m.group('rawtype'))
-        entry = {"type": base, "array": arr}
+        # Skip constant definitions ('NAME=value' after the type)
+        if raw[m.end():].lstrip().startswith('='):
+            continue
+        base, arr, bounds = split_modifiers(m.group('rawtype'))
+        d[m.group('name')] = {"type": base, "array": arr, **bounds}
+    return d
 
-        # If nested message type, attach its fields
-        for full, nested in MSG_REGISTRY.items():
-            if full.endswith(f"/{base}"):
-                entry["fields"] = nested
-                break
+def canonical_name(full_name):
+    pkg, name = full_name.split('/')
+    return f"{pkg}/msg/{name}"
 
-        d[m.group('name')] = entry
+def link_block(block, pkg):
+    """
+    Return a copy of a flat `block` whose nested message types are replaced
+    by their canonical "pkg/msg/Name" reference. Each type is stored once in
+    the graph; interface_resolver expands references on demand.
+    """
+    d = {}
+    for field, entry in block.items():
+        entry = dict(entry)
+        full = resolve_type(entry["type"], pkg)
+        if full is not None:
+            entry["type"] = canonical_name(full)
+        d[field] = entry
     return d
 
-def find_interface_files(roots):
-    files = []
+def scan_interface_files(roots):
+    """
+    Walk every root once and return sorted (pkg, kind, name, path) tuples.
+    The package is the first directory below the root, as in install/share.
+    """
+    found = []
     for root in roots:
-        for dirpath, _, filenames in os.walk(root):
-            for filename in filenames:
-                if filename.endswith((".msg", ".srv", ".action")):
-                    files.append(os.path.join(dirpath, filename))
-    return files
+        stack = [(root, None)]
+        while stack:
+            dirpath, pkg = stack.pop()
+            try:
+                it = os.scandir(dirpath)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, pkg or entry.name))
+                        continue
+                    stem, ext = os.path.splitext(entry.name)
+                    kind = INTERFACE_KINDS.get(ext)
+                    if kind is not None:
+                        found.append((pkg or entry.name, kind, stem, entry.path))
+    found.sort(key=lambda item: item[3])
+    return found
 
-def extract_package_name(path, roots):
-    for root in roots:
-        if path.startswith(root):
-            rel = os.path.relpath(path, root)
-            return rel.split(os.sep)[0]
-    return "unknown_package"
+def parse_interface_file(item):
+    """Parse one interface file into its flat (unlinked) definition."""
+    pkg, kind, name, path = item
+    with open(path) as f:
+        lines = f.read().splitlines()
 
-def collect_interfaces(roots):
-    interfaces = defaultdict(lambda: {"msg": {}, "srv": {}, "action": {}})
+    if kind == "msg":
+        definition = parse_block(lines)
 
-    # First pass: collect .msg
-    for path in find_interface_files(roots):
-        if not path.endswith(".msg"):
-            continue
-        pkg = extract_package_name(path, roots)
-        name = os.path.splitext(os.path.basename(path))[0]
-        with open(path) as f:
-            lines = f.read().splitlines()
-        full_name = f"{pkg}/{name}"
-        MSG_REGISTRY[full_name] = parse_block(lines)
-
-    # Second pass: parse all interfaces
-    for path in find_interface_files(roots):
-        pkg = extract_package_name(path, roots)
-        kind = (
-            "msg" if path.endswith(".msg") else
-            "srv" if path.endswith(".srv") else
-            "action"
-        )
-        name = os.path.splitext(os.path.basename(path))[0]
+    elif kind == "srv":
+        if '---' in lines:
+            i = lines.index('---')
+            req, res = lines[:i], lines[i+1:]
+        else:
+            req, res = lines, []
+        definition = {
+            "request": parse_block(req),
+            "response": parse_block(res)
+        }
 
-        with open(path) as f:
-            lines = f.read().splitlines()
+    else:
+        sections = [[], [], []]
+        section = 0
+        for line in lines:
+            if line.strip() == "---":
+                section += 1
+                continue
+            if section < 3:
+                sections[section].append(line)
+        definition = {
+            "goal": parse_block(sections[0]),
+            "result": parse_block(sections[1]),
+            "feedback": parse_block(sections[2])
+        }
+
+    return pkg, kind, name, definition
+
+def parse_interface_files(items, jobs=None):
+    """Parse `items` from scan_interface_files, fanning out over a process pool."""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(items) < PARALLEL_PARSE_MIN_FILES:
+        return [parse_interface_file(item) for item in items]
+    chunksize = max(1, len(items) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(parse_interface_file, items, chunksize=chunksize))
 
+def link_interfaces(parsed, previous=None, relink=None):
+    """
+    Register every parsed .msg, then resolve nested types across all files.
+    With a `previous` graph, only packages in `relink` are linked again; the
+    rest are taken over unchanged.
+    """
+    MSG_REGISTRY.clear()
+    SHORT_NAMES.clear()
+    for pkg, kind, name, definition in parsed:
         if kind == "msg":
-            interfaces[pkg][kind][name] = parse_block(lines)
-
-        elif kind == "srv":
-            if '---' in lines:
-                i = lines.index('---')
-                req, res = lines[:i], lines[i+1:]
-            else:
-                req, res = lines, []
+            register_message(pkg, name, definition)
+
+    interfaces = defaultdict(lambda: {"msg": {}, "srv": {}, "action": {}})
+    for pkg, kind, name, definition in parsed:
+        if previous is not None and pkg not in relink:
+            interfaces[pkg][kind][name] = definition
+        elif kind == "msg":
+            interfaces[pkg][kind][name] = link_block(definition, pkg)
+        else:
             interfaces[pkg][kind][name] = {
-                "request": parse_block(req),
-                "response": parse_block(res)
+                section: link_block(block, pkg)
+                for section, block in definition.items()
             }
+    return interfaces
 
-        elif kind == "action":
-            sections = [[], [], []]
-            section = 0
-            for line in lines:
-                if line.strip() == "---":
-                    section += 1
-                    continue
-                if section < 3:
-                    sections[section].append(line)
-            interfaces[pkg][kind][name] = {
-                "goal": parse_block(sections[0]),
-                "result": parse_block(sections[1]),
-                "feedback": parse_block(sections[2])
+def collect_interfaces(roots, jobs=None):
+    items = scan_interface_files(roots)
+    parsed = parse_interface_files(items, jobs)
+    return link_interfaces(parsed)
+
+def manifest_path_for(output):
+    return os.path.splitext(output)[0] + ".manifest.json"
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_manifest(output, roots):
+    """Return the recorded file table for `output`, or None if it can't be trusted."""
+    path = manifest_path_for(output)
+    if not os.path.exists(path) or not os.path.exists(output):
+        return None
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("roots") != roots
+            or manifest.get("graph_size") != os.path.getsize(output)):
+        return None
+    return manifest["files"]
+
+def save_manifest(output, roots, records):
+    manifest = {
+        "version":    MANIFEST_VERSION,
+        "roots":      roots,
+        "graph_size": os.path.getsize(output),
+        "files":      records,
+    }
+    write_atomic(manifest_path_for(output), json.dumps(manifest, indent=1))
+
+def diff_against_manifest(items, recorded):
+    """
+    Stat every scanned file against the manifest. Files whose mtime or size
+    moved are hashed; only a content change marks the package as changed.
+    Returns the fresh file table and the set of changed packages.
+    """
+    records = {}
+    changed = set()
+    for pkg, kind, name, path in items:
+        st = os.stat(path)
+        old = recorded.get(path)
+        if (old is not None and old["pkg"] == pkg
+                and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size):
+            records[path] = old
+            continue
+        digest = file_digest(path)
+        records[path] = {
+            "pkg": pkg, "kind": kind, "name": name,
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest,
+        }
+        if old is None or old["pkg"] != pkg or old["sha256"] != digest:
+            changed.add(pkg)
+    for path, old in recorded.items():
+        if path not in records:
+            changed.add(old["pkg"])
+    return records, changed
+
+def is_up_to_date(roots, output):
+    roots = [os.path.abspath(r) for r in roots]
+    recorded = load_manifest(output, roots)
+    if recorded is None:
+        return False
+    _, changed = diff_against_manifest(scan_interface_files(roots), recorded)
+    return not changed
+
+def references(kinds, names):
+    """True if any type in a package's `kinds` has a field naming one of `names`."""
+    for kind, types in kinds.items():
+        for definition in types.values():
+            blocks = [definition] if kind == "msg" else definition.values()
+            for block in blocks:
+                for entry in block.values():
+                    if entry["type"].rsplit('/', 1)[-1] in names:
+                        return True
+    return False
+
+def update_interfaces(roots, output, jobs=None, full=False):
+    """
+    Regenerate the graph for `roots`, reusing `output` and its manifest.
+    Packages with changed, added or removed files are reparsed, as are
+    packages naming one of their messages, since those names may now
+    resolve differently. Everything else is reused verbatim.
+    Returns (graph, file table, stats).
+    """
+    roots = [os.path.abspath(r) for r in roots]
+    items = scan_interface_files(roots)
+    recorded = None if full else load_manifest(output, roots)
+    previous = None
+    if recorded is not None:
+        with open(output) as f:
+            previous = json.load(f)
+    else:
+        recorded = {}
+
+    records, changed = diff_against_manifest(items, recorded)
+    if previous is not None:
+        # a package that vanished from the old graph can't be reused
+        changed |= {pkg for pkg, *_ in items if pkg not in previous}
+        # message names that appeared, vanished or changed
+        changed_names = {
+            rec["name"] for rec in list(recorded.values()) + list(records.values())
+            if rec["kind"] == "msg" and rec["pkg"] in changed
+        }
+        affected = changed | {
+            pkg for pkg, kinds in previous.items()
+            if pkg not in changed and references(kinds, changed_names)
+        }
+    else:
+        changed = affected = {pkg for pkg, *_ in items}
+
+    stale = [item for item in items if item[0] in affected]
+    fresh = iter(parse_interface_files(stale, jobs))
+    parsed = []
+    for item in items:
+        pkg, kind, name, _ = item
+        if pkg in affected:
+            parsed.append(next(fresh))
+        else:
+            parsed.append((pkg, kind, name, previous[pkg][kind][name]))
+
+    result = link_interfaces(parsed, previous, affected)
+    stats = {
+        "reparsed":         len(stale),
+        "changed_packages": sorted(changed),
+        "manifest_stale":   records != recorded,
+    }
+    return result, records, stats
+
+def write_atomic(path, text):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def index_path_for(output):
+    return os.path.splitext(output)[0] + ".index.json"
+
+def render_graph(graph):
+    """
+    Serialize `graph` exactly like json.dump(graph, indent=2) while recording
+    the byte span of every package's value, so readers can decode one
+    package without parsing the rest of the file.
+    """
+    if not graph:
+        return "{}", {}
+    parts = ["{"]
+    pos = 1
+    spans = {}
+    for i, (pkg, kinds) in enumerate(graph.items()):
+        head = ("," if i else "") + "\n  " + json.dumps(pkg) + ": "
+        body = json.dumps(kinds, indent=2).replace("\n", "\n  ")
+        pos += len(head)
+        spans[pkg] = (pos, len(body))
+        pos += len(body)
+        parts += [head, body]
+    parts.append("\n}")
+    # ensure_ascii keeps character offsets equal to byte offsets
+    return "".join(parts), spans
+
+def write_graph(graph, output):
+    """Write the graph and its package index next to it."""
+    text, spans = render_graph(graph)
+    index = {
+        "version":    INDEX_VERSION,
+        "graph_size": len(text),
+        "packages": {
+            pkg: {
+                "offset": spans[pkg][0],
+                "length": spans[pkg][1],
+                **{kind: list(types) for kind, types in kinds.items()},
             }
+            for pkg, kinds in graph.items()
+        },
+    }
+    write_atomic(output, text)
+    write_atomic(index_path_for(output), json.dumps(index, separators=(",", ":")))
 
-    return interfaces
+def cache_path_for(output):
+    return os.path.splitext(output)[0] + ".cache"
+
+def write_graph_cache(graph, output):
+    """Write a marshal cache of `graph` bound to the JSON graph at `output`."""
+    plain = {pkg: dict(kinds) for pkg, kinds in graph.items()}
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, marshal.version, os.path.getsize(output))
+    path = cache_path_for(output)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        marshal.dump(plain, f)
+    os.replace(tmp, path)
+
+def read_graph_cache(output):
+    """
+    Return the graph from the cache next to `output`, or None when there is
+    no cache or it was written by another format/Python or for another graph.
+    """
+    path = cache_path_for(output)
+    try:
+        with open(path, "rb") as f:
+            magic, version, marshal_version, graph_size = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+            if (magic != CACHE_MAGIC or version != CACHE_VERSION
+                    or marshal_version != marshal.version
+                    or graph_size != os.path.getsize(output)):
+                return None
+            return marshal.loads(f.read())
+    except (OSError, struct.error, EOFError, ValueError, TypeError):
+        return None
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Parse ROS .msg/.srv/.action files into nested JSON")
+    parser = argparse.ArgumentParser(description="Parse ROS .msg/.srv/.action files into a reference-based JSON graph")
     parser.add_argument("--share-dir", action="append", required=True,
                         help="Can be specified multiple times: paths to 'install/share' or 'src/' folders")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Parser processes (default: CPU count, 1 disables the pool)")
+    parser.add_argument("--output", default="interface_graph.json",
+                        help="Graph to write; its index and manifest are stored next to it")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the manifest and reparse everything")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't write the binary interface_graph.cache next to the graph")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit 0 if the graph is up to date with the sources, 1 otherwise")
     args = parser.parse_args()
 
-    result = collect_interfaces(args.share_dir)
-    with open("interface_graph.json", "w") as f:
-        json.dump(result, f, indent=2)
+    if args.check:
+        if is_up_to_date(args.share_dir, args.output):
+            print(f"{args.output} is up to date")
+            sys.exit(0)
+        print(f"{args.output} is out of date")
+        sys.exit(1)
+
+    result, records, update_stats = update_interfaces(args.share_dir, args.output, args.jobs, args.full)
+    if not update_stats["changed_packages"]:
+        if update_stats["manifest_stale"]:
+            # only timestamps moved; record them so the next run skips hashing
+            save_manifest(args.output, [os.path.abspath(r) for r in args.share_dir], records)
+        if not os.path.exists(index_path_for(args.output)):
+            write_graph(result, args.output)
+        if not args.no_cache and read_graph_cache(args.output) is None:
+            write_graph_cache(result, args.output)
+        print(f"{args.output} is up to date")
+        sys.exit(0)
+    write_graph(result, args.output)
+    if not args.no_cache:
+        write_graph_cache(result, args.output)
+    save_manifest(args.output, [os.path.abspath(r) for r in args.share_dir], records)
 
     stats = {
         "messages": sum(len(v["msg"]) for v in result.values()),
@@ -133,7 +486,9 @@ if __name__ == "__main__":
         "actions": sum(len(v["action"]) for v in result.values())
     }
 
-    print(f"Wrote {stats['messages']} msgs, {stats['services']} srvs, {stats['actions']} actions → interface_graph.json")
+    print(f"Reparsed and relinked {update_stats['reparsed']} files "
+          f"for {len(update_stats['changed_packages'])} changed packages")
+    print(f"Wrote {stats['messages']} msgs, {stats['services']} srvs, {stats['actions']} actions → {args.output}")
 
 
 # python3 generate_interface_graph.py     --share-dir PATH
@@ -0,0 +1,67 @@
+// Host version of serial_utils: the framed XRCE stream over a tty, normally
+// one end of the pty pair host_simulation.py bridges to the agent
+#include <errno.h>
+#include <fcntl.h>
+#include <poll.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <termios.h>
+#include <unistd.h>
+
+#include "esp32_serial_transport.h"
+
+static int serial_fd = -1;
+
+bool esp32_serial_open(struct uxrCustomTransport * transport){
+    (void) transport;
+    const char * dev = getenv("HOST_SIM_SERIAL_DEV");
+    if (dev == NULL) {
+        fprintf(stderr, "host_sim: HOST_SIM_SERIAL_DEV is not set\n");
+        return false;
+    }
+    serial_fd = open(dev, O_RDWR | O_NOCTTY);
+    if (serial_fd < 0) {
+        perror(dev);
+        return false;
+    }
+    struct termios tty;
+    if (tcgetattr(serial_fd, &tty) == 0) {
+        cfmakeraw(&tty);
+        tcsetattr(serial_fd, TCSANOW, &tty);
+    }
+    return true;
+}
+
+bool esp32_serial_close(struct uxrCustomTransport * transport){
+    (void) transport;
+    return close(serial_fd) == 0;
+}
+
+size_t esp32_serial_write(struct uxrCustomTransport* transport, const uint8_t * buf, size_t len, uint8_t * err){
+    (void) transport;
+    size_t written = 0;
+    while (written < len) {
+        ssize_t n = write(serial_fd, buf + written, len - written);
+        if (n < 0 && errno != EINTR) {
+            *err = 1;
+            break;
+        }
+        written += n > 0 ? (size_t) n : 0;
+    }
+    return written;
+}
+
+size_t esp32_serial_read(struct uxrCustomTransport* transport, uint8_t* buf, size_t len, int timeout, uint8_t* err){
+    (void) transport;
+    // returns as soon as any data is available, like the ESP32 version
+    struct pollfd pfd = { .fd = serial_fd, .events = POLLIN };
+    if (poll(&pfd, 1, timeout) <= 0) {
+        return 0;
+    }
+    ssize_t n = read(serial_fd, buf, len);
+    if (n < 0) {
+        *err = 1;
+        return 0;
+    }
+    return (size_t) n;
+}
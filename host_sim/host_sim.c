@@ -0,0 +1,401 @@
+// Host runtime for a generated node: FreeRTOS tasks on pthreads, the
+// instrumentation behind host_sim.h, and a main() that runs app_main() for
+// HOST_SIM_DURATION_S seconds and writes per-entity samples to HOST_SIM_STATS.
+#include <errno.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+
+#include "freertos/FreeRTOS.h"
+#include "freertos/task.h"
+#include "esp_timer.h"
+
+#include <rcl/rcl.h>
+#include <rclc/rclc.h>
+#include <rclc/executor.h>
+
+#define MAX_ENTITIES       256
+#define MAX_TASKS          32
+#define DEFAULT_SAMPLES    (1 << 16)
+#define DEFAULT_DURATION_S 10
+
+void app_main(void);
+
+static int64_t now_ns(clockid_t clock)
+{
+    struct timespec ts;
+    clock_gettime(clock, &ts);
+    return (int64_t) ts.tv_sec * 1000000000LL + ts.tv_nsec;
+}
+
+// Samples use CLOCK_REALTIME so the harness can line them up with its probe
+static int64_t wall_ns(void)
+{
+    return now_ns(CLOCK_REALTIME);
+}
+
+int64_t esp_timer_get_time(void)
+{
+    static int64_t start;
+    if (start == 0) {
+        start = now_ns(CLOCK_MONOTONIC);
+    }
+    return (now_ns(CLOCK_MONOTONIC) - start) / 1000;
+}
+
+// --- FreeRTOS tasks ---
+
+struct host_sim_task {
+    pthread_t       thread;
+    const char *    name;
+    TaskFunction_t  fn;
+    void *          arg;
+    pthread_mutex_t lock;
+    pthread_cond_t  cond;
+    uint32_t        notified;
+    int             running;
+};
+
+static struct host_sim_task tasks[MAX_TASKS];
+static int task_count;
+static pthread_mutex_t tasks_lock = PTHREAD_MUTEX_INITIALIZER;
+static __thread struct host_sim_task * current_task;
+
+static void * task_entry(void * arg)
+{
+    current_task = arg;
+    current_task->fn(current_task->arg);
+    vTaskDelete(NULL);
+    return NULL;
+}
+
+BaseType_t xTaskCreatePinnedToCore(TaskFunction_t fn, const char * name, uint32_t stack,
+                                   void * arg, UBaseType_t priority, TaskHandle_t * handle,
+                                   BaseType_t core)
+{
+    (void) stack;  // host stacks are larger than any ESP32 stack setting
+    (void) priority;
+    (void) core;
+    pthread_mutex_lock(&tasks_lock);
+    if (task_count == MAX_TASKS) {
+        pthread_mutex_unlock(&tasks_lock);
+        return pdFAIL;
+    }
+    struct host_sim_task * task = &tasks[task_count++];
+    task->name    = name;
+    task->fn      = fn;
+    task->arg     = arg;
+    task->running = 1;
+    pthread_mutex_init(&task->lock, NULL);
+    pthread_cond_init(&task->cond, NULL);
+    if (handle != NULL) {
+        *handle = task;
+    }
+    pthread_mutex_unlock(&tasks_lock);
+    if (pthread_create(&task->thread, NULL, task_entry, task) != 0) {
+        task->running = 0;
+        return pdFAIL;
+    }
+    pthread_detach(task->thread);
+    return pdPASS;
+}
+
+void vTaskDelete(TaskHandle_t task)
+{
+    // only self-deletion is emitted by the templates
+    if (task == NULL && current_task != NULL) {
+        pthread_mutex_lock(&tasks_lock);
+        current_task->running = 0;
+        pthread_mutex_unlock(&tasks_lock);
+        fprintf(stderr, "host_sim: task %s exited\n", current_task->name);
+        pthread_exit(NULL);
+    }
+}
+
+void vTaskDelay(TickType_t ticks)
+{
+    int64_t ns = (int64_t) ticks * 1000000000LL / configTICK_RATE_HZ;
+    struct timespec ts = { ns / 1000000000LL, ns % 1000000000LL };
+    while (nanosleep(&ts, &ts) != 0 && errno == EINTR) {
+    }
+}
+
+TickType_t xTaskGetTickCount(void)
+{
+    return (TickType_t) (esp_timer_get_time() * configTICK_RATE_HZ / 1000000);
+}
+
+uint32_t ulTaskNotifyTake(BaseType_t clear_on_exit, TickType_t ticks)
+{
+    struct host_sim_task * task = current_task;
+    pthread_mutex_lock(&task->lock);
+    if (ticks == portMAX_DELAY) {
+        while (task->notified == 0) {
+            pthread_cond_wait(&task->cond, &task->lock);
+        }
+    } else {
+        int64_t deadline = now_ns(CLOCK_REALTIME) + (int64_t) ticks * 1000000000LL / configTICK_RATE_HZ;
+        struct timespec ts = { deadline / 1000000000LL, deadline % 1000000000LL };
+        while (task->notified == 0
+               && pthread_cond_timedwait(&task->cond, &task->lock, &ts) != ETIMEDOUT) {
+        }
+    }
+    uint32_t value = task->notified;
+    if (value > 0) {
+        task->notified = clear_on_exit ? 0 : value - 1;
+    }
+    pthread_mutex_unlock(&task->lock);
+    return value;
+}
+
+BaseType_t xTaskNotifyGive(TaskHandle_t task)
+{
+    pthread_mutex_lock(&task->lock);
+    task->notified++;
+    pthread_cond_signal(&task->cond);
+    pthread_mutex_unlock(&task->lock);
+    return pdPASS;
+}
+
+// --- Instrumentation ---
+
+struct entity {
+    char        name[64];
+    const char *kind;
+    const void *key;       // handler, message or timer the callbacks are looked up by
+    void *      callback;
+    int64_t     ready_ns;  // when the entity was added to its executor
+    int64_t     period_ns;
+    uint64_t    count;
+    uint64_t    errors;
+    int64_t     busy_ns_total;
+    int64_t     busy_ns_max;
+    int64_t *   samples;
+    size_t      sample_count;
+};
+
+static struct entity entities[MAX_ENTITIES];
+static size_t entity_count;
+static size_t max_samples = DEFAULT_SAMPLES;
+static pthread_mutex_t entities_lock = PTHREAD_MUTEX_INITIALIZER;
+
+static struct entity * find_entity(const void * key)
+{
+    for (size_t i = 0; i < entity_count; i++) {
+        if (entities[i].key == key) {
+            return &entities[i];
+        }
+    }
+    return NULL;
+}
+
+static struct entity * add_entity(const char * expr, const char * kind, const void * key, void * callback)
+{
+    pthread_mutex_lock(&entities_lock);
+    struct entity * e = find_entity(key);
+    if (e == NULL && entity_count < MAX_ENTITIES) {
+        e = &entities[entity_count++];
+        // "&imu_publisher" -> "imu_publisher"
+        while (*expr == '&' || *expr == ' ') {
+            expr++;
+        }
+        snprintf(e->name, sizeof(e->name), "%s", expr);
+        e->kind     = kind;
+        e->key      = key;
+        e->callback = callback;
+        e->ready_ns = wall_ns();
+        e->samples  = malloc(max_samples * sizeof(int64_t));
+    }
+    pthread_mutex_unlock(&entities_lock);
+    return e;
+}
+
+static void record(struct entity * e, int64_t t, int64_t busy_ns, int ok)
+{
+    pthread_mutex_lock(&entities_lock);
+    if (ok) {
+        e->count++;
+        if (e->samples != NULL && e->sample_count < max_samples) {
+            e->samples[e->sample_count++] = t;
+        }
+    } else {
+        e->errors++;
+    }
+    e->busy_ns_total += busy_ns;
+    if (busy_ns > e->busy_ns_max) {
+        e->busy_ns_max = busy_ns;
+    }
+    pthread_mutex_unlock(&entities_lock);
+}
+
+rcl_ret_t host_sim_publish(const char * name, const rcl_publisher_t * publisher,
+                           const void * msg, rmw_publisher_allocation_t * allocation)
+{
+    struct entity * e = find_entity(publisher);
+    if (e == NULL) {
+        e = add_entity(name, "publisher", publisher, NULL);
+    }
+    int64_t start = wall_ns();
+    rcl_ret_t rc = rcl_publish(publisher, msg, allocation);
+    if (e != NULL) {
+        record(e, start, wall_ns() - start, rc == RCL_RET_OK);
+    }
+    return rc;
+}
+
+static void subscription_trampoline(const void * msg)
+{
+    struct entity * e = find_entity(msg);
+    int64_t start = wall_ns();
+    ((rclc_subscription_callback_t) e->callback)(msg);
+    record(e, start, wall_ns() - start, 1);
+}
+
+rcl_ret_t host_sim_add_subscription(const char * name, rclc_executor_t * executor,
+                                    rcl_subscription_t * subscription, void * msg,
+                                    rclc_subscription_callback_t callback,
+                                    rclc_executor_handle_invocation_t invocation)
+{
+    if (add_entity(name, "subscription", msg, (void *) callback) == NULL) {
+        return rclc_executor_add_subscription(executor, subscription, msg, callback, invocation);
+    }
+    return rclc_executor_add_subscription(executor, subscription, msg, subscription_trampoline,
+                                          invocation);
+}
+
+static void service_trampoline(const void * request, void * response)
+{
+    struct entity * e = find_entity(request);
+    int64_t start = wall_ns();
+    ((rclc_service_callback_t) e->callback)(request, response);
+    record(e, start, wall_ns() - start, 1);
+}
+
+rcl_ret_t host_sim_add_service(const char * name, rclc_executor_t * executor,
+                               rcl_service_t * service, void * request, void * response,
+                               rclc_service_callback_t callback)
+{
+    if (add_entity(name, "service", request, (void *) callback) == NULL) {
+        return rclc_executor_add_service(executor, service, request, response, callback);
+    }
+    return rclc_executor_add_service(executor, service, request, response, service_trampoline);
+}
+
+static void client_trampoline(const void * response)
+{
+    struct entity * e = find_entity(response);
+    int64_t start = wall_ns();
+    ((rclc_client_callback_t) e->callback)(response);
+    record(e, start, wall_ns() - start, 1);
+}
+
+rcl_ret_t host_sim_add_client(const char * name, rclc_executor_t * executor,
+                              rcl_client_t * client, void * response,
+                              rclc_client_callback_t callback)
+{
+    if (add_entity(name, "client", response, (void *) callback) == NULL) {
+        return rclc_executor_add_client(executor, client, response, callback);
+    }
+    return rclc_executor_add_client(executor, client, response, client_trampoline);
+}
+
+static void timer_trampoline(rcl_timer_t * timer, int64_t last_call_time)
+{
+    struct entity * e = find_entity(timer);
+    int64_t start = wall_ns();
+    ((rcl_timer_callback_t) e->callback)(timer, last_call_time);
+    record(e, start, wall_ns() - start, 1);
+}
+
+rcl_ret_t host_sim_timer_init(const char * name, rcl_timer_t * timer, rclc_support_t * support,
+                              const uint64_t period_ns, const rcl_timer_callback_t callback,
+                              bool autostart)
+{
+    struct entity * e = add_entity(name, "timer", timer, (void *) callback);
+    if (e == NULL) {
+        return rclc_timer_init_default2(timer, support, period_ns, callback, autostart);
+    }
+    e->period_ns = (int64_t) period_ns;
+    return rclc_timer_init_default2(timer, support, period_ns, timer_trampoline, autostart);
+}
+
+// --- Report ---
+
+static void dump(const char * path, int64_t start_ns, int64_t end_ns)
+{
+    FILE * f = fopen(path, "w");
+    if (f == NULL) {
+        perror(path);
+        return;
+    }
+    pthread_mutex_lock(&entities_lock);
+    fprintf(f, "{\n  \"start_ns\": %lld,\n  \"end_ns\": %lld,\n  \"exited_tasks\": [",
+            (long long) start_ns, (long long) end_ns);
+    int first = 1;
+    pthread_mutex_lock(&tasks_lock);
+    for (int i = 0; i < task_count; i++) {
+        if (!tasks[i].running) {
+            fprintf(f, "%s\"%s\"", first ? "" : ", ", tasks[i].name);
+            first = 0;
+        }
+    }
+    pthread_mutex_unlock(&tasks_lock);
+    fprintf(f, "],\n  \"entities\": [");
+    for (size_t i = 0; i < entity_count; i++) {
+        struct entity * e = &entities[i];
+        fprintf(f, "%s\n    {\"name\": \"%s\", \"kind\": \"%s\", \"ready_ns\": %lld, "
+                   "\"period_ns\": %lld, \"count\": %llu, \"errors\": %llu, "
+                   "\"busy_ns_total\": %lld, \"busy_ns_max\": %lld, \"samples\": [",
+                i ? "," : "", e->name, e->kind, (long long) e->ready_ns,
+                (long long) e->period_ns, (unsigned long long) e->count,
+                (unsigned long long) e->errors, (long long) e->busy_ns_total,
+                (long long) e->busy_ns_max);
+        for (size_t s = 0; s < e->sample_count; s++) {
+            fprintf(f, "%s%lld", s ? ", " : "", (long long) e->samples[s]);
+        }
+        fprintf(f, "]}");
+    }
+    fprintf(f, "\n  ]\n}\n");
+    pthread_mutex_unlock(&entities_lock);
+    fclose(f);
+}
+
+static int tasks_running(void)
+{
+    int running = 0;
+    pthread_mutex_lock(&tasks_lock);
+    for (int i = 0; i < task_count; i++) {
+        running += tasks[i].running;
+    }
+    pthread_mutex_unlock(&tasks_lock);
+    return running;
+}
+
+int main(void)
+{
+    const char * duration_env = getenv("HOST_SIM_DURATION_S");
+    const char * samples_env  = getenv("HOST_SIM_MAX_SAMPLES");
+    const char * stats_path   = getenv("HOST_SIM_STATS");
+    double duration = duration_env ? atof(duration_env) : DEFAULT_DURATION_S;
+    if (samples_env != NULL) {
+        max_samples = strtoul(samples_env, NULL, 10);
+    }
+
+    int64_t start = wall_ns();
+    app_main();
+
+    // app_main returns once its tasks exist; run until the deadline or until
+    // every task has exited (an RCCHECK failure deletes the task)
+    int64_t deadline = start + (int64_t) (duration * 1e9);
+    while (wall_ns() < deadline && tasks_running() > 0) {
+        usleep(10000);
+    }
+    dump(stats_path ? stats_path : "host_sim_stats.json", start, wall_ns());
+    fflush(stdout);
+    fflush(stderr);
+    // the executor tasks never return; don't wait for them
+    _exit(tasks_running() > 0 ? 0 : 2);
+}
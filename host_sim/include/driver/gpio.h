@@ -0,0 +1,9 @@
+// ESP-IDF GPIO shim (nothing used on the host)
+#ifndef HOST_SIM_DRIVER_GPIO_H
+#define HOST_SIM_DRIVER_GPIO_H
+
+#include "esp_err.h"
+
+typedef int gpio_num_t;
+
+#endif // HOST_SIM_DRIVER_GPIO_H
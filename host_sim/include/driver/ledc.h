@@ -0,0 +1,7 @@
+// ESP-IDF LEDC shim (nothing used on the host)
+#ifndef HOST_SIM_DRIVER_LEDC_H
+#define HOST_SIM_DRIVER_LEDC_H
+
+#include "esp_err.h"
+
+#endif // HOST_SIM_DRIVER_LEDC_H
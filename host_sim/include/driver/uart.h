@@ -0,0 +1,9 @@
+// ESP-IDF UART shim: only the port type, the host transport ignores it
+#ifndef HOST_SIM_DRIVER_UART_H
+#define HOST_SIM_DRIVER_UART_H
+
+#include "esp_err.h"
+
+typedef int uart_port_t;
+
+#endif // HOST_SIM_DRIVER_UART_H
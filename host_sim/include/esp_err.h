@@ -0,0 +1,21 @@
+// ESP-IDF error shim
+#ifndef HOST_SIM_ESP_ERR_H
+#define HOST_SIM_ESP_ERR_H
+
+#include <stdio.h>
+#include <stdlib.h>
+
+typedef int esp_err_t;
+
+#define ESP_OK   0
+#define ESP_FAIL -1
+
+#define ESP_ERROR_CHECK(x) do { \
+        esp_err_t err_rc_ = (x); \
+        if (err_rc_ != ESP_OK) { \
+            fprintf(stderr, "ESP_ERROR_CHECK failed: %d at %s:%d\n", err_rc_, __FILE__, __LINE__); \
+            abort(); \
+        } \
+    } while (0)
+
+#endif // HOST_SIM_ESP_ERR_H
@@ -0,0 +1,14 @@
+// ESP-IDF logging shim: everything goes to stderr
+#ifndef HOST_SIM_ESP_LOG_H
+#define HOST_SIM_ESP_LOG_H
+
+#include <stdio.h>
+#include "esp_err.h"
+
+#define ESP_LOGE(tag, fmt, ...) fprintf(stderr, "E (%s) " fmt "\n", tag, ##__VA_ARGS__)
+#define ESP_LOGW(tag, fmt, ...) fprintf(stderr, "W (%s) " fmt "\n", tag, ##__VA_ARGS__)
+#define ESP_LOGI(tag, fmt, ...) fprintf(stderr, "I (%s) " fmt "\n", tag, ##__VA_ARGS__)
+#define ESP_LOGD(tag, fmt, ...) ((void) (tag))
+#define ESP_LOGV(tag, fmt, ...) ((void) (tag))
+
+#endif // HOST_SIM_ESP_LOG_H
@@ -0,0 +1,7 @@
+// ESP-IDF MAC address shim (nothing used on the host)
+#ifndef HOST_SIM_ESP_MAC_H
+#define HOST_SIM_ESP_MAC_H
+
+#include "esp_err.h"
+
+#endif // HOST_SIM_ESP_MAC_H
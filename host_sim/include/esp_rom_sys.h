@@ -0,0 +1,10 @@
+// ESP-IDF ROM shim
+#ifndef HOST_SIM_ESP_ROM_SYS_H
+#define HOST_SIM_ESP_ROM_SYS_H
+
+#include <stdint.h>
+#include <unistd.h>
+
+static inline void esp_rom_delay_us(uint32_t us) { usleep(us); }
+
+#endif // HOST_SIM_ESP_ROM_SYS_H
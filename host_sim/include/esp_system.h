@@ -0,0 +1,10 @@
+// ESP-IDF system shim
+#ifndef HOST_SIM_ESP_SYSTEM_H
+#define HOST_SIM_ESP_SYSTEM_H
+
+#include <stdlib.h>
+#include "esp_err.h"
+
+static inline void esp_restart(void) { exit(1); }
+
+#endif // HOST_SIM_ESP_SYSTEM_H
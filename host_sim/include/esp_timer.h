@@ -0,0 +1,9 @@
+// ESP-IDF high resolution timer shim: microseconds since start on CLOCK_MONOTONIC
+#ifndef HOST_SIM_ESP_TIMER_H
+#define HOST_SIM_ESP_TIMER_H
+
+#include <stdint.h>
+
+int64_t esp_timer_get_time(void);
+
+#endif // HOST_SIM_ESP_TIMER_H
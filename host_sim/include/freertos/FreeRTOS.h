@@ -0,0 +1,37 @@
+// FreeRTOS shim for host builds: ticks, handles and the task API on pthreads
+#ifndef HOST_SIM_FREERTOS_H
+#define HOST_SIM_FREERTOS_H
+
+#include <stdint.h>
+#include "sdkconfig.h"
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+typedef uint32_t TickType_t;
+typedef int      BaseType_t;
+typedef unsigned UBaseType_t;
+
+#define pdFALSE 0
+#define pdTRUE  1
+#define pdPASS  pdTRUE
+#define pdFAIL  pdFALSE
+
+#define portMAX_DELAY ((TickType_t) 0xffffffffUL)
+
+#ifdef CONFIG_FREERTOS_HZ
+#define configTICK_RATE_HZ CONFIG_FREERTOS_HZ
+#else
+#define configTICK_RATE_HZ 1000
+#endif
+
+#define portTICK_PERIOD_MS ((TickType_t) 1000 / configTICK_RATE_HZ)
+#define pdMS_TO_TICKS(ms)  ((TickType_t) (((uint64_t) (ms) * configTICK_RATE_HZ) / 1000))
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // HOST_SIM_FREERTOS_H
@@ -0,0 +1,31 @@
+// FreeRTOS task shim: every task is a pthread; priority and core are ignored
+#ifndef HOST_SIM_TASK_H
+#define HOST_SIM_TASK_H
+
+#include "freertos/FreeRTOS.h"
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+typedef void (*TaskFunction_t)(void *);
+typedef struct host_sim_task * TaskHandle_t;
+
+BaseType_t xTaskCreatePinnedToCore(TaskFunction_t fn, const char * name, uint32_t stack,
+                                   void * arg, UBaseType_t priority, TaskHandle_t * handle,
+                                   BaseType_t core);
+void       vTaskDelete(TaskHandle_t task);
+void       vTaskDelay(TickType_t ticks);
+TickType_t xTaskGetTickCount(void);
+uint32_t   ulTaskNotifyTake(BaseType_t clear_on_exit, TickType_t ticks);
+BaseType_t xTaskNotifyGive(TaskHandle_t task);
+
+#define xTaskCreate(fn, name, stack, arg, priority, handle) \
+    xTaskCreatePinnedToCore(fn, name, stack, arg, priority, handle, 0)
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // HOST_SIM_TASK_H
@@ -0,0 +1,48 @@
+// Force-included into the generated main.c by the host build. Wraps the
+// rcl/rclc calls the templates emit so every publish, callback and timer
+// tick is timestamped per entity; host_sim.c dumps the samples as JSON.
+#ifndef HOST_SIM_H
+#define HOST_SIM_H
+
+#include <rcl/rcl.h>
+#include <rclc/rclc.h>
+#include <rclc/executor.h>
+
+#ifdef __cplusplus
+extern "C"
+{
+#endif
+
+rcl_ret_t host_sim_publish(const char * name, const rcl_publisher_t * publisher,
+                           const void * msg, rmw_publisher_allocation_t * allocation);
+rcl_ret_t host_sim_add_subscription(const char * name, rclc_executor_t * executor,
+                                    rcl_subscription_t * subscription, void * msg,
+                                    rclc_subscription_callback_t callback,
+                                    rclc_executor_handle_invocation_t invocation);
+rcl_ret_t host_sim_add_service(const char * name, rclc_executor_t * executor,
+                               rcl_service_t * service, void * request, void * response,
+                               rclc_service_callback_t callback);
+rcl_ret_t host_sim_add_client(const char * name, rclc_executor_t * executor,
+                              rcl_client_t * client, void * response,
+                              rclc_client_callback_t callback);
+rcl_ret_t host_sim_timer_init(const char * name, rcl_timer_t * timer, rclc_support_t * support,
+                              const uint64_t period_ns, const rcl_timer_callback_t callback,
+                              bool autostart);
+
+// The handler argument is stringified into the entity name ("&imu_publisher")
+#define rcl_publish(publisher, msg, allocation) \
+    host_sim_publish(#publisher, publisher, msg, allocation)
+#define rclc_executor_add_subscription(executor, subscription, msg, callback, invocation) \
+    host_sim_add_subscription(#subscription, executor, subscription, msg, callback, invocation)
+#define rclc_executor_add_service(executor, service, request, response, callback) \
+    host_sim_add_service(#service, executor, service, request, response, callback)
+#define rclc_executor_add_client(executor, client, response, callback) \
+    host_sim_add_client(#client, executor, client, response, callback)
+#define rclc_timer_init_default2(timer, support, period_ns, callback, autostart) \
+    host_sim_timer_init(#timer, timer, support, period_ns, callback, autostart)
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // HOST_SIM_H
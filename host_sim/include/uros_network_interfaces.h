@@ -0,0 +1,9 @@
+// micro-ROS network interface shim: the host network is already up
+#ifndef HOST_SIM_UROS_NETWORK_INTERFACES_H
+#define HOST_SIM_UROS_NETWORK_INTERFACES_H
+
+#include "esp_err.h"
+
+static inline esp_err_t uros_network_interface_initialize(void) { return ESP_OK; }
+
+#endif // HOST_SIM_UROS_NETWORK_INTERFACES_H
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Run a generated project's node logic on Linux and measure it per entity.
+
+host_sim/ builds the project's main/main.c against FreeRTOS/ESP-IDF shims
+and a host build of micro-ROS (the same colcon.meta as the project's
+component variant, compiled for Linux). The instrumented node runs for a
+fixed time against a micro-ROS agent:
+
+    python3 host_simulation.py --spec specs/imu.yaml --microros-prefix ~/uros_host
+
+With `--agent local` (the default) the agent is started on loopback: UDP
+projects talk to it on 127.0.0.1, CUSTOM (serial) projects through a pty
+pair bridged by this script, so no hardware or network is involved.
+`--agent HOST:PORT` or `--agent /dev/ttyX` uses an agent that is already
+running instead.
+
+The node side records every publish, callback and timer tick. If rclpy is
+importable, a probe node on the ROS 2 side subscribes to the node's topics,
+publishes to its subscriptions and calls its services, which gives message
+loss and latency; without it only the node-side rates are reported. Latency
+pairs each arrival with the latest send before it, so it is only meaningful
+while the send interval is longer than the latency itself.
+"""
+import os
+import sys
+import json
+import time
+import tty
+import shutil
+import select
+import argparse
+import importlib
+import threading
+import subprocess
+
+from interface_graph import load_interface_graph
+from project_spec import MODES, SpecError, load_spec, spec_to_project
+
+HOST_SIM_PATH  = os.path.join(os.path.dirname(os.path.abspath(__file__)), "host_sim")
+AGENT_COMMANDS = (["micro-ros-agent"], ["ros2", "run", "micro_ros_agent", "micro_ros_agent"])
+LOOPBACK_IP    = "127.0.0.1"
+DEFAULT_PORT   = 8888
+
+
+# --- Build ---
+
+def sdkconfig_header(project_path, overrides):
+    """
+    sdkconfig.h for the host build: the project's sdkconfig, then the
+    defaults of Kconfig.projbuild options it doesn't set (callback group
+    settings live only there), then `overrides` (None drops a symbol).
+    """
+    values = {}
+    with open(os.path.join(project_path, "sdkconfig")) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("CONFIG_") and "=" in line:
+                key, value = line.split("=", 1)
+                values[key] = value
+    symbol = None
+    with open(os.path.join(project_path, "main", "Kconfig.projbuild")) as f:
+        for line in f:
+            words = line.split()
+            if words[:1] == ["config"]:
+                symbol = "CONFIG_" + words[1]
+            elif words[:1] == ["default"] and "if" not in words and symbol:
+                values.setdefault(symbol, words[1])
+                symbol = None
+    values.update(overrides)
+    lines = ["/* Generated by host_simulation.py */", "#pragma once"]
+    for key, value in values.items():
+        if value is not None:
+            lines.append(f"#define {key} {1 if value == 'y' else value}")
+    return "\n".join(lines) + "\n"
+
+
+def build_node(project_path, build_dir, microros_prefix, overrides):
+    """Configure and build host_sim for the project; returns the executable."""
+    if shutil.which("cmake") is None:
+        raise RuntimeError("cmake is needed for the host build")
+    if not os.path.exists(os.path.join(microros_prefix, "lib", "libmicroros.a")):
+        raise RuntimeError(f"{microros_prefix} has no lib/libmicroros.a")
+    os.makedirs(build_dir, exist_ok=True)
+    with open(os.path.join(build_dir, "sdkconfig.h"), "w") as f:
+        f.write(sdkconfig_header(project_path, overrides))
+    for cmd in (
+        ["cmake", "-S", HOST_SIM_PATH, "-B", build_dir,
+         f"-DPROJECT_MAIN={os.path.abspath(os.path.join(project_path, 'main', 'main.c'))}",
+         f"-DSDKCONFIG_DIR={os.path.abspath(build_dir)}",
+         f"-DMICROROS_PREFIX={os.path.abspath(microros_prefix)}"],
+        ["cmake", "--build", build_dir],
+    ):
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(cmd[:2])} failed:\n{result.stdout}")
+    return os.path.join(build_dir, "uros_host_node")
+
+
+# --- Agent ---
+
+def agent_command():
+    """The micro-ROS agent command line: $MICRO_ROS_AGENT or the first found on PATH."""
+    if os.environ.get("MICRO_ROS_AGENT"):
+        return os.environ["MICRO_ROS_AGENT"].split()
+    for cmd in AGENT_COMMANDS:
+        if shutil.which(cmd[0]):
+            return cmd
+    raise RuntimeError("no micro-ROS agent found; set MICRO_ROS_AGENT or pass --agent")
+
+
+class PtyBridge:
+    """
+    Two ptys whose master ends are relayed to each other: the agent opens
+    one slave, the node the other, standing in for the serial cable.
+    """
+
+    def __init__(self):
+        self._masters = []
+        self._slaves  = []  # held open so the masters don't read EIO between users
+        self.devices  = []
+        for _ in range(2):
+            master, slave = os.openpty()
+            tty.setraw(slave)
+            self._masters.append(master)
+            self._slaves.append(slave)
+            self.devices.append(os.ttyname(slave))
+        self._stop   = False
+        self._thread = threading.Thread(target=self._relay, daemon=True)
+        self._thread.start()
+
+    def _relay(self):
+        a, b = self._masters
+        peer = {a: b, b: a}
+        while not self._stop:
+            ready, _, _ = select.select(self._masters, [], [], 0.1)
+            for fd in ready:
+                try:
+                    os.write(peer[fd], os.read(fd, 4096))
+                except OSError:
+                    pass
+
+    def close(self):
+        self._stop = True
+        self._thread.join()
+        for fd in self._masters + self._slaves:
+            os.close(fd)
+
+
+# --- Probe ---
+
+def _interface_class(type_name):
+    pkg, kind, name = type_name.split("/")
+    return getattr(importlib.import_module(f"{pkg}.{kind}"), name)
+
+
+def _topic(namespace, name):
+    return "/" + "/".join(p for p in (namespace.strip("/"), name) if p)
+
+
+class Probe:
+    """
+    ROS 2 side of the measurement (needs rclpy): records arrival times of the
+    node's publications, send times of messages to its subscriptions and of
+    requests to its services, and service round trips.
+    """
+
+    def __init__(self, details, pubs, subs, srvs, rate_hz):
+        import rclpy
+        from rclpy.qos import QoSProfile, ReliabilityPolicy
+        from rclpy.executors import SingleThreadedExecutor
+
+        def qos(entity_qos):
+            reliability = entity_qos.get("reliability") if isinstance(entity_qos, dict) else entity_qos
+            return QoSProfile(depth=10, reliability=ReliabilityPolicy.BEST_EFFORT
+                              if reliability == "best_effort" else ReliabilityPolicy.RELIABLE)
+
+        self._rclpy = rclpy
+        rclpy.init()
+        self.node = rclpy.create_node("uros_host_sim_probe")
+        ns = details.get("namespace", "")
+        self.received = {}   # publisher handler -> arrival times
+        self.sent     = {}   # subscription / service handler -> send times
+        self.replies  = {}   # service handler -> round trip times
+        for name, typ, entity_qos, *_ in pubs:
+            times = self.received.setdefault(f"{name}_publisher", [])
+            self.node.create_subscription(_interface_class(typ), _topic(ns, name),
+                                          lambda msg, t=times: t.append(time.time_ns()),
+                                          qos(entity_qos))
+        period = 1.0 / rate_hz
+        for name, typ, entity_qos in subs:
+            cls   = _interface_class(typ)
+            pub   = self.node.create_publisher(cls, _topic(ns, name), qos(entity_qos))
+            times = self.sent.setdefault(f"{name}_subscription", [])
+            self.node.create_timer(period, lambda p=pub, c=cls, t=times: (
+                t.append(time.time_ns()), p.publish(c())))
+        for name, typ, _ in srvs:
+            cls    = _interface_class(typ)
+            client = self.node.create_client(cls, _topic(ns, name))
+            self.node.create_timer(period, lambda c=client, r=cls.Request, h=f"{name}_service":
+                                   self._call(c, r, h))
+        self._executor = SingleThreadedExecutor()
+        self._executor.add_node(self.node)
+        self._thread = threading.Thread(target=self._executor.spin, daemon=True)
+        self._thread.start()
+
+    def _call(self, client, request_cls, handler):
+        if not client.service_is_ready():
+            return
+        start = time.time_ns()
+        self.sent.setdefault(handler, []).append(start)
+        future = client.call_async(request_cls())
+        future.add_done_callback(
+            lambda f: self.replies.setdefault(handler, []).append(time.time_ns() - start))
+
+    def close(self):
+        self._executor.shutdown()
+        self.node.destroy_node()
+        self._rclpy.shutdown()
+
+
+# --- Analysis ---
+
+def _in(samples, start, end):
+    return [t for t in samples if start <= t <= end]
+
+
+def _match_latencies(sends, arrivals):
+    """Latency of each arrival after the latest send before it (both sorted)."""
+    latencies, i = [], -1
+    for t in arrivals:
+        while i + 1 < len(sends) and sends[i + 1] <= t:
+            i += 1
+        if i >= 0:
+            latencies.append(t - sends[i])
+    return latencies
+
+
+def _summary_ms(values_ns):
+    if not values_ns:
+        return None
+    values = sorted(values_ns)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] / 1e6
+    return {"p50": pick(0.5), "p99": pick(0.99), "max": values[-1] / 1e6}
+
+
+def _rate(samples):
+    if len(samples) < 2:
+        return 0.0
+    return (len(samples) - 1) / ((samples[-1] - samples[0]) / 1e9)
+
+
+def analyze(stats, probe, targets, warmup_s):
+    """
+    Per-entity results from the node's stats and the probe's records.
+    Counting starts `warmup_s` after the entity was ready; sends in the last
+    `warmup_s` are left out, since their arrivals may fall after the stop.
+    """
+    warmup = int(warmup_s * 1e9)
+    results = {}
+    for e in stats["entities"]:
+        name, kind = e["name"], e["kind"]
+        start, end = e["ready_ns"] + warmup, stats["end_ns"]
+        samples = _in(e["samples"], start, end)
+        result = {
+            "kind":         kind,
+            "count":        e["count"],
+            "errors":       e["errors"],
+            "rate_hz":      round(_rate(samples), 3),
+            "busy_ms_max":  e["busy_ns_max"] / 1e6,
+        }
+        if name in targets:
+            result["target_hz"] = targets[name]
+        if kind == "timer" and len(samples) > 1 and e["period_ns"]:
+            jitter = [abs(b - a - e["period_ns"]) for a, b in zip(samples, samples[1:])]
+            result["jitter_ms"] = _summary_ms(jitter)
+        if probe is not None and kind == "publisher" and name in probe.received:
+            sent     = _in(e["samples"], start, end - warmup)
+            arrivals = _in(probe.received[name], start, end)
+            result["loss"]       = _loss(len(sent), len(arrivals))
+            result["latency_ms"] = _summary_ms(_match_latencies(e["samples"], arrivals))
+        if probe is not None and kind in ("subscription", "service") and name in probe.sent:
+            sent = _in(probe.sent[name], start, end - warmup)
+            result["loss"] = _loss(len(sent), len(samples))
+            if kind == "subscription":
+                result["latency_ms"] = _summary_ms(_match_latencies(probe.sent[name], samples))
+            else:
+                result["latency_ms"] = _summary_ms(probe.replies.get(name, []))
+        results[name] = result
+    return results
+
+
+def _loss(sent, arrived):
+    return round(max(0.0, 1.0 - arrived / sent), 4) if sent else None
+
+
+def format_results(results, exited_tasks):
+    """Table of the results; timers show their jitter in the latency columns."""
+    lines = [f"{'entity':<32} {'kind':<12} {'count':>7} {'rate Hz':>9} {'loss':>7} "
+             f"{'p50 ms':>8} {'p99 ms':>8}"]
+    for name, r in results.items():
+        latency = r.get("latency_ms") or r.get("jitter_ms") or {}
+        loss = r.get("loss")
+        p50, p99 = (f"{latency[q]:.2f}" if q in latency else "-" for q in ("p50", "p99"))
+        lines.append(
+            f"{name:<32} {r['kind']:<12} {r['count']:>7} {r['rate_hz']:>9.2f} "
+            f"{'-' if loss is None else f'{loss:.1%}':>7} {p50:>8} {p99:>8}")
+    if exited_tasks:
+        lines.append(f"Tasks that exited early: {', '.join(exited_tasks)}")
+    return "\n".join(lines)
+
+
+# --- Run ---
+
+def simulate(spec_path, microros_prefix, agent="local", duration=10.0, warmup=1.0,
+             probe_rate=10.0, build_dir=None, interface_graph=None):
+    """Build, run and measure the project of `spec_path`; returns the results dict."""
+    spec = load_spec(spec_path)
+    if interface_graph is None:
+        interface_graph = load_interface_graph()
+    details, pubs, subs, srvs, clis, tmrs = spec_to_project(spec, interface_graph)
+    project_path = os.path.join(spec['target_dir'], details['project_name'])
+    if not os.path.isdir(project_path):
+        raise RuntimeError(f"{project_path} doesn't exist; generate the project first")
+    build_dir = build_dir or os.path.join(project_path, "build_host")
+
+    serial   = details['mode'] == MODES['custom']
+    env      = dict(os.environ, HOST_SIM_DURATION_S=str(duration),
+                    HOST_SIM_STATS=os.path.abspath(os.path.join(build_dir, "host_sim_stats.json")))
+    overrides, bridge, agent_proc = {}, None, None
+    if serial:
+        # the UDP address setup in micro_ros_task is for network transports only
+        overrides.update(CONFIG_MICRO_ROS_ESP_NETIF_WLAN=None, CONFIG_MICRO_ROS_ESP_NETIF_ENET=None)
+    if agent == "local":
+        if serial:
+            bridge = PtyBridge()
+            agent_args = ["serial", "--dev", bridge.devices[0]]
+            env["HOST_SIM_SERIAL_DEV"] = bridge.devices[1]
+        else:
+            agent_args = ["udp4", "--port", str(DEFAULT_PORT)]
+            overrides.update(CONFIG_MICRO_ROS_AGENT_IP=f'"{LOOPBACK_IP}"',
+                             CONFIG_MICRO_ROS_AGENT_PORT=f'"{DEFAULT_PORT}"')
+        agent_proc = subprocess.Popen(agent_command() + agent_args,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elif serial:
+        env["HOST_SIM_SERIAL_DEV"] = agent
+    else:
+        host, _, port = agent.rpartition(":")
+        overrides.update(CONFIG_MICRO_ROS_AGENT_IP=f'"{host or LOOPBACK_IP}"',
+                         CONFIG_MICRO_ROS_AGENT_PORT=f'"{port}"')
+
+    probe = None
+    try:
+        executable = build_node(project_path, build_dir, microros_prefix, overrides)
+        try:
+            probe = Probe(details, pubs, subs, srvs, probe_rate)
+        except ImportError:
+            print("rclpy not found: reporting node-side rates only")
+        node = subprocess.run([executable], env=env, cwd=build_dir)
+        if node.returncode not in (0, 2):
+            raise RuntimeError(f"node crashed (exit status {node.returncode})")
+        with open(env["HOST_SIM_STATS"]) as f:
+            stats = json.load(f)
+    finally:
+        if probe is not None:
+            probe.close()
+        if agent_proc is not None:
+            agent_proc.terminate()
+            agent_proc.wait()
+        if bridge is not None:
+            bridge.close()
+
+    targets = {f"{name}_publisher": rate for name, _, _, rate in pubs if rate}
+    targets.update({f"{name}_timer": rate for name, rate in tmrs})
+    return {
+        "project":      project_path,
+        "duration_s":   duration,
+        "exited_tasks": stats["exited_tasks"],
+        "entities":     analyze(stats, probe, targets, warmup),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a generated project on the host and measure it")
+    parser.add_argument("--spec", required=True, help="Spec the project was generated from")
+    parser.add_argument("--microros-prefix", required=True,
+                        help="Host micro-ROS build with lib/libmicroros.a and include/")
+    parser.add_argument("--agent", default="local",
+                        help="'local' to start an agent on loopback, else HOST:PORT (UDP) "
+                             "or a serial device (custom mode)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run the node")
+    parser.add_argument("--warmup", type=float, default=1.0,
+                        help="Seconds after each entity is ready before counting")
+    parser.add_argument("--probe-rate", type=float, default=10.0,
+                        help="Rate of probe messages and service calls (Hz)")
+    parser.add_argument("--build-dir", help="Host build directory (default <project>/build_host)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--max-loss", type=float,
+                        help="Exit non-zero if any entity loses more than this fraction")
+    args = parser.parse_args()
+
+    try:
+        results = simulate(args.spec, args.microros_prefix, args.agent, args.duration,
+                           args.warmup, args.probe_rate, args.build_dir)
+    except (OSError, SpecError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(format_results(results["entities"], results["exited_tasks"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    failed = results["exited_tasks"] or (args.max_loss is not None and any(
+        (r.get("loss") or 0) > args.max_loss for r in results["entities"].values()))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Loading interface_graph.json, written by generate_interface_graph.py.
+
+load_interface_graph picks the fastest source available: a lazy view built
+from the graph's index, which reads a package's field trees only when they
+are first needed, then the binary cache, then the JSON itself.
+"""
+import os
+import sys
+import json
+from collections.abc import Mapping
+
+from generate_interface_graph import INDEX_VERSION, read_graph_cache
+
+INTERFACE_GRAPH_PATH = "./interface_graph.json"
+INTERFACE_INDEX_PATH = "./interface_graph.index.json"
+
+
+class LazyTypes(Mapping):
+    """Type names of one package kind; field trees are decoded on first access."""
+
+    def __init__(self, graph, pkg, kind, names):
+        self._graph = graph
+        self._pkg   = pkg
+        self._kind  = kind
+        self._names = dict.fromkeys(names)
+
+    def __getitem__(self, name):
+        if name not in self._names:
+            raise KeyError(name)
+        return self._graph.load_package(self._pkg)[self._kind][name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class LazyInterfaceGraph(Mapping):
+    """
+    Read-only view of interface_graph.json built from its index. Package and
+    type names come from the index; a package is read from its byte span in
+    the graph file the first time one of its field trees is needed.
+    """
+
+    def __init__(self, graph_path, index):
+        self._path     = graph_path
+        self._packages = index['packages']
+        self._views    = {}
+        self._loaded   = {}
+
+    def __getitem__(self, pkg):
+        if pkg not in self._views:
+            entry = self._packages[pkg]
+            self._views[pkg] = {
+                kind: LazyTypes(self, pkg, kind, entry.get(kind, []))
+                for kind in ('msg', 'srv', 'action')
+            }
+        return self._views[pkg]
+
+    def __iter__(self):
+        return iter(self._packages)
+
+    def __len__(self):
+        return len(self._packages)
+
+    def load_package(self, pkg):
+        if pkg not in self._loaded:
+            entry = self._packages[pkg]
+            with open(self._path, 'rb') as f:
+                f.seek(entry['offset'])
+                self._loaded[pkg] = json.loads(f.read(entry['length']))
+        return self._loaded[pkg]
+
+
+def load_interface_index(graph_path=INTERFACE_GRAPH_PATH, index_path=INTERFACE_INDEX_PATH):
+    """Return the graph index if it exists and matches the graph file, else None."""
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r') as f:
+        try:
+            index = json.load(f)
+        except json.JSONDecodeError:
+            return None
+    if index.get('version') != INDEX_VERSION or index.get('graph_size') != os.path.getsize(graph_path):
+        return None
+    return index
+
+
+def load_interface_graph(lazy=True, graph_path=INTERFACE_GRAPH_PATH,
+                         index_path=INTERFACE_INDEX_PATH):
+    """
+    Load the interface graph from the fastest source available: the lazy
+    index view (when `lazy`), then the binary cache, then the JSON itself.
+    """
+    if not os.path.exists(graph_path):
+        print(f"Error: Interface graph not found at {graph_path}")
+        sys.exit(1)
+    if lazy:
+        index = load_interface_index(graph_path, index_path)
+        if index is not None:
+            return LazyInterfaceGraph(graph_path, index)
+    graph = read_graph_cache(graph_path)
+    if graph is not None:
+        return graph
+    with open(graph_path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            print("Error: Failed to parse interface graph JSON.")
+            sys.exit(1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Expand types of the reference-based interface graph.
+
+interface_graph.json stores every type once; a field whose type is another
+message holds its canonical "pkg/msg/Name" instead of a copy of its fields.
+InterfaceResolver turns such a reference back into a nested field tree:
+
+    resolver = InterfaceResolver(load_interface_graph())
+    tree = resolver.expand("nav_msgs/msg/Path")
+    tree["poses"]["fields"]["pose"]["fields"]["position"]["fields"]["x"]
+"""
+
+KINDS = ("msg", "srv", "action")
+
+
+def split_type_name(type_name):
+    """Split "pkg/kind/Name" into its parts, or return None for anything else."""
+    parts = type_name.split('/')
+    if len(parts) != 3 or parts[1] not in KINDS:
+        return None
+    return tuple(parts)
+
+
+def canonical_type_name(type_name):
+    """"pkg/kind/Name" of a type, with an unresolved "pkg/Name" taken as a message."""
+    parts = type_name.split('/')
+    if len(parts) == 2:  # unresolved "pkg/Name" reference
+        parts.insert(1, 'msg')
+    return '/'.join(parts)
+
+
+class InterfaceResolver:
+    """
+    Memoized, cycle-safe expansion of graph references. Expanded trees are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+        self._memo  = {}
+
+    def lookup(self, type_name):
+        """Return the flat definition of "pkg/kind/Name", or None if unknown."""
+        parts = split_type_name(type_name)
+        if parts is None:
+            return None
+        pkg, kind, name = parts
+        try:
+            return self._graph[pkg][kind][name]
+        except KeyError:
+            return None
+
+    def expand(self, type_name, max_depth=None):
+        """
+        Return the field tree of `type_name` with nested types expanded up to
+        `max_depth` levels (all the way down when None). Messages give their
+        fields, services and actions a dict of sections. Returns None if the
+        type is not in the graph.
+        """
+        parts = split_type_name(type_name)
+        definition = self.lookup(type_name)
+        if definition is None:
+            return None
+        if parts[1] == "msg":
+            return self._expand_msg(type_name, max_depth, ())[0]
+        return {
+            section: self._expand_block(block, max_depth, (type_name,))[0]
+            for section, block in definition.items()
+        }
+
+    def _expand_msg(self, type_name, depth, stack):
+        """
+        (tree, cut): `cut` holds the types on `stack` whose recursion was cut
+        off below `type_name`. Such a tree depends on where the expansion
+        started, so only trees with nothing cut outside themselves are memoized.
+        """
+        key = (type_name, depth)
+        if key in self._memo:
+            return self._memo[key], set()
+        tree, cut = self._expand_block(self.lookup(type_name), depth, stack + (type_name,))
+        cut.discard(type_name)
+        if not cut:
+            self._memo[key] = tree
+        return tree, cut
+
+    def _expand_block(self, block, depth, stack):
+        d, cut = {}, set()
+        for field, entry in block.items():
+            entry = dict(entry)
+            nested = entry["type"]
+            if self.lookup(nested) is not None and depth != 0:
+                if nested in stack:
+                    entry["recursive"] = True
+                    cut.add(nested)
+                else:
+                    entry["fields"], nested_cut = self._expand_msg(
+                        nested, None if depth is None else depth - 1, stack)
+                    cut |= nested_cut
+            d[field] = entry
+        return d, cut
+
+def expand_type(graph, type_name, max_depth=None):
+    """One-off expansion; build an InterfaceResolver to reuse the memo."""
+    return InterfaceResolver(graph).expand(type_name, max_depth)
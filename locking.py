@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Advisory inter-process locks for state shared between generator runs:
+uros_components_config.json, .gitignore and the uros_components/ variants,
+and the file writes done under them.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` (created if missing) for the block."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_atomic(path, text):
+    """Replace `path` with `text` so readers never see a partial file."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_if_changed(path, text):
+    """
+    Write `text` to `path` unless it already holds exactly that, so build
+    systems don't see a new mtime on unchanged files. Returns True if written.
+    """
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    with open(path, 'w') as f:
+        f.write(text)
+    return True
@@ -4,29 +4,86 @@ import os
 import re
 import json
 import shutil
-from git import Repo
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import readline  # Tab completion in the type prompts
+except ImportError:
+    readline = None
+from interface_graph import load_interface_graph
+from project_spec import (
+    GROUP_DEFAULTS, SpecError, callback_group, load_spec, find_specs, spec_to_project,
+    stream_history,
+)
+from locking import file_lock, write_atomic, write_if_changed
+from artifact_cache import artifact_key, artifact_stores, is_built, sync_artifacts, toolchain_version
+from component_mirror import BASE_DIR, MIRROR_DIR, ensure_checkout
+from interface_resolver import InterfaceResolver
+from type_index import TypeIndex
+from wire_budget import format_budget, verdict, wire_budget
+from user_regions import FileState, extract_regions, merge_regions
+from template_engine import TemplateError, compile_template, load_template_file, load_template_set
+from message_memory import DEFAULT_CAPACITIES, MessageMemory
+from memory_footprint import (
+    RAM_BUDGETS, StructSizer, estimate_footprint, format_footprint,
+)
+from qos_profiles import normalize_qos, qos_depth, qos_profile_c
+from serial_transport import (
+    SERIAL_DEFAULTS, CUSTOM_TRANSPORT_MTU, serial_settings, serial_sdkconfig, check_serial_settings,
+    read_sdkconfig, update_sdkconfig,
+)
+from variant_store import (
+    materialize_variant, record_reference, collect_garbage, variant_lock_path,
+    read_variant_metadata, write_variant_metadata,
+)
 
 # Constants
 TEMPLATE_PATH            = "./uRosTemplet"
 MICRO_ROS_REPO           = "https://github.com/micro-ROS/micro_ros_espidf_component.git"
 CONFIG_FILE              = "./uros_components_config.json"
+CONFIG_LOCK              = "./uros_components_config.json.lock"
 MICRO_ROS_COMPONENTS     = "./uros_components"
+SERIAL_UTILS_PATH        = "./uros_components/serial_utils"
 GITIGNORE_PATH           = "./.gitignore"
-INTERFACE_GRAPH_PATH     = "./interface_graph.json"
 ADDITIONAL_CODES_PATH    = "./rclc_templet_init.json"
 
+# Files under TEMPLATE_PATH/main with <||Key||> placeholders
+TEMPLATED_FILES = ("main.c", "Kconfig.projbuild")
+
 # Modes
 UDP    = 1
 CUSTOM = 2
 
-# Replacement patterns for colcon.meta
+# Matches shown per search in the type prompts
+TYPE_MATCHES = 10
+
+# Main loop scheduling
+POLL  = 'poll'    # spin_some + vTaskDelay, publish every loop iteration
+TIMER = 'timer'   # each publisher runs from its own timer, executor sleeps in rclc_executor_spin
+
+# rmw_microxrcedds cmake-args in colcon.meta, set (or added) per component param
+RMW_PACKAGE = 'rmw_microxrcedds'
+RMW_CMAKE_ARGS = {
+    'transport':      'RMW_UXRCE_TRANSPORT',
+    'nodes':          'RMW_UXRCE_MAX_NODES',
+    'publishers':     'RMW_UXRCE_MAX_PUBLISHERS',
+    'subscriptions':  'RMW_UXRCE_MAX_SUBSCRIPTIONS',
+    'services':       'RMW_UXRCE_MAX_SERVICES',
+    'clients':        'RMW_UXRCE_MAX_CLIENTS',
+    'history':        'RMW_UXRCE_MAX_HISTORY',
+    'stream_history': 'RMW_UXRCE_STREAM_HISTORY',
+}
+
+# Micro XRCE-DDS client package in colcon.meta, and its MTU option per transport
+CLIENT_PACKAGE = 'microxrcedds_client'
+CLIENT_MTU_ARGS = {
+    'udp':    'UCLIENT_UDP_TRANSPORT_MTU',
+    'custom': 'UCLIENT_CUSTOM_TRANSPORT_MTU',
+}
+
+# Replacement patterns for colcon.meta (embeddedRTPS)
 REPLACEMENT_TEMPLATES = {
-    'transport':      r"(-DRMW_UXRCE_TRANSPORT=)(\w+)",
-    'publishers':     r"(-DRMW_UXRCE_MAX_PUBLISHERS=)\d+",
-    'subscriptions':  r"(-DRMW_UXRCE_MAX_SUBSCRIPTIONS=)\d+",
-    'services':       r"(-DRMW_UXRCE_MAX_SERVICES=)\d+",
-    'clients':        r"(-DRMW_UXRCE_MAX_CLIENTS=)\d+",
-    'history':        r"(-DRMW_UXRCE_MAX_HISTORY=)\d+",
     'ertps_pub':      r"(-DERTPS_MAX_PUBLISHERS=)\d+",
     'ertps_sub':      r"(-DERTPS_MAX_SUBSCRIPTIONS=)\d+",
     'ertps_srv':      r"(-DERTPS_MAX_SERVICES=)\d+",
@@ -34,10 +91,7 @@ REPLACEMENT_TEMPLATES = {
     'ertps_hist':     r"(-DERTPS_MAX_HISTORY=)\d+",
 }
 
-def load_or_init_config():
-    if not os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump({}, f, indent=4)
+def _read_config():
     with open(CONFIG_FILE, 'r') as f:
         try:
             return json.load(f)
@@ -45,44 +99,81 @@ def load_or_init_config():
             return {}
 
 
-def save_config(config):
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
+def load_or_init_config():
+    with file_lock(CONFIG_LOCK):
+        if not os.path.exists(CONFIG_FILE):
+            write_atomic(CONFIG_FILE, json.dumps({}, indent=4))
+        return _read_config()
 
 
-def load_interface_graph():
-    if not os.path.exists(INTERFACE_GRAPH_PATH):
-        print(f"Error: Interface graph not found at {INTERFACE_GRAPH_PATH}")
-        sys.exit(1)
-    with open(INTERFACE_GRAPH_PATH, 'r') as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            print("Error: Failed to parse interface graph JSON.")
-            sys.exit(1)
+def save_config(config, removed=()):
+    """
+    Merge `config` into the file under the config lock, so concurrent runs
+    don't drop each other's entries, and pick up what they added. Keys in
+    `removed` are deleted.
+    """
+    with file_lock(CONFIG_LOCK):
+        merged = _read_config() if os.path.exists(CONFIG_FILE) else {}
+        merged.update(config)
+        for key in removed:
+            merged.pop(key, None)
+            config.pop(key, None)
+        write_atomic(CONFIG_FILE, json.dumps(merged, indent=4))
+    config.update(merged)
 
 
 def update_gitignore(path_entry):
     os.makedirs(os.path.dirname(GITIGNORE_PATH), exist_ok=True)
-    with open(GITIGNORE_PATH, 'a+') as gi:
+    with file_lock(GITIGNORE_PATH + '.lock'), open(GITIGNORE_PATH, 'a+') as gi:
         gi.seek(0)
         lines = gi.read().splitlines()
-        if path_entry not in lines:
+        if path_entry not in lines and f"{path_entry}/" not in lines:
             gi.write(f"{path_entry}/\n")
 
 
-def clone_base_component(config):
-    base_dest = os.path.join(MICRO_ROS_COMPONENTS, 'base', 'micro_ros_espidf_component')
-    if not config.get('ROS_DISTRO_BASE_CLONED', False):
-        print("Cloning micro-ROS base component...")
-        Repo.clone_from(MICRO_ROS_REPO, base_dest, branch=config['ROS_DISTRO'])
-        # remove git metadata
-        for d in ['.git', '.github']:
-            p = os.path.join(base_dest, d)
-            if os.path.exists(p):
-                shutil.rmtree(p)
-        update_gitignore(os.path.relpath(base_dest))
-        config['ROS_DISTRO_BASE_CLONED'] = True
+def remove_gitignore_entries(path_prefixes):
+    """Drop the .gitignore entries at or below any of `path_prefixes`."""
+    if not path_prefixes or not os.path.exists(GITIGNORE_PATH):
+        return
+    with file_lock(GITIGNORE_PATH + '.lock'):
+        with open(GITIGNORE_PATH) as gi:
+            lines = gi.read().splitlines()
+        kept = [line for line in lines
+                if not any(line.rstrip('/') == prefix or line.startswith(prefix + '/')
+                           for prefix in path_prefixes)]
+        if kept != lines:
+            write_atomic(GITIGNORE_PATH, "".join(f"{line}\n" for line in kept))
+
+
+def pin_base_commit(distro, commit):
+    """Record `commit` as the base component commit used for `distro`."""
+    with file_lock(CONFIG_LOCK):
+        merged = _read_config() if os.path.exists(CONFIG_FILE) else {}
+        merged.setdefault('BASE_COMMITS', {})[distro] = commit
+        write_atomic(CONFIG_FILE, json.dumps(merged, indent=4))
+
+
+def clone_base_component(config, offline=False, refresh=False):
+    """
+    Check out the base component for config['ROS_DISTRO'] from the local
+    mirror at its pinned commit (see component_mirror.py). The mirror
+    fetches from config['MICRO_ROS_MIRROR'], else MICRO_ROS_REPO, only when
+    it lacks that commit, or with `refresh` for the branch's newest one.
+    """
+    distro = config['ROS_DISTRO']
+    pinned = config.get('BASE_COMMITS', {}).get(distro)
+    source = config.get('MICRO_ROS_MIRROR', MICRO_ROS_REPO)
+    if (pinned is None or refresh) and not offline:
+        print(f"Fetching micro-ROS base component ({distro}) from {source}...")
+    base_dest, commit = ensure_checkout(MICRO_ROS_COMPONENTS, source, distro, pinned,
+                                        offline, refresh)
+    # remember which commit the variants are built from
+    config['ROS_DISTRO_BASE_COMMIT'] = commit
+    if commit != pinned:
+        config.setdefault('BASE_COMMITS', {})[distro] = commit
+        pin_base_commit(distro, commit)
+    for d in (BASE_DIR, MIRROR_DIR):
+        update_gitignore(os.path.relpath(os.path.join(MICRO_ROS_COMPONENTS, d)))
     return base_dest
 
 
@@ -93,11 +184,25 @@ def prompt_target_and_create():
     return tgt
 
 
-def copy_template(tgt, project_name):
+def copy_template(tgt, project_name, update=False):
+    """
+    Copy the template project to tgt/project_name. With `update` an existing
+    project is kept and only template files it lacks are copied.
+    """
     project_path = os.path.join(tgt, project_name)
     if os.path.exists(project_path):
-        print(f"Error: Project '{project_path}' already exists.")
-        sys.exit(1)
+        if not update:
+            raise FileExistsError(f"Project '{project_path}' already exists "
+                                  "(regenerate it with --update).")
+        for dirpath, _, filenames in os.walk(TEMPLATE_PATH):
+            rel = os.path.relpath(dirpath, TEMPLATE_PATH)
+            for name in filenames:
+                dst = os.path.join(project_path, rel, name)
+                if not os.path.exists(dst):
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    shutil.copy2(os.path.join(dirpath, name), dst)
+        print(f"Updating {project_path}")
+        return project_path
     shutil.copytree(TEMPLATE_PATH, project_path)
     print(f"Template copied to {project_path}")
     return project_path
@@ -118,134 +223,376 @@ def prompt_project_details():
     while mode not in (UDP, CUSTOM):
         mode = int(input("Mode (1=UDP, 2=Custom): "))
     details['mode'] = mode
+    if mode == CUSTOM:
+        details['serial'] = prompt_serial()
+    scheduling = None
+    while scheduling not in ('1', '2'):
+        scheduling = input("Scheduling (1=Poll loop, 2=Timer per publisher): ")
+    details['scheduling'] = POLL if scheduling == '1' else TIMER
+    details['message_memory'] = {
+        'sequence': int(input(f"Sequence capacity [{DEFAULT_CAPACITIES['sequence']}]: ")
+                        or DEFAULT_CAPACITIES['sequence']),
+        'string':   int(input(f"String capacity [{DEFAULT_CAPACITIES['string']}]: ")
+                        or DEFAULT_CAPACITIES['string']),
+        'fields':   {},
+    }
+    details['callback_groups'] = []
+    for idx in range(int(input("Callback groups (0 = single executor): ") or 0)):
+        details['callback_groups'].append(prompt_callback_group(idx, details['callback_groups']))
     return details
 
 
-def generate_component_code(details):
-    return f"micro_{details['mode']}{details['publisher_count']}{details['subscriber_count']}{details['service_count']}{details['client_count']}{details['max_history']}"
+def prompt_callback_group(idx, groups):
+    """One callback group, each answer asked again until project_spec accepts it."""
+    where = f"Group {idx+1}"
+    group = None
+    while group is None:
+        try:
+            group = callback_group({'name': input(f" {where} name: ")}, where, groups)
+        except SpecError as e:
+            print(f"Error: {e}")
+    for key, label in (('core', "core (0/1)"), ('priority', "task priority"),
+                       ('stack', "stack (Bytes)")):
+        while True:
+            try:
+                value = int(input(f" {where} {label} [{GROUP_DEFAULTS[key]}]: ")
+                            or GROUP_DEFAULTS[key])
+                group = callback_group({**group, key: value}, where, groups)
+                break
+            except ValueError as e:
+                print(f"Error: {e}")
+    return group
+
+
+def prompt_serial():
+    """Serial transport settings for CUSTOM mode; Enter keeps a default."""
+    serial = {}
+    interface = None
+    while interface not in ('', '1', '2'):
+        interface = input("Serial interface (1=UART, 2=USB Serial/JTAG) [1]: ")
+    serial['interface'] = 'usb_jtag' if interface == '2' else 'uart'
+    if serial['interface'] == 'uart':
+        serial['port']     = int(input(f"UART port [{SERIAL_DEFAULTS['port']}]: ")
+                                 or SERIAL_DEFAULTS['port'])
+        serial['baudrate'] = int(input(f"Baud rate [{SERIAL_DEFAULTS['baudrate']}]: ")
+                                 or SERIAL_DEFAULTS['baudrate'])
+        serial['pins'] = {
+            pin: int(input(f"{pin.upper()} pin [-1]: ") or -1) for pin in ('tx', 'rx')
+        }
+    return serial
+
+
+def component_params(config, details):
+    """
+    Every input that affects the micro-ROS library built for a variant. The
+    entity limits are the exact counts, but never 0: the rmw static memory
+    pools are C arrays of that size.
+    """
+    params = {
+        'distro':         config.get('ROS_DISTRO'),
+        'base_commit':    config.get('ROS_DISTRO_BASE_COMMIT', 'unknown'),
+        'transport':      'custom' if details['mode'] == CUSTOM else 'udp',
+        'nodes':          1,
+        'publishers':     max(1, details['publisher_count']),
+        'subscriptions':  max(1, details['subscriber_count']),
+        'services':       max(1, details['service_count']),
+        'clients':        max(1, details['client_count']),
+        'history':        max(1, details['max_history'], details.get('qos_depth', 0)),
+        'stream_history': stream_history(details),
+        'timers':         details['max_timers'],
+    }
+    if details.get('mtu'):
+        params['mtu'] = details['mtu']
+    if details.get('callback_groups'):
+        # executors spinning in several tasks share the XRCE session
+        params['multithread'] = True
+    return params
+
+
+def set_cmake_arg(args, name, value):
+    """Replace -D<name>=... in a cmake-args list, or append it."""
+    prefix = f"-D{name}="
+    for i, arg in enumerate(args):
+        if arg.startswith(prefix):
+            args[i] = f"{prefix}{value}"
+            return
+    args.append(f"{prefix}{value}")
+
+
+def patch_colcon_meta(text, params):
+    """Apply the variant's middleware limits to the base colcon.meta text."""
+    repls = {
+        REPLACEMENT_TEMPLATES['ertps_pub']: params['publishers'],
+        REPLACEMENT_TEMPLATES['ertps_sub']: params['subscriptions'],
+        REPLACEMENT_TEMPLATES['ertps_srv']: params['services'],
+        REPLACEMENT_TEMPLATES['ertps_cli']: params['clients'],
+        REPLACEMENT_TEMPLATES['ertps_hist']: params['history'],
+    }
+    for pat, val in repls.items():
+        text = re.sub(pat, fr"\g<1>{val}", text)
+
+    meta = json.loads(text)
+    args = meta.setdefault('names', {}).setdefault(RMW_PACKAGE, {}).setdefault('cmake-args', [])
+    for key, name in RMW_CMAKE_ARGS.items():
+        set_cmake_arg(args, name, params[key])
+    args = meta['names'].setdefault(CLIENT_PACKAGE, {}).setdefault('cmake-args', [])
+    if params.get('multithread'):
+        set_cmake_arg(args, 'UCLIENT_PROFILE_MULTITHREAD', 'ON')
+    if params.get('mtu'):
+        set_cmake_arg(args, CLIENT_MTU_ARGS[params['transport']], params['mtu'])
+    return json.dumps(meta, indent=4) + "\n"
+
+
+def generate_component_code(params):
+    """Canonical cache key: a hash over the sorted, serialized `params`."""
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return f"micro_{hashlib.sha256(canonical.encode()).hexdigest()[:16]}"
 
 
 def prepare_component(config, base_dest, details):
-    comp_code = generate_component_code(details)
+    """
+    Create (once) the component variant for `details`: a reflinked or
+    hardlinked view of the base component with its own colcon.meta and a
+    metadata file recording the parameters it was built for. Runs under a
+    per-variant lock and builds into a temporary directory that is renamed
+    into place, so concurrent generators never see a half-built variant.
+    """
+    params = component_params(config, details)
+    comp_code = generate_component_code(params)
     rel_dest = os.path.join(MICRO_ROS_COMPONENTS, comp_code, 'micro_ros_espidf_component')
     abs_dest = os.path.abspath(rel_dest)
-    if not config.get(comp_code, False):
-        shutil.copytree(base_dest, abs_dest)
-        update_gitignore(os.path.relpath(abs_dest))
-        # edit colcon.meta
-        meta_path = os.path.join(abs_dest, 'colcon.meta')
-        text = open(meta_path).read()
-        repls = {
-            REPLACEMENT_TEMPLATES['transport']: ('custom' if details['mode']==CUSTOM else 'udp'),
-            REPLACEMENT_TEMPLATES['publishers']: details['publisher_count'],
-            REPLACEMENT_TEMPLATES['subscriptions']: details['subscriber_count'],
-            REPLACEMENT_TEMPLATES['services']: details['service_count'],
-            REPLACEMENT_TEMPLATES['clients']: details['client_count'],
-            REPLACEMENT_TEMPLATES['history']: details['max_history'],
-            REPLACEMENT_TEMPLATES['ertps_pub']: details['publisher_count'],
-            REPLACEMENT_TEMPLATES['ertps_sub']: details['subscriber_count'],
-            REPLACEMENT_TEMPLATES['ertps_srv']: details['service_count'],
-            REPLACEMENT_TEMPLATES['ertps_cli']: details['client_count'],
-            REPLACEMENT_TEMPLATES['ertps_hist']: details['max_history'],
-        }
-        for pat, val in repls.items():
-            text = re.sub(pat, fr"\g<1>{val}", text)
-        with open(meta_path, 'w') as mf:
-            mf.write(text)
-        config[comp_code] = True
+    variant_root = os.path.dirname(abs_dest)
+    with file_lock(variant_lock_path(MICRO_ROS_COMPONENTS, comp_code)):
+        if os.path.isdir(abs_dest):
+            meta = read_variant_metadata(variant_root)
+            if meta is None or meta['params'] != params:
+                raise RuntimeError(
+                    f"Component variant {variant_root} doesn't match its key; "
+                    "remove it and generate again")
+        else:
+            tmp_dest = f"{abs_dest}.tmp{os.getpid()}"
+            shutil.rmtree(tmp_dest, ignore_errors=True)
+            materialize_variant(base_dest, tmp_dest)
+            # edit colcon.meta
+            meta_path = os.path.join(tmp_dest, 'colcon.meta')
+            text = patch_colcon_meta(open(meta_path).read(), params)
+            with open(meta_path, 'w') as mf:
+                mf.write(text)
+            write_variant_metadata(variant_root, comp_code, params, text)
+            os.rename(tmp_dest, abs_dest)
+        status = sync_component_artifacts(config, params, abs_dest)
+        if status:
+            print(f"Prebuilt libmicroros.a {status}")
+        if not config.get(comp_code, False):
+            update_gitignore(os.path.relpath(abs_dest))
+            config[comp_code] = True
+            save_config({comp_code: True})
     return abs_dest, comp_code
 
 
+def artifact_toolchain(config):
+    """(IDF target, toolchain version) that prebuilt libraries are keyed by; version may be None."""
+    target = read_sdkconfig(os.path.join(TEMPLATE_PATH, 'sdkconfig')).get('CONFIG_IDF_TARGET', 'esp32')
+    return target, config.get('TOOLCHAIN_VERSION') or toolchain_version(target)
+
+
+def sync_component_artifacts(config, params, comp_dest):
+    """
+    Drop the variant's prebuilt libmicroros.a and include tree in from the
+    artifact cache, or store them there once the variant has been built
+    (see artifact_cache.py). Needs the ESP-IDF toolchain on PATH, or
+    TOOLCHAIN_VERSION in the config file, to key the entry; None otherwise.
+    """
+    target, toolchain = artifact_toolchain(config)
+    if toolchain is None:
+        return None
+    with open(os.path.join(comp_dest, 'colcon.meta')) as f:
+        key = artifact_key(f.read(), params, target, toolchain)
+    return sync_artifacts(artifact_stores(config), key, comp_dest,
+                          {'params': params, 'idf_target': target, 'toolchain': toolchain})
+
+
+def store_artifacts(config):
+    """Store the library of every built component variant in the artifact cache."""
+    if artifact_toolchain(config)[1] is None:
+        raise RuntimeError("No ESP-IDF toolchain found; run from an ESP-IDF shell "
+                           "or set TOOLCHAIN_VERSION in the config file")
+    for comp_code in sorted(os.listdir(MICRO_ROS_COMPONENTS)):
+        variant_root = os.path.join(MICRO_ROS_COMPONENTS, comp_code)
+        comp_dest    = os.path.join(variant_root, 'micro_ros_espidf_component')
+        meta = read_variant_metadata(variant_root)
+        if meta is None or not is_built(comp_dest):
+            continue
+        with file_lock(variant_lock_path(MICRO_ROS_COMPONENTS, comp_code)):
+            status = sync_component_artifacts(config, meta['params'], comp_dest)
+        print(f"{comp_code}: {status or 'already cached'}")
+
+
+def serial_transport_settings(config, details):
+    """
+    Serial settings of a CUSTOM mode project with defaults filled in, ring
+    buffers sized for the variant's stream history and checked against the
+    template's sdkconfig; None for UDP projects.
+    """
+    if details['mode'] != CUSTOM:
+        return None
+    try:
+        settings = serial_settings(details.get('serial'),
+                                   component_params(config, details)['stream_history'],
+                                   details.get('mtu') or CUSTOM_TRANSPORT_MTU)
+        check_serial_settings(settings, read_sdkconfig(os.path.join(TEMPLATE_PATH, 'sdkconfig')))
+    except ValueError as e:
+        raise RuntimeError(f"Serial transport: {e}")
+    return settings
+
+
+def configure_serial_transport(project_path, settings):
+    """Write the transport options into the project's sdkconfig and link serial_utils."""
+    update_sdkconfig(os.path.join(project_path, 'sdkconfig'), serial_sdkconfig(settings))
+    link_path = os.path.join(project_path, 'components', 'serial_utils')
+    os.makedirs(os.path.dirname(link_path), exist_ok=True)
+    if not os.path.exists(link_path):
+        os.symlink(os.path.abspath(SERIAL_UTILS_PATH), link_path)
+        print(f"Linked serial transport at {link_path}")
+
+
 def link_component(project_path, comp_dest):
     link_path = os.path.join(project_path, 'components', 'micro_ros_espidf_component')
     os.makedirs(os.path.dirname(link_path), exist_ok=True)
-    if not os.path.exists(link_path):
+    if not os.path.lexists(link_path):
         os.symlink(comp_dest, link_path)
         print(f"Linked component at {link_path}")
-
-
-def prompt_publishers(interface_graph, details):
+    elif os.path.islink(link_path) and os.readlink(link_path) != comp_dest:
+        # an updated project whose entities now need another variant
+        tmp_link = f"{link_path}.tmp{os.getpid()}"
+        os.symlink(comp_dest, tmp_link)
+        os.replace(tmp_link, link_path)
+        print(f"Relinked component at {link_path}")
+    variant_root = os.path.dirname(comp_dest)
+    with file_lock(variant_lock_path(MICRO_ROS_COMPONENTS, os.path.basename(variant_root))):
+        record_reference(variant_root, project_path)
+
+
+def gc_components(config, dry_run=False):
+    """Delete component variants that no generated project links to anymore."""
+    removed = collect_garbage(MICRO_ROS_COMPONENTS, dry_run)
+    for comp_code in removed:
+        print(f"{'Would remove' if dry_run else 'Removed'} unused variant {comp_code}")
+    if not dry_run:
+        save_config(config, removed)
+        remove_gitignore_entries([os.path.relpath(os.path.join(MICRO_ROS_COMPONENTS, comp_code))
+                                  for comp_code in removed])
+    if not removed:
+        print("No unused component variants")
+
+
+def prompt_qos():
+    """A QoS preset suffix, or a full profile when 'c' is picked."""
+    qos = None
+    while qos not in ('b', 'r', 'c'):
+        qos = input("QoS (b = BestEffort, r = Reliable, c = Custom profile): ").lower()
+    if qos != 'c':
+        return 'best_effort' if qos == 'b' else 'default'
+    while True:
+        try:
+            return normalize_qos({
+                'reliability': 'best_effort' if input("  Best effort? (y/N): ").lower() == 'y'
+                               else 'reliable',
+                'depth':       int(input("  History depth (Enter = default): ") or 0) or None,
+                'durability':  'transient_local'
+                               if input("  Transient local? (y/N): ").lower() == 'y'
+                               else 'volatile',
+                'deadline_ms': float(input("  Deadline ms (Enter = none): ") or 0) or None,
+            })
+        except ValueError as e:
+            print(f"  {e}")
+
+
+def _complete_types(type_index, kind):
+    def complete(text, state):
+        matches = type_index.complete(text, kind)
+        return matches[state] if state < len(matches) else None
+    return complete
+
+
+def prompt_type(type_index, kind):
+    """A 'pkg/<kind>/Name', found by searching the type index as you type."""
+    if readline is not None:
+        readline.set_completer(_complete_types(type_index, kind))
+        readline.set_completer_delims(' ')
+        readline.parse_and_bind('tab: complete')
+    label = 'Message' if kind == 'msg' else 'Service'
+    try:
+        query = input(f"  {label} type (name or part of it, Tab completes, Enter lists packages): ")
+        while True:
+            query = query.strip()
+            if not query:
+                print("   " + ", ".join(type_index.packages(kind)))
+            elif type_index.resolve(query, kind):
+                return type_index.resolve(query, kind)
+            else:
+                matches = type_index.search(query, kind, TYPE_MATCHES)
+                if not matches:
+                    print(f"   no {kind} type matches '{query}'")
+                else:
+                    for i, name in enumerate(matches, 1):
+                        print(f"    {i}) {name}")
+                    choice = input("  Select (number, Enter = 1, or search again): ").strip()
+                    if not choice:
+                        return matches[0]
+                    if choice.isdigit() and 1 <= int(choice) <= len(matches):
+                        return matches[int(choice) - 1]
+                    query = choice
+                    continue
+            query = input(f"  {label} type: ")
+    finally:
+        if readline is not None:
+            readline.set_completer(None)
+
+
+def prompt_publishers(type_index, details):
     pubs = []
     print("\nDefine your publishers:")
-    pkg_list = [k for k,v in interface_graph.items() if v.get('msg')]
     for idx in range(details['publisher_count']):
         name = input(f" Publisher {idx+1} name: ")
-        for i, pkg in enumerate(pkg_list, 1):
-            print(f"  {i}) {pkg}")
-        pidx = int(input("Select package: ")) - 1
-        pkg = pkg_list[pidx]
-
-        msgs = list(interface_graph[pkg]['msg'].keys())
-        for i, m in enumerate(msgs, 1):
-            print(f"    {i}) {m}")
-        midx = int(input("Select message type: ")) - 1
-
-        qos = None
-        while qos not in ('b', 'r'):
-            qos = input("QoS (b = BestEffort, r = Reliable): ").lower()
-
-        qos_str = 'best_effort' if qos == 'b' else 'default'
-        pubs.append((name, f"{pkg}/msg/{msgs[midx]}", qos_str))
+        typ  = prompt_type(type_index, 'msg')
+        qos_str = prompt_qos()
+        rate = None
+        if details.get('scheduling') == TIMER:
+            rate = float(input("Publish rate (Hz): "))
+        pubs.append((name, typ, qos_str, rate))
     return pubs
 
 
-def prompt_subscriptions(interface_graph, details):
+def prompt_subscriptions(type_index, details):
     sub = []
     print("\nDefine your subscriptions:")
-    pkg_list = [k for k,v in interface_graph.items() if v.get('msg')]
     for idx in range(details['subscriber_count']):
         name = input(f" Subscription {idx+1} name: ")
-        for i, pkg in enumerate(pkg_list, 1):
-            print(f"  {i}) {pkg}")
-        pidx = int(input("Select package: ")) - 1
-        pkg = pkg_list[pidx]
-
-        msgs = list(interface_graph[pkg]['msg'].keys())
-        for i, m in enumerate(msgs, 1):
-            print(f"    {i}) {m}")
-        midx = int(input("Select message type: ")) - 1
-
-        qos = None
-        while qos not in ('b', 'r'):
-            qos = input("QoS (b = BestEffort, r = Reliable): ").lower()
-
-        qos_str = 'best_effort' if qos == 'b' else 'default'
-        sub.append((name, f"{pkg}/msg/{msgs[midx]}", qos_str))
+        typ  = prompt_type(type_index, 'msg')
+        sub.append((name, typ, prompt_qos()))
     return sub
 
 
-def prompt_services(interface_graph, details):
+def prompt_services(type_index, details):
     srvs = []
     print("\nDefine your services:")
-    pkg_list = [k for k, v in interface_graph.items() if v.get('srv')]
     for idx in range(details['service_count']):
         name = input(f" Service {idx+1} name: ")
-        for i, pkg in enumerate(pkg_list, 1):
-            print(f"  {i}) {pkg}")
-        pidx = int(input("Select package: ")) - 1
-        pkg = pkg_list[pidx]
-        srvs_list = list(interface_graph[pkg]['srv'].keys())
-        for i, s in enumerate(srvs_list, 1):
-            print(f"    {i}) {s}")
-        sidx = int(input("Select service type: ")) - 1
-        srvs.append((name, f"{pkg}/srv/{srvs_list[sidx]}"))
+        srvs.append((name, prompt_type(type_index, 'srv'), prompt_qos()))
     return srvs
 
-def prompt_clients(interface_graph, details):
+def prompt_clients(type_index, details):
     clis = []
     print("\nDefine your clients:")
-    pkg_list = [k for k, v in interface_graph.items() if v.get('srv')]
     for idx in range(details['client_count']):
         name = input(f" Client {idx+1} name: ")
-        for i, pkg in enumerate(pkg_list, 1):
-            print(f"  {i}) {pkg}")
-        pidx = int(input("Select package: ")) - 1
-        pkg = pkg_list[pidx]
-        srvs_list = list(interface_graph[pkg]['srv'].keys())
-        for i, s in enumerate(srvs_list, 1):
-            print(f"    {i}) {s}")
-        sidx = int(input("Select service type: ")) - 1
-        clis.append((name, f"{pkg}/srv/{srvs_list[sidx]}"))
+        typ  = prompt_type(type_index, 'srv')
+        qos_str = prompt_qos()
+        rate = None
+        if details.get('scheduling') == TIMER:
+            rate = float(input("Request rate (Hz): "))
+        clis.append((name, typ, qos_str, rate))
     return clis
 
 
@@ -258,6 +605,24 @@ def prompt_timers(details):
         timers.append((name, rate))
     return timers
 
+def prompt_callback_groups(details, pubs, subs, srvs, clis, tmrs):
+    """Assign each entity's handler to one of the callback groups, or the default executor."""
+    groups = details.get('callback_groups')
+    if not groups:
+        return
+    print("\nAssign callback groups (Enter = default executor):")
+    for i, g in enumerate(groups, 1):
+        print(f"  {i}) {g['name']}")
+    handlers = ([f"{e[0]}_publisher" for e in pubs] + [f"{e[0]}_subscription" for e in subs]
+                + [f"{e[0]}_service" for e in srvs] + [f"{e[0]}_client" for e in clis]
+                + [f"{e[0]}_timer" for e in tmrs])
+    for handler in handlers:
+        choice = None
+        while choice not in [''] + [str(i) for i in range(1, len(groups) + 1)]:
+            choice = input(f" {handler}: ").strip()
+        if choice:
+            groups[int(choice) - 1]['members'].append(handler)
+
 def transform_path(input_str):
     parts = input_str.strip().split('/')
     if len(parts) != 3:
@@ -279,44 +644,136 @@ def transform_variable(input_str):
     return f"{head}__{mid}__{tail}"
 
 def load_additional_templates(path=ADDITIONAL_CODES_PATH):
+    """The compiled snippet templates, reloaded only when the file changes."""
     if not os.path.exists(path):
         print(f"Error: templates not found at {path}")
         sys.exit(1)
-    with open(path, 'r') as f:
-        return json.load(f)
+    return load_template_set(path)
+
+def fill_template(template, mapping: dict) -> str:
+    """
+    Replace each <||Key||> in `template` (a Template or its text) with
+    mapping[Key]. Raises TemplateError if a key has no value.
+    """
+    if isinstance(template, str):
+        template = compile_template(template)
+    return template.render(mapping)
+
+def timer_period_expr(rate_hz):
+    """C expression for the period of a `rate_hz` timer, in nanoseconds."""
+    period_us = round(1e6 / rate_hz)
+    if period_us % 1000 == 0:
+        return f"RCL_MS_TO_NS({period_us // 1000})"
+    return f"RCL_US_TO_NS({period_us})"
+
+# per-executor snippet lists, kept for the default executor and every callback group
+EXECUTOR_KEYS = ('sub_adds', 'srv_adds', 'cli_adds', 'timer_adds',
+                 'pub_calls', 'cli_sends', 'cli_takes')
+
+
+def executor_handles(blocks):
+    """Handles an executor needs: one per callback added to it (rclc rejects 0)."""
+    return max(1, sum(len(blocks[k]) for k in ('sub_adds', 'srv_adds', 'cli_adds', 'timer_adds')))
+
+
+def spin_loop(tpl, blocks, executor, scheduling, rates):
+    """The loop servicing `executor`, given its snippet lists and timer rates."""
+    if scheduling == TIMER:
+        # wake at least as often as the fastest timer to service the session
+        return fill_template(tpl['spin_timer'], {
+            "Executor":    executor,
+            "SpinTimeout": timer_period_expr(max(rates, default=10.0))
+        })
+    return fill_template(tpl['spin_poll'], {
+        "Executor":       executor,
+        "ExamplePublish": "\n\n".join(blocks['pub_calls']
+                                      + blocks['cli_sends']
+                                      + blocks['cli_takes'])
+    })
+
+
+def group_config(group, setting):
+    """Kconfig symbol (without CONFIG_) of a callback group setting."""
+    return f"MICRO_ROS_{group['name'].upper()}_{setting}"
 
-def fill_template(template: str, mapping: dict) -> str:
-    """Replace each <||Key||> in `template` with mapping[Key]."""
-    def repl(m):
-        key = m.group(1)
-        return str(mapping.get(key, f"<unknown:{key}>"))
-    return re.sub(r'<\|\|(.+?)\|\|>', repl, template)
 
 def generate_init_and_callback_codes(
-    publishers, subscriptions, services, clients, timers
+    publishers, subscriptions, services, clients, timers, tpl=None, scheduling=POLL,
+    interface_graph=None, capacities=None, callback_groups=()
 ):
-    tpl = load_additional_templates()
+    """
+    Render every rclc snippet for the entities. With TIMER scheduling each
+    publisher gets a timer at its rate that publishes from the executor,
+    clients send requests from a timer at their rate and take responses
+    through executor callbacks, and the main loop
+    blocks in rclc_executor_spin instead of polling. Given the interface
+    graph, message variables with strings or sequences also get static
+    backing buffers sized by `capacities` (see message_memory).
+
+    Entities whose handler (e.g. "imu_publisher", "tick_timer") is a member
+    of one of `callback_groups` are added to that group's executor, which
+    spins in its own FreeRTOS task; everything else stays on the default
+    executor in micro_ros_task.
+    """
+    if tpl is None:
+        tpl = load_additional_templates()
+    group_of = {member: g['name'] for g in callback_groups for member in g['members']}
+    groups   = {g['name']: {k: [] for k in EXECUTOR_KEYS} for g in callback_groups}
+
+    def blocks_for(group):
+        return groups[group] if group else codes
+
+    def executor_for(group):
+        return f"{group}_executor" if group else "executor"
+
+    def init_template(tpl_key, qos, handler):
+        """The rclc preset init for a preset `qos`, else rclc_*_init with a static profile."""
+        if isinstance(qos, dict):
+            codes['var_decls'].append(qos_profile_c(f"{handler}_qos", qos))
+            footprint['qos_profiles'] += 1
+            return tpl[f"{tpl_key}_qos"], {"QosProfile": f"{handler}_qos"}
+        return tpl[tpl_key], {"Reliability": qos}
+
+    memory = resolver = None
+    if interface_graph is not None:
+        resolver = InterfaceResolver(interface_graph)
+        memory   = MessageMemory(resolver, capacities)
+
+    def add_memory(var, type_name, section=None):
+        footprint['messages'].append((type_name, section))
+        if memory is None:
+            return
+        block = resolver.lookup(type_name)
+        if block is not None:
+            memory.add(var, block if section is None else block[section])
+
     # include a new key 'var_decls' for all declarations
     codes = {k: [] for k in (
         'var_decls',
         'pub_inits','pub_calls',
         'sub_inits','sub_adds','sub_callbacks',
         'srv_inits','srv_adds','srv_callbacks',
-        'cli_inits','cli_sends','cli_takes',
+        'cli_inits','cli_sends','cli_takes','cli_adds','cli_callbacks',
         'timer_inits','timer_adds','timer_callbacks'
     )}
+    # inputs of the static RAM estimate (see memory_footprint)
+    footprint = {'messages': [], 'qos_profiles': 0}
+    # timers driving the executors: (name, rate, callback template, extra mapping, group)
+    loop_timers = [(name, rate, 'call_back_timer', {}, group_of.get(f"{name}_timer"))
+                   for name, rate in timers]
 
     # Optional: track data_variable_declarations
     data_variable_declarations = {}
 
     # --- Publishers ---
-    for name, msg_type, reliability in publishers:
+    for name, msg_type, reliability, rate in publishers:
         handler    = f"{name}_publisher"
         msg_var    = f"{name}_msg"
         base_type  = transform_variable(msg_type)
         # 1) declare handler and msg variable
         codes['var_decls'].append(f"rcl_publisher_t   {handler};")
         codes['var_decls'].append(f"{base_type} {msg_var};")
+        add_memory(msg_var, msg_type)
         # 2) track data_variable_declarations
         key = transform_variable(msg_type)
         data_variable_declarations.setdefault(key, []).append(msg_var)
@@ -329,12 +786,17 @@ def generate_init_and_callback_codes(
             "MsgName":       msg_var,
             "Reliability":   reliability
         }
+        group = group_of.get(handler)
+        init_tpl, qos_mapping = init_template('rcl_publisher_t', reliability, handler)
         codes['pub_inits'].append(
-            fill_template(tpl['rcl_publisher_t'], mapping)
-        )
-        codes['pub_calls'].append(
-            fill_template(tpl['publish_data'], mapping)
+            fill_template(init_tpl, {**mapping, **qos_mapping})
         )
+        if scheduling == TIMER:
+            loop_timers.append((f"{name}_pub", rate, 'call_back_publish_timer', mapping, group))
+        else:
+            blocks_for(group)['pub_calls'].append(
+                fill_template(tpl['publish_data'], mapping)
+            )
 
     # --- Subscriptions ---
     for name, msg_type, reliability in subscriptions:
@@ -344,6 +806,7 @@ def generate_init_and_callback_codes(
         base_type = transform_variable(msg_type)
         codes['var_decls'].append(f"rcl_subscription_t {handler};")
         codes['var_decls'].append(f"{base_type} {msg_var};")
+        add_memory(msg_var, msg_type)
         key = transform_variable(msg_type)
         data_variable_declarations.setdefault(key, []).append(msg_var)
         mapping = {
@@ -353,12 +816,14 @@ def generate_init_and_callback_codes(
             "TopicTypeComa": msg_type.replace('/', ', '),
             "MsgName":       msg_var,
             "CallBackName":  cb_name,
-            "Reliability":   reliability
+            "Reliability":   reliability,
+            "Executor":      executor_for(group_of.get(handler))
         }
+        init_tpl, qos_mapping = init_template('rcl_subscription_t', reliability, handler)
         codes['sub_inits'].append(
-            fill_template(tpl['rcl_subscription_t'], mapping)
+            fill_template(init_tpl, {**mapping, **qos_mapping})
         )
-        codes['sub_adds'].append(
+        blocks_for(group_of.get(handler))['sub_adds'].append(
             fill_template(tpl['handler_subscription'], mapping)
         )
         codes['sub_callbacks'].append(
@@ -366,7 +831,7 @@ def generate_init_and_callback_codes(
         )
 
     # --- Services ---
-    for name, srv_type in services:
+    for name, srv_type, qos in services:
         handler  = f"{name}_service"
         req_var  = f"{name}_request"
         res_var  = f"{name}_response"
@@ -379,6 +844,8 @@ def generate_init_and_callback_codes(
         codes['var_decls'].append(
             f"{srv_type.replace('/', '__')}_Response {res_var};"
         )
+        add_memory(req_var, srv_type, 'request')
+        add_memory(res_var, srv_type, 'response')
         key = transform_variable(srv_type)
         data_variable_declarations.setdefault(key, []).extend(
             [req_var, res_var]
@@ -390,12 +857,14 @@ def generate_init_and_callback_codes(
             "ServiceTypeComa":   srv_type.replace('/', ', '),
             "RequestMsg":    req_var,
             "ResponseMsg":   res_var,
-            "CallBackName":  cb_name
+            "CallBackName":  cb_name,
+            "Executor":      executor_for(group_of.get(handler))
         }
+        init_tpl, qos_mapping = init_template('rcl_service_t', qos, handler)
         codes['srv_inits'].append(
-            fill_template(tpl['rcl_service_t'], mapping)
+            fill_template(init_tpl, {**mapping, **qos_mapping})
         )
-        codes['srv_adds'].append(
+        blocks_for(group_of.get(handler))['srv_adds'].append(
             fill_template(tpl['handler_service'], mapping)
         )
         codes['srv_callbacks'].append(
@@ -403,7 +872,7 @@ def generate_init_and_callback_codes(
         )
 
     # --- Clients ---
-    for name, srv_type in clients:
+    for name, srv_type, qos, rate in clients:
         handler  = f"{name}_client"
         req_var  = f"{name}_request"
         res_var  = f"{name}_response"
@@ -415,6 +884,8 @@ def generate_init_and_callback_codes(
         codes['var_decls'].append(
             f"{srv_type.replace('/', '__')}_Response {res_var};"
         )
+        add_memory(req_var, srv_type, 'request')
+        add_memory(res_var, srv_type, 'response')
         key = transform_variable(srv_type)
         data_variable_declarations.setdefault(key, []).extend(
             [req_var, res_var]
@@ -422,41 +893,118 @@ def generate_init_and_callback_codes(
         mapping = {
             "HandlerObject": handler,
             "ServiceName":   name,
-            "ServiceType":   srv_type,
+            "ServiceType":   transform_variable(srv_type),
             "ServiceTypeComa":   srv_type.replace('/', ', '),
             "RequestMsg":    req_var,
-            "ResponseMsg":   res_var
+            "ResponseMsg":   res_var,
+            "CallBackName":  f"{name}_client_callback",
+            "Executor":      executor_for(group_of.get(handler))
         }
+        blocks = blocks_for(group_of.get(handler))
+        init_tpl, qos_mapping = init_template('rcl_client_t', qos, handler)
         codes['cli_inits'].append(
-            fill_template(tpl['rcl_client_t'], mapping)
-        )
-        codes['cli_sends'].append(
-            fill_template(tpl['client_send'], mapping)
-        )
-        codes['cli_takes'].append(
-            fill_template(tpl['client_take'], mapping)
+            fill_template(init_tpl, {**mapping, **qos_mapping})
         )
+        if scheduling == TIMER:
+            blocks['cli_adds'].append(
+                fill_template(tpl['handler_client'], mapping)
+            )
+            codes['cli_callbacks'].append(
+                fill_template(tpl['call_back_client'], mapping)
+            )
+            # requests go out from a timer of their own
+            loop_timers.append((f"{name}_send", rate, 'call_back_client_send_timer', mapping,
+                                group_of.get(handler)))
+        else:
+            blocks['cli_sends'].append(
+                fill_template(tpl['client_send'], mapping)
+            )
+            blocks['cli_takes'].append(
+                fill_template(tpl['client_take'], mapping)
+            )
 
     # --- Timers ---
-    for name, rate in timers:
+    timer_rates = {}
+    for name, rate, callback_tpl, extra, group in loop_timers:
         handler = f"{name}_timer"
         cb_name = f"{name}_timer_callback"
         codes['var_decls'].append(f"rcl_timer_t      {handler};")
         mapping = {
             "HandlerObject": handler,
             "TimerRate":     rate,
-            "CallBackName":  cb_name
+            "TimerPeriod":   timer_period_expr(rate),
+            "CallBackName":  cb_name,
+            "Executor":      executor_for(group)
         }
+        timer_rates.setdefault(group, []).append(rate)
         codes['timer_inits'].append(
             fill_template(tpl['rcl_timer_t'], mapping)
         )
-        codes['timer_adds'].append(
+        blocks_for(group)['timer_adds'].append(
             fill_template(tpl['handler_timer'], mapping)
         )
         codes['timer_callbacks'].append(
-            fill_template(tpl['call_back_timer'], mapping)
+            fill_template(tpl[callback_tpl], {**extra, "CallBackName": cb_name})
         )
 
+    # one executor handle per subscription, service, executor-driven client
+    # and timer
+    codes['executor_handles'] = executor_handles(codes)
+
+    # --- Main loop ---
+    codes['spin_loop'] = spin_loop(tpl, codes, "executor", scheduling, timer_rates.get(None, []))
+
+    # --- Callback groups: one executor and pinned task each ---
+    codes['group_inits'] = []
+    codes['task_functions'] = []
+    codes['task_creates'] = []
+    codes['group_configs'] = []
+    for group in callback_groups:
+        name     = group['name']
+        blocks   = groups[name]
+        executor = executor_for(name)
+        mapping  = {
+            "GroupName":    name,
+            "Executor":     executor,
+            "TaskName":     f"{name}_executor_task",
+            "TaskHandle":   f"{name}_task_handle",
+            "Handles":      executor_handles(blocks),
+            "StackConfig":  group_config(group, 'STACK'),
+            "PrioConfig":   group_config(group, 'PRIO'),
+            "CoreConfig":   group_config(group, 'CORE'),
+            "Stack":        group['stack'],
+            "Priority":     group['priority'],
+            "Core":         group['core'],
+        }
+        codes['var_decls'].append(f"static rclc_executor_t {executor};")
+        codes['var_decls'].append(f"static TaskHandle_t {mapping['TaskHandle']};")
+        codes['group_inits'].append("\n".join(
+            [fill_template(tpl['executor_init'], mapping)]
+            + [add for k in ('sub_adds', 'srv_adds', 'cli_adds', 'timer_adds')
+               for add in blocks[k]]))
+        codes['task_functions'].append(fill_template(tpl['executor_task'], {
+            **mapping,
+            "SpinLoop": spin_loop(tpl, blocks, executor, scheduling, timer_rates.get(name, []))
+        }))
+        codes['task_creates'].append(fill_template(tpl['executor_task_create'], mapping))
+        codes['group_configs'].append(fill_template(tpl['executor_kconfig'], mapping))
+    if callback_groups:
+        # entities and executors are ready: let the group tasks spin
+        codes['group_inits'].append("\n".join(
+            f"    xTaskNotifyGive({g['name']}_task_handle);" for g in callback_groups))
+
+    # static message memory, initialized before any entity is created
+    codes['memory_decls'] = memory.declarations if memory else []
+    codes['memory_inits'] = ["\n".join(memory.init_calls)] if memory and memory.init_calls else []
+    footprint.update(
+        buffers=memory.buffers if memory else [],
+        executors=[codes['executor_handles']]
+                  + [executor_handles(groups[g['name']]) for g in callback_groups],
+        timers=len(loop_timers),
+        group_stacks=[g['stack'] for g in callback_groups],
+    )
+    codes['footprint'] = footprint
+
     # return both the code snippets and the data-variable map
     codes['data_vars'] = data_variable_declarations
     return codes
@@ -468,109 +1016,359 @@ def apply_code_blocks_to_c(
     details: dict
 ):
     """
-    Reads TEMPLATE_PATH/main/main.c, replaces placeholders, and writes to
-    <project_path>/main/main.c
+    Reads TEMPLATE_PATH/main/main.c and Kconfig.projbuild, replaces
+    placeholders, and writes them to <project_path>/main/. USER CODE regions
+    of files already there are kept (see user_regions.py), and files whose
+    content didn't change are not rewritten.
     """
-    # 1) Load the template
-    template_file = os.path.join(TEMPLATE_PATH, "main", "main.c")
-    if not os.path.exists(template_file):
-        raise FileNotFoundError(f"Template not found: {template_file}")
-    with open(template_file, 'r') as f:
-        content = f.read()
-
-    # 2) Build replacement mapping
+    # 1) Build replacement mapping
     # a) Convert import paths into #include lines
     headers_block = "\n".join(f'#include "{hdr}"' for hdr in required_imports)
 
     # b) Other named placeholders:
+    default_adds = "\n".join(code_blocks.get("sub_adds", [])
+                             + code_blocks.get("srv_adds", [])
+                             + code_blocks.get("cli_adds", [])
+                             + code_blocks.get("timer_adds", []))
     mapping = {
         "Headers":            headers_block,
-        "Variables":          "\n".join(   code_blocks.get("var_decls", [])),
+        "Variables":          "\n".join(   code_blocks.get("var_decls", [])
+                                         + code_blocks.get("memory_decls", [])),
         "Callbacks":          "\n\n".join(code_blocks.get("sub_callbacks", [])
                                          + code_blocks.get("srv_callbacks", [])
-                                         + code_blocks.get("timer_callbacks", [])),
-        "InitializingThings": "\n\n".join(code_blocks.get("pub_inits", [])
+                                         + code_blocks.get("cli_callbacks", [])
+                                         + code_blocks.get("timer_callbacks", [])
+                                         + code_blocks.get("task_functions", [])),
+        "InitializingThings": "\n\n".join(code_blocks.get("memory_inits", [])
+                                         + code_blocks.get("pub_inits", [])
                                          + code_blocks.get("sub_inits", [])
                                          + code_blocks.get("srv_inits", [])
                                          + code_blocks.get("cli_inits", [])
                                          + code_blocks.get("timer_inits", [])),
-        "AddCallbacks":       "\n".join(code_blocks.get("sub_adds", [])
-                                         + code_blocks.get("srv_adds", [])
-                                         + code_blocks.get("timer_adds", [])),
-        "ExamplePublish":     "\n\n".join(code_blocks.get("pub_calls", [])
-                                         + code_blocks.get("cli_sends", [])
-                                         + code_blocks.get("cli_takes", [])),
-        "Tasks":              "\n".join(code_blocks.get("task_callbacks", [])),
+        "AddCallbacks":       "\n\n".join([default_adds]
+                                         + code_blocks.get("group_inits", [])),
+        "SpinLoop":           code_blocks.get("spin_loop", ""),
+        "Tasks":              "\n\n".join(code_blocks.get("task_creates", [])),
+        "GroupConfigs":       "\n\n".join(code_blocks.get("group_configs", [])),
+        "ExecutorHandles":    str(code_blocks.get("executor_handles", 1)),
         # Also fill in nodename/namespace
         "Nodename":           details.get("node_name", "node"),
         "Namespace":          details.get("namespace", "")
     }
 
-    # 3) Replace each <||Key||> in the template
-    def repl(m):
-        key = m.group(1)
-        return mapping.get(key, f"<MISSING:{key}>")
-    result = re.sub(r'<\|\|(.+?)\|\|>', repl, content)
+    # 2) Load the (cached) templates and check them all before writing any
+    templates, sources = {}, {}
+    for name in TEMPLATED_FILES:
+        template_file = os.path.join(TEMPLATE_PATH, "main", name)
+        if not os.path.exists(template_file):
+            raise FileNotFoundError(f"Template not found: {template_file}")
+        templates[name] = load_template_file(template_file)
+        with open(template_file) as f:
+            sources[name] = f.read()  # what a fresh copy of the template holds
+        missing = templates[name].missing(mapping)
+        if missing:
+            raise TemplateError(f"{template_file}: no value for {', '.join(missing)}")
 
-    # 4) Write out to the project folder under main/main.c
     out_dir = os.path.join(project_path, "main")
     os.makedirs(out_dir, exist_ok=True)
-    out_file = os.path.join(out_dir, "main.c")
-    with open(out_file, 'w') as f:
-        f.write(result)
+    state = FileState(project_path)
+    for name, template in templates.items():
+        # 3) Replace each <||Key||> in the template
+        result   = template.render(mapping)
+        out_file = os.path.join(out_dir, name)
+
+        # 4) Carry over the USER CODE regions of an existing file
+        existing = None
+        if os.path.exists(out_file):
+            with open(out_file) as f:
+                existing = f.read()
+            result, kept, orphaned = merge_regions(result, extract_regions(existing))
+            if orphaned:
+                print(f"Warning: {name}: kept user code of removed entities "
+                      f"({', '.join(orphaned)}) in an #if 0 block")
+            if existing != result and existing != sources[name] and state.edited(name, existing):
+                shutil.copy2(out_file, out_file + ".orig")
+                if state.tracked(name):
+                    print(f"Warning: {name} was edited outside USER CODE regions; "
+                          f"the old file is saved as {name}.orig")
+                else:
+                    # generated before USER CODE regions, or its state file is gone
+                    print(f"Warning: {name} has no record of what was generated, so code "
+                          f"outside USER CODE regions is not kept; the old file is saved "
+                          f"as {name}.orig")
+
+        # 5) Write out to the project folder under main/, only if it changed
+        state.record(name, result)
+        if write_if_changed(out_file, result):
+            print(f"Generated {name} → {out_file}")
+        else:
+            print(f"Unchanged {name}")
+    state.save()
+
+
+def collect_required_imports(pubs, subs, srvs, clis):
+    """All C headers needed by the topic and service types in use."""
+    required_imports = []
+    for name, typ, *_ in pubs + subs:
+        required_imports.append(transform_path(typ))
+    for name, typ, *_ in srvs + clis:
+        required_imports.append(transform_path(typ))
+    return sorted(set(required_imports))
 
-    print(f"Generated main.c → {out_file}")
 
+def render_project(project_path, details, pubs, subs, srvs, clis, tmrs, tpl=None,
+                   interface_graph=None):
+    """Generate all rclc snippets for the entities and write main/main.c; returns the snippets."""
+    code_blocks = generate_init_and_callback_codes(
+        pubs, subs, srvs, clis, tmrs, tpl, details.get('scheduling', POLL),
+        interface_graph, details.get('message_memory'), details.get('callback_groups', ()))
+    apply_code_blocks_to_c(
+        project_path=project_path,
+        code_blocks=code_blocks,
+        required_imports=collect_required_imports(pubs, subs, srvs, clis),
+        details=details
+    )
+    return code_blocks
 
-def main():
-    # 1) Load config & interface graph
-    config          = load_or_init_config()
-    interface_graph = load_interface_graph()
 
-    # 2) Prompt for ROS distro if missing
+def report_footprint(config, project_path, details, code_blocks, interface_graph, serial=None):
+    """
+    Print the estimated static RAM of the project and warn if it exceeds the
+    budget: the spec's ram_budget, else RAM_BUDGETS[target] from the config
+    file, else the default for the sdkconfig's CONFIG_IDF_TARGET.
+    """
+    if interface_graph is None:
+        return
+    sdkconfig = read_sdkconfig(os.path.join(project_path, 'sdkconfig'))
+    target    = sdkconfig.get('CONFIG_IDF_TARGET', 'esp32')
+    budget    = (details.get('ram_budget')
+                 or config.get('RAM_BUDGETS', {}).get(target)
+                 or RAM_BUDGETS.get(target))
+    inputs = code_blocks['footprint']
+    params = component_params(config, details)
+    sizer  = StructSizer(InterfaceResolver(interface_graph))
+    report = estimate_footprint(
+        sizer, inputs['messages'], inputs['buffers'], params,
+        params.get('mtu', CUSTOM_TRANSPORT_MTU), inputs['executors'], inputs['timers'],
+        inputs['qos_profiles'],
+        [int(sdkconfig.get('CONFIG_MICRO_ROS_APP_STACK', 0))] + inputs['group_stacks'],
+        serial['rx_buffer'] + serial['tx_buffer'] if serial else 0)
+    print(format_footprint(report, target, budget))
+    if sizer.unknown:
+        print(f"Warning: sizes of {', '.join(sorted(sizer.unknown))} are not in the interface graph")
+    total = sum(report.values())
+    if budget and total > budget:
+        print(f"Warning: estimated static RAM ({total} B) exceeds the {target} budget of {budget} B")
+
+
+def report_bandwidth(config, details, pubs, subs, srvs, clis, interface_graph):
+    """
+    Print the serialized message sizes and the publishers' and clients'
+    link load, and warn if the transport can't carry them (see wire_budget).
+    """
+    if interface_graph is None:
+        return
+    params = component_params(config, details)
+    report = wire_budget(details, pubs, subs, srvs, clis, interface_graph, params['stream_history'])
+    print(format_budget(report))
+    if report['unsendable']:
+        print(f"Warning: {', '.join(report['unsendable'])} can't be sent at their worst-case size")
+    if verdict(report) == 'overloaded':
+        print("Warning: the publishers and clients need more than the link can carry")
+
+
+def ensure_base_component(config, distro=None, offline=False, refresh=False):
+    """Pick the ROS distro (prompting if needed) and check out its base component."""
     if 'ROS_DISTRO' not in config:
-        config['ROS_DISTRO'] = input("Enter ROS 2 distribution: ")
+        config['ROS_DISTRO'] = distro or input("Enter ROS 2 distribution: ")
         save_config(config)
+    if 'BASE_COMMITS' not in config and config.get('ROS_DISTRO_BASE_COMMIT'):
+        # keep the commit of a base cloned before the mirror existed
+        config['BASE_COMMITS'] = {config['ROS_DISTRO']: config['ROS_DISTRO_BASE_COMMIT']}
+    base_dest = clone_base_component(config, offline, refresh)
+    save_config(config, removed=('ROS_DISTRO_BASE_CLONED',))
+    return base_dest
+
 
-    # 3) Clone base micro-ROS component (once per distro)
-    base_dest = clone_base_component(config)
-    save_config(config)
+def generate_from_spec(spec, config, base_dest, interface_graph, tpl, offline=False,
+                       update=False):
+    """
+    Build one project from a loaded spec; returns its path. A spec for
+    another ROS distro than the configured one gets that distro's base
+    checkout from the mirror. With `update` an existing project is
+    regenerated in place, keeping its USER CODE regions.
+    """
+    distro = spec.get('ros_distro', config['ROS_DISTRO'])
+    if distro != config['ROS_DISTRO']:
+        config = dict(config, ROS_DISTRO=distro)
+        base_dest = clone_base_component(config, offline)
+    details, pubs, subs, srvs, clis, tmrs = spec_to_project(spec, interface_graph)
+    serial = serial_transport_settings(config, details)
+
+    os.makedirs(spec['target_dir'], exist_ok=True)
+    project_path = copy_template(spec['target_dir'], details['project_name'], update)
+    comp_dest, _ = prepare_component(config, base_dest, details)
+    link_component(project_path, comp_dest)
+    if serial is not None:
+        configure_serial_transport(project_path, serial)
+
+    code_blocks = render_project(project_path, details, pubs, subs, srvs, clis, tmrs, tpl,
+                                 interface_graph)
+    report_footprint(config, project_path, details, code_blocks, interface_graph, serial)
+    report_bandwidth(config, details, pubs, subs, srvs, clis, interface_graph)
+    return project_path
+
+
+_WORKER = {}
+
+
+def _init_worker(config, base_dest, tpl, offline=False, update=False):
+    _WORKER.update(config=config, base_dest=base_dest, tpl=tpl, offline=offline, update=update,
+                   interface_graph=load_interface_graph())
+
+
+def _generate_in_worker(path_spec):
+    path, spec = path_spec
+    try:
+        generate_from_spec(spec, _WORKER['config'], _WORKER['base_dest'],
+                           _WORKER['interface_graph'], _WORKER['tpl'], _WORKER['offline'],
+                           _WORKER['update'])
+        return path, None
+    except (OSError, SpecError, RuntimeError) as e:
+        return path, str(e)
+    except Exception as e:
+        # a malformed spec or a bug fails this spec only, not the whole batch
+        return path, f"{type(e).__name__}: {e}"
+
+
+def run_specs(spec_paths, jobs=1, offline=False, refresh=False, update=False):
+    """
+    Generate every spec in one process, or over `jobs` worker processes. The
+    config, interface graph, templates and base component are loaded once
+    (per worker) and shared; the component cache is guarded by file locks.
+    Returns the number of specs that failed.
+    """
+    specs = []
+    for path in spec_paths:
+        try:
+            specs.append((path, load_spec(path)))
+        except (OSError, SpecError) as e:
+            print(f"Error: {e}")
+            return len(spec_paths)
+
+    config    = load_or_init_config()
+    tpl       = load_additional_templates()
+    base_dest = ensure_base_component(config, specs[0][1].get('ros_distro') if specs else None,
+                                      offline, refresh)
+
+    if jobs > 1 and len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(config, base_dest, tpl, offline, update)) as pool:
+            results = list(pool.map(_generate_in_worker, specs))
+    else:
+        _init_worker(config, base_dest, tpl, offline, update)
+        results = []
+        for path_spec in specs:
+            print(f"\n== {path_spec[0]}")
+            results.append(_generate_in_worker(path_spec))
+
+    failed = 0
+    for path, error in results:
+        if error is not None:
+            print(f"Error: {path}: {error}")
+            failed += 1
+    print(f"\nGenerated {len(specs) - failed}/{len(specs)} projects")
+    return failed
+
+
+def run_interactive(offline=False, refresh=False, update=False):
+    # 1) Load config & interface graph
+    config          = load_or_init_config()
+    interface_graph = load_interface_graph()
+    type_index      = TypeIndex.for_graph(interface_graph)
+
+    # 2-3) Prompt for ROS distro if missing, check out its base component from the mirror
+    base_dest = ensure_base_component(config, offline=offline, refresh=refresh)
 
     # 4) Project skeleton
     target_dir   = prompt_target_and_create()
     details      = prompt_project_details()
-    project_path = copy_template(target_dir, details['project_name'])
+    serial_transport_settings(config, details)  # reject bad serial settings up front
+    project_path = copy_template(target_dir, details['project_name'], update)
+
+    # 5) Prompt for all your ROS 2 entities
+    pubs = prompt_publishers(   type_index, details)
+    subs = prompt_subscriptions(type_index, details)
+    srvs = prompt_services(     type_index, details)
+    clis = prompt_clients(      type_index, details)
+    tmrs = prompt_timers(       details)
+    prompt_callback_groups(details, pubs, subs, srvs, clis, tmrs)
+    details['qos_depth'] = max((qos_depth(e[2]) for e in pubs + subs + srvs + clis), default=0)
 
-    # 5) Prepare (and cache) custom component variant
+    # 6) Prepare (and cache) the component variant, sized for the entities' QoS
+    serial = serial_transport_settings(config, details)
     comp_dest, _ = prepare_component(config, base_dest, details)
     link_component(project_path, comp_dest)
-    save_config(config)
-
-    # 6) Prompt for all your ROS 2 entities
-    pubs = prompt_publishers(   interface_graph, details)
-    subs = prompt_subscriptions(interface_graph, details)
-    srvs = prompt_services(     interface_graph, details)
-    clis = prompt_clients(      interface_graph, details)
-    tmrs = prompt_timers(       details)
+    if serial is not None:
+        configure_serial_transport(project_path, serial)
 
-    # 7) Generate all rclc init/callback snippets
-    code_blocks = generate_init_and_callback_codes(pubs, subs, srvs, clis, tmrs)
+    # 7-9) Generate all rclc snippets and render main.c with everything in place
+    code_blocks = render_project(project_path, details, pubs, subs, srvs, clis, tmrs,
+                                 interface_graph=interface_graph)
+    report_footprint(config, project_path, details, code_blocks, interface_graph, serial)
+    report_bandwidth(config, details, pubs, subs, srvs, clis, interface_graph)
 
-    # 8) Collect all required C headers from your topics/services/actions
-    required_imports = []
-    for name, typ, *_ in pubs + subs:
-        required_imports.append(transform_path(typ))
-    for name, typ in srvs + clis:
-        required_imports.append(transform_path(typ))
-    required_imports = sorted(set(required_imports))
 
-    # 9) Render main.c with everything in place
-    apply_code_blocks_to_c(
-        project_path=project_path,
-        code_blocks=code_blocks,
-        required_imports=required_imports,
-        details=details
-    )
+def main():
+    parser = argparse.ArgumentParser(description="Generate micro-ROS ESP-IDF projects")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--spec", help="Generate one project from a JSON/YAML spec instead of prompting")
+    group.add_argument("--batch", metavar="DIR", help="Generate a project for every spec in DIR")
+    group.add_argument("--gc", action="store_true",
+                       help="Remove component variants no project links to anymore")
+    group.add_argument("--store-artifacts", action="store_true",
+                       help="Store the libmicroros.a of every built variant in the artifact cache")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for --batch (default: 1)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="With --gc, only list what would be removed")
+    parser.add_argument("--mirror", metavar="URL_OR_PATH",
+                        help="Fetch the base component from this git URL, path or file:// "
+                             "mirror from now on")
+    parser.add_argument("--offline", action="store_true",
+                        help="Never fetch; use only what the local mirror holds")
+    parser.add_argument("--update", action="store_true",
+                        help="Regenerate existing projects in place, "
+                             "keeping the code in their USER CODE regions")
+    parser.add_argument("--refresh-base", action="store_true",
+                        help="Fetch the distro branch and pin the base to its newest commit")
+    args = parser.parse_args()
+
+    if args.gc:
+        gc_components(load_or_init_config(), args.dry_run)
+        return
+    if args.store_artifacts:
+        try:
+            store_artifacts(load_or_init_config())
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
+    if args.mirror:
+        save_config({'MICRO_ROS_MIRROR': args.mirror})
+
+    try:
+        if args.spec:
+            sys.exit(1 if run_specs([args.spec], 1, args.offline, args.refresh_base,
+                                    args.update) else 0)
+        if args.batch:
+            sys.exit(1 if run_specs(find_specs(args.batch), args.jobs,
+                                    args.offline, args.refresh_base, args.update) else 0)
+        run_interactive(args.offline, args.refresh_base, args.update)
+    except (FileExistsError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Static RAM estimate for a generated node, before it is built.
+
+Message struct sizes follow the C layout rosidl generates for a 32-bit
+target (natural alignment, 12-byte string and sequence structs). rclc and
+rmw_microxrcedds objects use approximate sizes, and the XRCE session buffers
+follow from the variant's MTU, stream history and history limits. Objects
+that rclc allocates once at init (executor handles, timers) are counted as
+well, since they are taken from the heap for good.
+"""
+from interface_resolver import canonical_type_name
+
+POINTER_SIZE  = 4                 # ESP32 targets are 32-bit
+SEQUENCE_SIZE = 3 * POINTER_SIZE  # data, size, capacity
+
+PRIMITIVE_SIZES = {
+    'bool': 1, 'byte': 1, 'char': 1, 'int8': 1, 'uint8': 1,
+    'int16': 2, 'uint16': 2, 'int32': 4, 'uint32': 4, 'float32': 4,
+    'int64': 8, 'uint64': 8, 'float64': 8,
+}
+STRING_TYPES = ('string', 'wstring')
+
+# (size, alignment) of types referenced by the graph but not defined in it
+EXTERNAL_LAYOUTS = {
+    'builtin_interfaces/msg/Time':     (8, 4),
+    'builtin_interfaces/msg/Duration': (8, 4),
+}
+
+# Approximate sizes of rclc / rmw objects on a 32-bit target
+EXECUTOR_BYTES        = 96
+EXECUTOR_HANDLE_BYTES = 48
+TIMER_BYTES           = 96
+QOS_PROFILE_BYTES     = 80
+TASK_TCB_BYTES        = 352
+RMW_ENTITY_BYTES = {
+    'nodes':         160,
+    'publishers':    192,
+    'subscriptions': 224,
+    'services':      224,
+    'clients':       224,
+}
+
+# RAM left for the application with ESP-IDF and the network stack running,
+# per CONFIG_IDF_TARGET. Override with RAM_BUDGETS in the config file or
+# ram_budget in a spec.
+RAM_BUDGETS = {
+    'esp32':   160 * 1024,
+    'esp32s2': 128 * 1024,
+    'esp32s3': 192 * 1024,
+    'esp32c3': 128 * 1024,
+    'esp32c6': 192 * 1024,
+    'esp32h2': 128 * 1024,
+}
+
+
+def _round_up(n, align):
+    return (n + align - 1) // align * align
+
+
+class StructSizer:
+    """sizeof/alignof of rosidl C structs, from the interface graph."""
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self._memo    = {}
+        self.unknown  = set()
+
+    def layout(self, type_name):
+        """(size, alignment) of one element of `type_name`."""
+        if type_name in PRIMITIVE_SIZES:
+            size = PRIMITIVE_SIZES[type_name]
+            return size, size
+        if type_name in STRING_TYPES:
+            return SEQUENCE_SIZE, POINTER_SIZE
+        type_name = canonical_type_name(type_name)
+        if type_name in EXTERNAL_LAYOUTS:
+            return EXTERNAL_LAYOUTS[type_name]
+        if type_name not in self._memo:
+            block = self.resolver.lookup(type_name)
+            if block is None:
+                self.unknown.add(type_name)
+                return 0, 1
+            self._memo[type_name] = (0, 1)  # a type can't contain itself by value
+            self._memo[type_name] = self.block_layout(block)
+        return self._memo[type_name]
+
+    def block_layout(self, block):
+        """(size, alignment) of the struct generated for a field block."""
+        offset, align = 0, 1
+        for entry in block.values():
+            if entry.get('array'):
+                size, field_align = SEQUENCE_SIZE, POINTER_SIZE
+            else:
+                size, field_align = self.layout(entry['type'])
+                size *= entry.get('fixed_size', 1)
+            offset = _round_up(offset, field_align) + size
+            align = max(align, field_align)
+        if not block:
+            offset = 1  # structure_needs_at_least_one_member
+        return _round_up(offset, align), align
+
+    def sizeof(self, type_name):
+        return self.layout(type_name)[0]
+
+
+def xrce_session_bytes(params, mtu):
+    """
+    rmw_microxrcedds session memory: reliable input and output streams of
+    stream_history MTU slots, a best effort output stream, the transport
+    buffer and the pool of `history` static input buffers, each as large as
+    a reliable stream.
+    """
+    stream = params['stream_history'] * mtu
+    return 2 * stream + mtu + mtu + params['history'] * stream
+
+
+def estimate_footprint(sizer, messages, buffers, params, mtu, executors, timers,
+                       qos_profiles, stacks, serial_buffers=0):
+    """
+    Estimated static RAM per category, in bytes.
+
+    messages       (type name, section or None) of every message variable
+    buffers        (element type, count) from MessageMemory.buffers
+    executors      handle count of every executor
+    stacks         stack size of every task
+    """
+    message_structs = 0
+    for type_name, section in messages:
+        if section is None:
+            message_structs += sizer.sizeof(type_name)
+        else:
+            block = sizer.resolver.lookup(type_name)
+            message_structs += sizer.block_layout(block[section])[0] if block else 0
+    return {
+        'message structs':    message_structs,
+        'message buffers':    sum(sizer.sizeof(t) * count for t, count in buffers),
+        'QoS profiles':       qos_profiles * QOS_PROFILE_BYTES,
+        'executors':          sum(EXECUTOR_BYTES + n * EXECUTOR_HANDLE_BYTES for n in executors),
+        'timers':             timers * TIMER_BYTES,
+        'rmw entities':       sum(params[key] * size for key, size in RMW_ENTITY_BYTES.items()),
+        'XRCE session':       xrce_session_bytes(params, mtu),
+        'serial ring buffers': serial_buffers,
+        'task stacks':        sum(stack + TASK_TCB_BYTES for stack in stacks),
+    }
+
+
+def format_footprint(report, target, budget):
+    """Human-readable report; the last line compares the total to `budget`."""
+    width = max(len(k) for k in report)
+    lines = [f"Estimated static RAM ({target}):"]
+    lines += [f"  {k:<{width}}  {v:>8} B" for k, v in report.items() if v]
+    total = sum(report.values())
+    line = f"  {'total':<{width}}  {total:>8} B"
+    if budget:
+        line += f" of {budget} B budget ({100 * total // budget}%)"
+    lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Static backing memory for message variables.
+
+rosidl strings and sequences are {data, size, capacity} structs; left zeroed
+they have nowhere to store incoming data, so a subscription fails to take
+the message (or has to allocate). For every message variable of a project
+this module emits static buffers sized from the interface graph and an
+init function that points each string and sequence at its buffer, walking
+nested types the way micro_ros_utilities does at runtime:
+
+    static char path_msg_header_frame_id_buffer[33];
+    static geometry_msgs__msg__PoseStamped path_msg_poses_buffer[8];
+    static char path_msg_poses_header_frame_id_buffer[8][33];
+
+    static void path_msg_init_memory(void)
+    {
+        ...
+    }
+
+Capacities come from a dict like
+
+    {"sequence": 8, "string": 32, "fields": {"path_msg.poses": 16}}
+
+where "fields" overrides the defaults per field path (the C expression
+without element indices). Bounded strings and sequences never exceed
+their bound.
+"""
+from interface_resolver import canonical_type_name, split_type_name
+
+DEFAULT_CAPACITIES = {"sequence": 8, "string": 32, "fields": {}}
+
+# C element types of the rosidl primitives
+PRIMITIVE_C_TYPES = {
+    'bool':    'bool',
+    'byte':    'uint8_t',
+    'char':    'signed char',
+    'float32': 'float',
+    'float64': 'double',
+    'int8':    'int8_t',
+    'uint8':   'uint8_t',
+    'int16':   'int16_t',
+    'uint16':  'uint16_t',
+    'int32':   'int32_t',
+    'uint32':  'uint32_t',
+    'int64':   'int64_t',
+    'uint64':  'uint64_t',
+}
+
+# string type -> (struct type, character type, character as a ROS type)
+STRING_C_TYPES = {
+    'string':  ('rosidl_runtime_c__String', 'char', 'uint8'),
+    'wstring': ('rosidl_runtime_c__U16String', 'uint16_t', 'uint16'),
+}
+
+
+def c_type(type_name):
+    """The C type of one element of `type_name`."""
+    if type_name in PRIMITIVE_C_TYPES:
+        return PRIMITIVE_C_TYPES[type_name]
+    if type_name in STRING_C_TYPES:
+        return STRING_C_TYPES[type_name][0]
+    return canonical_type_name(type_name).replace('/', '__')
+
+
+class MessageMemory:
+    """
+    Collects buffer declarations and init functions for message variables.
+    `resolver` is an InterfaceResolver over the project's interface graph.
+    `buffers` lists (element type, element count) of every buffer emitted.
+    """
+
+    def __init__(self, resolver, capacities=None):
+        self._resolver   = resolver
+        self._capacities = {**DEFAULT_CAPACITIES, **(capacities or {})}
+        self._dynamic    = {}
+        self.declarations = []
+        self.init_calls   = []
+        self.buffers      = []
+
+    def add(self, var, block):
+        """
+        Emit memory for the message variable `var` with field block `block`.
+        Returns False if the message has no strings or sequences.
+        """
+        if not any(self._needs_memory(entry, ()) for entry in block.values()):
+            return False
+        lines = []
+        for field, entry in block.items():
+            self._field(lines, f"{var}.{field}", f"{var}_{field}", entry, [], 1, ())
+        self.declarations.append(
+            f"\nstatic void {var}_init_memory(void)\n{{\n" + "\n".join(lines) + "\n}")
+        self.init_calls.append(f"    {var}_init_memory();")
+        return True
+
+    def _capacity(self, expr, kind, bound):
+        cap = self._capacities["fields"].get(_strip_indices(expr), self._capacities[kind])
+        return min(cap, bound) if bound else cap
+
+    def _message(self, type_name):
+        if split_type_name(type_name) is None:
+            return None
+        return self._resolver.lookup(type_name)
+
+    def _needs_memory(self, entry, stack):
+        if entry.get("array"):
+            return True
+        return self._type_needs_memory(entry["type"], stack)
+
+    def _type_needs_memory(self, type_name, stack):
+        if type_name in STRING_C_TYPES:
+            return True
+        if type_name not in self._dynamic:
+            block = self._message(type_name)
+            if block is None or type_name in stack:
+                return False
+            self._dynamic[type_name] = any(
+                self._needs_memory(entry, stack + (type_name,)) for entry in block.values())
+        return self._dynamic[type_name]
+
+    def _buffer(self, name, type_name, c_elem, dims, size):
+        shape = ''.join(f"[{d}]" for d in dims)
+        self.declarations.append(f"static {c_elem} {name}{shape}[{size}];")
+        count = size
+        for d in dims:
+            count *= d
+        self.buffers.append((type_name, count))
+
+    def _field(self, lines, expr, name, entry, dims, depth, stack):
+        """Point `expr` (and everything below it) at static buffers."""
+        indent = "    " * depth
+        type_name = entry["type"]
+        if "fixed_size" in entry:
+            if self._type_needs_memory(type_name, stack):
+                self._loop(lines, expr, name, type_name, dims, entry["fixed_size"],
+                           entry.get("max_length"), depth, stack, f"{expr}[{{i}}]")
+            return
+        if entry.get("array"):
+            cap = self._capacity(expr, "sequence", entry.get("max_size"))
+            self._buffer(f"{name}_buffer", type_name, c_type(type_name), dims, cap)
+            ref = f"{name}_buffer" + ''.join(f"[i{n}]" for n in range(len(dims)))
+            lines.append(f"{indent}{expr}.data = {ref};")
+            lines.append(f"{indent}{expr}.size = 0;")
+            lines.append(f"{indent}{expr}.capacity = {cap};")
+            if self._type_needs_memory(type_name, stack):
+                self._loop(lines, expr, name, type_name, dims, cap,
+                           entry.get("max_length"), depth, stack, f"{expr}.data[{{i}}]")
+            return
+        self._element(lines, expr, name, type_name, entry.get("max_length"), dims, depth, stack)
+
+    def _loop(self, lines, expr, name, type_name, dims, count, max_length, depth, stack, elem):
+        indent = "    " * depth
+        i = f"i{len(dims)}"
+        lines.append(f"{indent}for (size_t {i} = 0; {i} < {count}; {i}++) {{")
+        self._element(lines, elem.format(i=i), name, type_name, max_length,
+                      dims + [count], depth + 1, stack)
+        lines.append(f"{indent}}}")
+
+    def _element(self, lines, expr, name, type_name, max_length, dims, depth, stack):
+        indent = "    " * depth
+        if type_name in STRING_C_TYPES:
+            length = self._capacity(expr, "string", max_length) + 1
+            _, c_char, char_type = STRING_C_TYPES[type_name]
+            self._buffer(f"{name}_buffer", char_type, c_char, dims, length)
+            ref = f"{name}_buffer" + ''.join(f"[i{n}]" for n in range(len(dims)))
+            lines.append(f"{indent}{expr}.data = {ref};")
+            lines.append(f"{indent}{expr}.size = 0;")
+            lines.append(f"{indent}{expr}.capacity = {length};")
+            return
+        block = self._message(type_name)
+        if block is None or type_name in stack:
+            return
+        for field, entry in block.items():
+            if self._needs_memory(entry, stack + (type_name,)):
+                self._field(lines, f"{expr}.{field}", f"{name}_{field}", entry,
+                            dims, depth, stack + (type_name,))
+
+
+def _strip_indices(expr):
+    """"a.b.data[i0].c[i1]" -> "a.b.c": the field path used for overrides."""
+    path = []
+    for part in expr.split('.'):
+        if part.startswith('data['):  # sequence element
+            continue
+        path.append(part.split('[')[0])
+    return '.'.join(path)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Declarative project specs for non-interactive generation.
+
+A spec is a JSON or YAML file describing one node:
+
+    project_name: imu_node
+    target_dir: ../firmware          # relative to the spec file, default "."
+    ros_distro: humble               # optional, default: the configured distro
+    node_name: imu
+    namespace: ""
+    mode: udp                        # udp | custom
+    serial:                          # custom mode transport, all optional
+      interface: uart                # uart | usb_jtag
+      port: 1
+      baudrate: 2000000              # up to the chip's SOC_UART_BITRATE_MAX
+      pins: {tx: 17, rx: 16, rts: -1, cts: -1}
+      flow_control: false
+      rx_buffer: 8192                # default: sized from MTU and stream history
+      tx_buffer: 2048
+    scheduling: timer                # poll | timer (one timer per publisher)
+    max_history: 4
+    mtu: 512                         # XRCE transport MTU, default 512
+    ram_budget: 131072               # bytes, warn above; default per IDF target
+    callback_groups:                 # optional: executors in their own pinned tasks
+      - {name: sensors, core: 1, priority: 10, stack: 8192}
+    publishers:
+      - {name: imu, type: sensor_msgs/msg/Imu, qos: best_effort, rate_hz: 100,
+         group: sensors}
+    subscriptions:
+      - {name: cmd, type: std_msgs/msg/Bool, qos: reliable}
+      - name: map
+        type: nav_msgs/msg/OccupancyGrid
+        qos: {reliability: reliable, depth: 1, durability: transient_local,
+              deadline_ms: 500}      # a full profile, see qos_profiles.py
+    services:
+      - {name: reset, type: std_srvs/srv/Trigger, qos: reliable}
+    clients:                         # with timer scheduling, requests go out at rate_hz
+      - {name: calibrate, type: std_srvs/srv/Trigger, qos: reliable, rate_hz: 0.5}
+    timers:
+      - {name: heartbeat, rate_hz: 1}
+    message_memory:                  # static buffers for strings and sequences
+      sequence: 8                    # default capacity of unbounded sequences
+      string: 32                     # default capacity of unbounded strings
+      fields:                        # per-field overrides, by C expression
+        imu_msg.header.frame_id: 16
+
+Entity names end up in C identifiers (imu_msg, imu_publisher), so they must
+be identifiers and unique across all entity kinds.
+Entities without a `group` run on the default executor in micro_ros_task.
+Types may also be written 'pkg/Name', or just 'Name' when only one package
+defines it; they are checked against the graph's TypeIndex.
+
+spec_to_project turns it into the same details dict and entity tuples the
+interactive prompts produce.
+"""
+import os
+import re
+import json
+
+from serial_transport import MIN_BAUDRATE, MIN_RING_BUFFER, MAX_RING_BUFFER, SERIAL_INTERFACES
+from qos_profiles import normalize_qos, qos_depth
+from type_index import TypeIndex
+
+SPEC_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+MODES = {'udp': 1, 'custom': 2}
+SCHEDULING = ('poll', 'timer')
+
+# Entity lists and the suffix of their handler variables in main.c
+HANDLER_SUFFIXES = {
+    'publishers':    'publisher',
+    'subscriptions': 'subscription',
+    'services':      'service',
+    'clients':       'client',
+    'timers':        'timer',
+}
+SERIAL_INTS = ('port', 'baudrate', 'rx_buffer', 'tx_buffer')
+SERIAL_PINS = ('tx', 'rx', 'rts', 'cts')
+GROUP_DEFAULTS = {'core': 1, 'priority': 5, 'stack': 16000}
+GROUP_NAME_RE  = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+RESERVED_GROUPS = ('app',)  # CONFIG_MICRO_ROS_APP_* belongs to micro_ros_task
+CLIENT_RATE_HZ = 1.0  # request rate of clients under timer scheduling without rate_hz
+
+
+class SpecError(ValueError):
+    pass
+
+
+def load_spec(path):
+    """Read a JSON or YAML spec; YAML needs PyYAML."""
+    with open(path, 'r') as f:
+        text = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise SpecError(f"{path}: YAML specs need PyYAML (pip install pyyaml)")
+        try:
+            spec = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise SpecError(f"{path}: {e}")
+    else:
+        try:
+            spec = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise SpecError(f"{path}: {e}")
+    if not isinstance(spec, dict):
+        raise SpecError(f"{path}: spec must be a mapping")
+    spec.setdefault('target_dir', '.')
+    spec['target_dir'] = os.path.normpath(os.path.join(
+        os.path.dirname(os.path.abspath(path)), os.path.expanduser(spec['target_dir'])))
+    return spec
+
+
+def find_specs(directory):
+    """All spec files directly inside `directory`, in name order."""
+    return sorted(
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if f.endswith(SPEC_EXTENSIONS)
+    )
+
+
+def _require(spec, key, where):
+    if key not in spec:
+        raise SpecError(f"{where}: missing '{key}'")
+    return spec[key]
+
+
+def _check_type(type_index, type_name, kind, where):
+    """The canonical 'pkg/kind/Name' of `type_name`, which may also be 'pkg/Name' or 'Name'."""
+    canonical = type_index.resolve(type_name, kind)
+    if canonical is not None:
+        return canonical
+    close = type_index.search(type_name.split('/')[-1], kind, limit=3)
+    same  = [t for t in close if t.lower().endswith('/' + type_name.lower())]
+    if len(same) > 1:
+        raise SpecError(f"{where}: type '{type_name}' is ambiguous ({', '.join(same)})")
+    hint = f"; did you mean {' or '.join(close)}?" if close else ""
+    raise SpecError(f"{where}: unknown {kind} type '{type_name}'{hint}")
+
+
+def _name(ent, where, names):
+    """The entity's name, checked to make C identifiers and unique across all entity kinds."""
+    name = _require(ent, 'name', where)
+    if not isinstance(name, str) or not GROUP_NAME_RE.match(name):
+        raise SpecError(f"{where}: name '{name}' is not a C identifier")
+    if name in names:
+        raise SpecError(f"{where}: name '{name}' is already used by {names[name]}")
+    names[name] = where
+    return name
+
+
+def _rate(ent, where):
+    rate = float(_require(ent, 'rate_hz', where))
+    if rate <= 0:
+        raise SpecError(f"{where}: rate_hz must be positive")
+    return rate
+
+
+def _topics(spec, key, type_index, names, with_rate=False):
+    entities = []
+    for i, ent in enumerate(spec.get(key) or []):
+        where = f"{key}[{i}]"
+        name = _name(ent, where, names)
+        typ  = _check_type(type_index, _require(ent, 'type', where), 'msg', where)
+        qos  = _qos(ent, where)
+        if with_rate:
+            entities.append((name, typ, qos, _rate(ent, where)))
+        else:
+            entities.append((name, typ, qos))
+    return entities
+
+
+def _qos(ent, where):
+    try:
+        return normalize_qos(ent.get('qos', 'reliable'))
+    except ValueError as e:
+        raise SpecError(f"{where}: {e}")
+
+
+def _services(spec, key, type_index, names, with_rate=False):
+    entities = []
+    for i, ent in enumerate(spec.get(key) or []):
+        where = f"{key}[{i}]"
+        name = _name(ent, where, names)
+        typ  = _check_type(type_index, _require(ent, 'type', where), 'srv', where)
+        if with_rate:
+            rate = _rate(ent, where) if 'rate_hz' in ent else CLIENT_RATE_HZ
+            entities.append((name, typ, _qos(ent, where), rate))
+        else:
+            entities.append((name, typ, _qos(ent, where)))
+    return entities
+
+
+def _timers(spec, names):
+    timers = []
+    for i, ent in enumerate(spec.get('timers') or []):
+        where = f"timers[{i}]"
+        timers.append((_name(ent, where, names), _rate(ent, where)))
+    return timers
+
+
+def _message_memory(spec):
+    memory = spec.get('message_memory') or {}
+    capacities = {'fields': {}}
+    for key in ('sequence', 'string'):
+        if key in memory:
+            capacities[key] = _capacity(memory[key], f"message_memory.{key}")
+    for path, cap in (memory.get('fields') or {}).items():
+        capacities['fields'][path] = _capacity(cap, f"message_memory.fields.{path}")
+    return capacities
+
+
+def _capacity(value, where):
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise SpecError(f"{where}: capacity must be a positive integer")
+    return value
+
+
+def _serial(spec):
+    serial = spec.get('serial') or {}
+    if not isinstance(serial, dict):
+        raise SpecError("serial must be a mapping")
+    unknown = set(serial) - set(SERIAL_INTS) - {'interface', 'pins', 'flow_control'}
+    if unknown:
+        raise SpecError(f"serial: unknown keys {sorted(unknown)}")
+    if serial.get('interface', 'uart') not in SERIAL_INTERFACES:
+        raise SpecError(f"serial.interface must be one of {list(SERIAL_INTERFACES)}")
+    for key in SERIAL_INTS:
+        if key in serial and (not isinstance(serial[key], int) or serial[key] < 0):
+            raise SpecError(f"serial.{key} must be a non-negative integer")
+    if serial.get('baudrate', MIN_BAUDRATE) < MIN_BAUDRATE:
+        raise SpecError(f"serial.baudrate must be at least {MIN_BAUDRATE}")
+    for key in ('rx_buffer', 'tx_buffer'):
+        if key in serial and not MIN_RING_BUFFER <= serial[key] <= MAX_RING_BUFFER:
+            raise SpecError(f"serial.{key} must be between {MIN_RING_BUFFER} and {MAX_RING_BUFFER}")
+    for pin, value in (serial.get('pins') or {}).items():
+        if pin not in SERIAL_PINS or not isinstance(value, int) or value < -1:
+            raise SpecError(f"serial.pins.{pin}: expected one of {list(SERIAL_PINS)} "
+                            "with a GPIO number or -1")
+    if not isinstance(serial.get('flow_control', False), bool):
+        raise SpecError("serial.flow_control must be true or false")
+    return serial
+
+
+def callback_group(ent, where, groups):
+    """
+    The callback group described by `ent`, checked against the groups
+    already defined; settings it leaves out take GROUP_DEFAULTS.
+    """
+    name = _require(ent, 'name', where)
+    if not isinstance(name, str) or not GROUP_NAME_RE.match(name) \
+            or name.lower() in RESERVED_GROUPS:
+        raise SpecError(f"{where}: '{name}' is not a usable group name")
+    if any(g['name'].upper() == name.upper() for g in groups):
+        raise SpecError(f"{where}: duplicate group '{name}'")
+    group = {'name': name, 'members': []}
+    for key, default in GROUP_DEFAULTS.items():
+        group[key] = ent.get(key, default)
+        if not isinstance(group[key], int) or isinstance(group[key], bool) or group[key] < 0:
+            raise SpecError(f"{where}: {key} must be a non-negative integer")
+    if group['core'] > 1:
+        raise SpecError(f"{where}: core must be 0 or 1")
+    return group
+
+
+def _callback_groups(spec):
+    groups = []
+    for i, ent in enumerate(spec.get('callback_groups') or []):
+        groups.append(callback_group(ent, f"callback_groups[{i}]", groups))
+
+    by_name = {g['name']: g for g in groups}
+    for key, suffix in HANDLER_SUFFIXES.items():
+        for i, ent in enumerate(spec.get(key) or []):
+            if 'group' not in ent:
+                continue
+            if ent['group'] not in by_name:
+                raise SpecError(f"{key}[{i}]: unknown callback group '{ent['group']}'")
+            by_name[ent['group']]['members'].append(f"{ent['name']}_{suffix}")
+    return groups
+
+
+def stream_history(details):
+    """XRCE reliable stream slots (MTU each, in and out) for `details`; a power of two."""
+    slots = max(2, details['max_history'], details.get('qos_depth', 0))
+    return 1 << (slots - 1).bit_length()
+
+
+def spec_to_project(spec, interface_graph):
+    """
+    Validate `spec` against the interface graph and return
+    (details, publishers, subscriptions, services, clients, timers).
+    Entity types come back in their canonical 'pkg/kind/Name' form.
+    """
+    type_index = TypeIndex.for_graph(interface_graph)
+    mode = spec.get('mode', 'udp')
+    if isinstance(mode, str):
+        mode = MODES.get(mode.lower())
+    if mode not in MODES.values():
+        raise SpecError(f"mode must be one of {sorted(MODES)}")
+
+    scheduling = spec.get('scheduling', 'poll')
+    if scheduling not in SCHEDULING:
+        raise SpecError(f"scheduling must be one of {list(SCHEDULING)}")
+
+    names = {}  # entity name -> where it was first used
+    pubs = _topics(spec, 'publishers', type_index, names, with_rate=scheduling == 'timer')
+    if scheduling == 'poll':
+        pubs = [(name, typ, qos, None) for name, typ, qos in pubs]
+    subs = _topics(spec, 'subscriptions', type_index, names)
+    srvs = _services(spec, 'services', type_index, names)
+    clis = _services(spec, 'clients', type_index, names, with_rate=scheduling == 'timer')
+    if scheduling == 'poll':
+        clis = [(name, typ, qos, None) for name, typ, qos in clis]
+    tmrs = _timers(spec, names)
+
+    mtu = spec.get('mtu')
+    if mtu is not None and (not isinstance(mtu, int) or mtu < 128):
+        raise SpecError("mtu must be an integer of at least 128")
+    ram_budget = spec.get('ram_budget')
+    if ram_budget is not None and (not isinstance(ram_budget, int) or ram_budget <= 0):
+        raise SpecError("ram_budget must be a positive integer (bytes)")
+
+    details = {
+        'project_name':     _require(spec, 'project_name', 'spec'),
+        'node_name':        spec.get('node_name', spec['project_name']),
+        'namespace':        spec.get('namespace', ''),
+        'publisher_count':  len(pubs),
+        'subscriber_count': len(subs),
+        'service_count':    len(srvs),
+        'client_count':     len(clis),
+        'max_history':      int(spec.get('max_history', 4)),
+        'qos_depth':        max((qos_depth(e[2]) for e in pubs + subs + srvs + clis), default=0),
+        'mtu':              mtu,
+        'ram_budget':       ram_budget,
+        'max_timers':       len(tmrs),
+        'mode':             mode,
+        'serial':           _serial(spec),
+        'scheduling':       scheduling,
+        'message_memory':   _message_memory(spec),
+        'callback_groups':  _callback_groups(spec),
+    }
+    return details, pubs, subs, srvs, clis, tmrs
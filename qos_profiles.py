@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-entity QoS for publishers, subscriptions, services and clients.
+
+An entity's QoS is either a preset name, which maps to the matching
+rclc_*_init_<preset> call, or a profile dict:
+
+    {"reliability": "best_effort",     # reliable | best_effort
+     "history":     "keep_last",       # keep_last | keep_all
+     "depth":       5,                 # None: the rmw default
+     "durability":  "transient_local", # volatile | transient_local
+     "deadline_ms": 20}                # None: no deadline
+
+which is emitted as a static rmw_qos_profile_t passed to rclc_*_init.
+Profiles that only say what a preset already does collapse to that preset.
+"""
+
+# preset name in specs -> rclc_*_init_<suffix>
+QOS_PRESETS = {'best_effort': 'best_effort', 'reliable': 'default', 'default': 'default'}
+
+RELIABILITY = {
+    'reliable':    'RMW_QOS_POLICY_RELIABILITY_RELIABLE',
+    'best_effort': 'RMW_QOS_POLICY_RELIABILITY_BEST_EFFORT',
+}
+HISTORY = {
+    'keep_last': 'RMW_QOS_POLICY_HISTORY_KEEP_LAST',
+    'keep_all':  'RMW_QOS_POLICY_HISTORY_KEEP_ALL',
+}
+DURABILITY = {
+    'volatile':        'RMW_QOS_POLICY_DURABILITY_VOLATILE',
+    'transient_local': 'RMW_QOS_POLICY_DURABILITY_TRANSIENT_LOCAL',
+}
+
+PROFILE_DEFAULTS = {
+    'reliability': 'reliable',
+    'history':     'keep_last',
+    'depth':       None,
+    'durability':  'volatile',
+    'deadline_ms': None,
+}
+
+
+def normalize_qos(qos):
+    """
+    Validate a preset name or profile dict and return the rclc preset suffix
+    ('default' / 'best_effort') or a complete profile dict. Raises ValueError.
+    """
+    if isinstance(qos, str):
+        if qos not in QOS_PRESETS:
+            raise ValueError(f"qos must be one of {sorted(QOS_PRESETS)} or a profile")
+        return QOS_PRESETS[qos]
+    if not isinstance(qos, dict):
+        raise ValueError("qos must be a preset name or a mapping")
+    unknown = set(qos) - set(PROFILE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown qos keys {sorted(unknown)}")
+    profile = {**PROFILE_DEFAULTS, **qos}
+    for key, allowed in (('reliability', RELIABILITY), ('history', HISTORY),
+                         ('durability', DURABILITY)):
+        if profile[key] not in allowed:
+            raise ValueError(f"qos {key} must be one of {sorted(allowed)}")
+    depth = profile['depth']
+    if depth is not None and (not isinstance(depth, int) or isinstance(depth, bool) or depth < 1):
+        raise ValueError("qos depth must be a positive integer")
+    deadline = profile['deadline_ms']
+    if deadline is not None and (not isinstance(deadline, (int, float)) or deadline <= 0):
+        raise ValueError("qos deadline_ms must be positive")
+    if (profile['history'], profile['depth'], profile['durability'], profile['deadline_ms']) \
+            == ('keep_last', None, 'volatile', None):
+        return QOS_PRESETS[profile['reliability']]
+    return profile
+
+
+def is_reliable(qos):
+    """True if a normalized QoS sends through a reliable XRCE stream."""
+    if isinstance(qos, dict):
+        return qos['reliability'] == 'reliable'
+    return qos == 'default'
+
+
+def qos_depth(qos):
+    """The explicit history depth of `qos`, 0 for presets and rmw defaults."""
+    return (qos.get('depth') or 0) if isinstance(qos, dict) else 0
+
+
+def qos_profile_c(var, profile):
+    """C definition of a static rmw_qos_profile_t `var` for `profile`."""
+    lines = [
+        f"static const rmw_qos_profile_t {var} = {{",
+        f"    .history     = {HISTORY[profile['history']]},",
+        f"    .depth       = {profile['depth'] or 'RMW_QOS_POLICY_DEPTH_SYSTEM_DEFAULT'},",
+        f"    .reliability = {RELIABILITY[profile['reliability']]},",
+        f"    .durability  = {DURABILITY[profile['durability']]},",
+    ]
+    if profile['deadline_ms'] is not None:
+        ns = round(profile['deadline_ms'] * 1e6)
+        lines.append(f"    .deadline    = {{ .sec = {ns // 10**9}, .nsec = {ns % 10**9} }},")
+    lines.append("};")
+    return "\n".join(lines)
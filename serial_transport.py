@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Serial transport settings for CUSTOM mode projects.
+
+uros_components/serial_utils is the ESP-IDF component implementing the
+micro-ROS custom transport over a UART or the USB Serial/JTAG controller;
+its Kconfig declares the CONFIG_MICROROS_* options. This module turns a
+project's serial settings into values for those options, sizing the ring
+buffers from the XRCE MTU and stream history, and writes them into the
+project's sdkconfig.
+"""
+from locking import write_if_changed
+
+SERIAL_INTERFACES = ('uart', 'usb_jtag')
+
+SERIAL_DEFAULTS = {
+    'interface':    'uart',
+    'port':         0,
+    'baudrate':     1000000,
+    'pins':         {'tx': -1, 'rx': -1, 'rts': -1, 'cts': -1},
+    'flow_control': False,
+    'rx_buffer':    None,  # sized from the MTU when None
+    'tx_buffer':    None,
+}
+
+# UCLIENT_CUSTOM_TRANSPORT_MTU of the micro-ROS build
+CUSTOM_TRANSPORT_MTU = 512
+
+# XRCE stream framing: a begin flag, then two addresses, a 16-bit length, the
+# payload and a 16-bit CRC, any of which may be escaped into two bytes.
+FRAME_FLAG   = 1
+FRAME_FIELDS = 4
+FRAME_CRC    = 2
+
+# Kconfig ranges of serial_utils
+MIN_BAUDRATE    = 1200
+MIN_RING_BUFFER = 256
+MAX_RING_BUFFER = 65536
+
+
+def framed_size(mtu):
+    """Worst-case bytes on the line for one `mtu` sized XRCE message."""
+    return FRAME_FLAG + 2 * (FRAME_FIELDS + mtu + FRAME_CRC)
+
+
+def ring_buffer_sizes(mtu, stream_history):
+    """
+    (rx, tx) ring buffer sizes: RX holds a full reliable stream window of
+    framed messages, TX one framed message, both rounded up to powers of two.
+    """
+    def round_up(n):
+        return max(MIN_RING_BUFFER, 1 << (n - 1).bit_length())
+    frame = framed_size(mtu)
+    return round_up(frame * stream_history), round_up(frame)
+
+
+def serial_settings(serial, stream_history, mtu=CUSTOM_TRANSPORT_MTU):
+    """
+    `serial` with defaults filled in and the ring buffers sized. Raises
+    ValueError if a buffer sized for `mtu` and `stream_history` exceeds
+    MAX_RING_BUFFER.
+    """
+    settings = {**SERIAL_DEFAULTS, **(serial or {})}
+    settings['pins'] = {**SERIAL_DEFAULTS['pins'], **settings['pins']}
+    rx, tx = ring_buffer_sizes(mtu, stream_history)
+    for key, size in (('rx_buffer', rx), ('tx_buffer', tx)):
+        if settings[key]:
+            continue
+        if size > MAX_RING_BUFFER:
+            raise ValueError(
+                f"MTU {mtu} with stream history {stream_history} needs a {size} byte "
+                f"{key.replace('_', ' ')}, above the maximum of {MAX_RING_BUFFER}; lower mtu "
+                f"or max_history, or set serial.{key}")
+        settings[key] = size
+    return settings
+
+
+def serial_sdkconfig(settings):
+    """The CONFIG_MICROROS_* values for `settings`; None means "not set"."""
+    usb = settings['interface'] == 'usb_jtag'
+    return {
+        'CONFIG_MICROROS_SERIAL_UART':            None if usb else 'y',
+        'CONFIG_MICROROS_SERIAL_USB_JTAG':        'y' if usb else None,
+        'CONFIG_MICROROS_UART_PORT':              settings['port'],
+        'CONFIG_MICROROS_UART_BAUDRATE':          settings['baudrate'],
+        'CONFIG_MICROROS_UART_TXD':               settings['pins']['tx'],
+        'CONFIG_MICROROS_UART_RXD':               settings['pins']['rx'],
+        'CONFIG_MICROROS_UART_RTS':               settings['pins']['rts'],
+        'CONFIG_MICROROS_UART_CTS':               settings['pins']['cts'],
+        'CONFIG_MICROROS_UART_HW_FLOWCTRL':       'y' if settings['flow_control'] else None,
+        'CONFIG_MICROROS_SERIAL_RX_BUFFER_SIZE':  settings['rx_buffer'],
+        'CONFIG_MICROROS_SERIAL_TX_BUFFER_SIZE':  settings['tx_buffer'],
+    }
+
+
+def check_serial_settings(settings, sdkconfig):
+    """
+    Raise ValueError if `settings` are outside the serial_utils Kconfig
+    ranges or exceed what the sdkconfig's chip supports.
+    """
+    if settings['baudrate'] < MIN_BAUDRATE:
+        raise ValueError(f"baud rate {settings['baudrate']} is below the minimum of {MIN_BAUDRATE}")
+    for key in ('rx_buffer', 'tx_buffer'):
+        if not MIN_RING_BUFFER <= settings[key] <= MAX_RING_BUFFER:
+            raise ValueError(f"{key.replace('_', ' ')} of {settings[key]} bytes is outside "
+                             f"{MIN_RING_BUFFER}..{MAX_RING_BUFFER}")
+    max_baud = int(sdkconfig.get('CONFIG_SOC_UART_BITRATE_MAX', 0))
+    if max_baud and settings['baudrate'] > max_baud:
+        raise ValueError(
+            f"baud rate {settings['baudrate']} exceeds SOC_UART_BITRATE_MAX ({max_baud})")
+    ports = int(sdkconfig.get('CONFIG_SOC_UART_NUM', 0))
+    if ports and settings['port'] >= ports:
+        raise ValueError(f"UART port {settings['port']} doesn't exist (SOC_UART_NUM = {ports})")
+    if settings['interface'] == 'usb_jtag' and sdkconfig.get('CONFIG_SOC_USB_SERIAL_JTAG_SUPPORTED') != 'y':
+        target = sdkconfig.get('CONFIG_IDF_TARGET', 'this target')
+        raise ValueError(f"{target} has no USB Serial/JTAG controller")
+
+
+def read_sdkconfig(path):
+    """The CONFIG_* assignments of an sdkconfig file, as strings."""
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('CONFIG_') and '=' in line:
+                key, value = line.split('=', 1)
+                values[key] = value.strip('"')
+    return values
+
+
+def update_sdkconfig(path, values):
+    """
+    Set each key of `values` in the sdkconfig at `path`, replacing an existing
+    assignment or "is not set" line, or appending it. None unsets a bool.
+    """
+    def render(key, value):
+        return f"# {key} is not set" if value is None else f"{key}={value}"
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    pending = dict(values)
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        for key in list(pending):
+            if stripped.startswith(f"{key}=") or stripped == f"# {key} is not set":
+                lines[i] = render(key, pending.pop(key))
+                break
+    lines += [render(key, value) for key, value in pending.items()]
+    # an sdkconfig with a new mtime makes ESP-IDF rebuild everything
+    write_if_changed(path, "\n".join(lines) + "\n")
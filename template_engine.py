@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Precompiled <||Key||> templates.
+
+A template is split once into literal text and placeholder slots; rendering
+fills the slots from a mapping and joins the pieces. A placeholder without a
+value raises TemplateError naming the template and every missing key, so a
+typo in a template or a mapping never ends up as text in main.c.
+
+Template files (rclc_templet_init.json, the files under uRosTemplet/main)
+are compiled on first use and cached by path, mtime and size, so editing a
+template takes effect on the next render without reloading it every time.
+"""
+import os
+import re
+import json
+from functools import lru_cache
+
+PLACEHOLDER_RE = re.compile(r'<\|\|(.+?)\|\|>')
+
+# path -> ((mtime_ns, size), compiled content)
+_FILE_CACHE = {}
+
+
+class TemplateError(RuntimeError):
+    pass
+
+
+class Template:
+    """One template, compiled into literal parts and (index, key) slots."""
+
+    __slots__ = ('name', 'keys', '_parts', '_slots')
+
+    def __init__(self, text, name="<template>"):
+        # re.split with one group alternates literal, key, literal, ...
+        self._parts = PLACEHOLDER_RE.split(text)
+        self._slots = [(i, self._parts[i]) for i in range(1, len(self._parts), 2)]
+        self.keys   = frozenset(key for _, key in self._slots)
+        self.name   = name
+
+    def missing(self, mapping):
+        """Placeholders of this template that `mapping` has no value for."""
+        return sorted(key for key in self.keys if key not in mapping)
+
+    def render(self, mapping):
+        """The template with every placeholder replaced by str(mapping[key])."""
+        parts = self._parts.copy()
+        try:
+            for i, key in self._slots:
+                value = mapping[key]
+                parts[i] = value if type(value) is str else str(value)
+        except KeyError:
+            raise TemplateError(
+                f"template {self.name}: no value for {', '.join(self.missing(mapping))}") from None
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(text, name="<template>"):
+    """The compiled Template for `text`, shared between calls."""
+    return Template(text, name)
+
+
+def _cached(path, load):
+    st  = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    entry = _FILE_CACHE.get(path)
+    if entry is None or entry[0] != key:
+        entry = _FILE_CACHE[path] = (key, load(path))
+    return entry[1]
+
+
+def load_template_file(path):
+    """The compiled template in the file at `path`."""
+    def load(p):
+        with open(p, 'r') as f:
+            return Template(f.read(), os.path.basename(p))
+    return _cached(path, load)
+
+
+def load_template_set(path):
+    """A JSON object of named templates at `path`, compiled: name -> Template."""
+    def load(p):
+        with open(p, 'r') as f:
+            return {name: Template(text, name) for name, text in json.load(f).items()}
+    return _cached(path, load)
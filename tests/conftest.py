@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def graph():
+    """A small interface graph in the layout generate_interface_graph.py writes."""
+    return {
+        'std_msgs': {
+            'msg': {
+                'Header': {'stamp': {'type': 'builtin_interfaces/Time', 'array': False},
+                           'frame_id': {'type': 'string', 'array': False}},
+                'Bool':   {'data': {'type': 'bool', 'array': False}},
+            },
+        },
+        'geometry_msgs': {
+            'msg': {
+                'Point': {'x': {'type': 'float64', 'array': False},
+                          'y': {'type': 'float64', 'array': False},
+                          'z': {'type': 'float64', 'array': False}},
+                'Polygon': {'points': {'type': 'geometry_msgs/msg/Point', 'array': True}},
+            },
+        },
+        'demo_msgs': {
+            'msg': {
+                'Bounded': {'flag': {'type': 'uint8', 'array': False},
+                            'name': {'type': 'string', 'array': False, 'max_length': 4},
+                            'values': {'type': 'float64', 'array': True, 'max_size': 3}},
+                'Tree': {'label': {'type': 'string', 'array': False},
+                         'children': {'type': 'demo_msgs/msg/Tree', 'array': True}},
+                'Imu': {'seq': {'type': 'uint32', 'array': False}},
+            },
+            'srv': {
+                'Trigger': {'request': {},
+                            'response': {'success': {'type': 'bool', 'array': False},
+                                         'message': {'type': 'string', 'array': False}}},
+            },
+        },
+        'sensor_msgs': {
+            'msg': {
+                'Imu': {'header': {'type': 'std_msgs/msg/Header', 'array': False}},
+            },
+        },
+    }
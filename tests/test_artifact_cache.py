@@ -0,0 +1,143 @@
+import os
+import json
+import threading
+
+import pytest
+
+from artifact_cache import (
+    ENTRY_FILES, ENTRY_METADATA, LocalStore, SharedStore, is_built, restore_artifacts,
+    sync_artifacts,
+)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def built(tmp_path):
+    """A component directory holding a build's artifacts."""
+    comp = tmp_path / 'built'
+    write(str(comp / 'libmicroros.a'), 'new lib')
+    write(str(comp / 'include' / 'rcl' / 'rcl.h'), 'new header')
+    write(str(comp / 'esp32_toolchain.cmake'), 'toolchain')
+    return str(comp)
+
+
+def test_entries_skip_puts_in_progress(tmp_path, built):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=0)
+    os.makedirs(store.root)
+    # a concurrent put has written its metadata but not renamed its entry yet
+    write(os.path.join(store.root, '.tmp-host-1-k', ENTRY_METADATA), json.dumps({'size': 1}))
+    assert store.entries() == []
+    store.evict()
+    assert os.path.isdir(os.path.join(store.root, '.tmp-host-1-k'))
+
+
+def test_restore_replaces_stale_artifacts(tmp_path, built):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=1 << 20)
+    os.makedirs(store.root)
+    store.put('k', built, {})
+    comp = str(tmp_path / 'stale')
+    write(os.path.join(comp, 'libmicroros.a'), 'old lib')
+    write(os.path.join(comp, 'include', 'old.h'), 'old header')
+    restore_artifacts(store.get('k'), comp)
+    assert read(os.path.join(comp, 'libmicroros.a')) == 'new lib'
+    assert os.listdir(os.path.join(comp, 'include')) == ['rcl']
+    assert is_built(comp)
+    assert not [n for n in os.listdir(comp) if n.startswith('.artifacts')]
+
+
+def test_failed_restore_is_reported(tmp_path, built, capsys):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=1 << 20)
+    os.makedirs(store.root)
+    store.put('k', built, {})
+    os.remove(os.path.join(store.get('k'), 'libmicroros.a'))
+    comp = str(tmp_path / 'project')
+    os.makedirs(comp)
+    assert sync_artifacts([store], 'k', comp, {}) is None
+    assert "Warning: restoring k from the local cache failed" in capsys.readouterr().out
+
+
+def age(store, key, mtime):
+    os.utime(os.path.join(store.root, key, ENTRY_METADATA), (mtime, mtime))
+
+
+def keys(store):
+    return sorted(key for _, _, key in store.entries())
+
+
+def test_eviction_drops_least_recently_used_first(tmp_path, built):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=1 << 20)
+    os.makedirs(store.root)
+    for key, mtime in (('a', 100), ('b', 300), ('c', 200)):
+        store.put(key, built, {})
+        age(store, key, mtime)
+    entry_size = store.entries()[0][1]
+    assert entry_size == len('new lib') + len('new header') + len('toolchain')
+    store.max_bytes = 2 * entry_size
+    store.evict()
+    assert keys(store) == ['b', 'c']
+    store.max_bytes = entry_size
+    store.evict()
+    assert keys(store) == ['b']
+
+
+def test_get_marks_an_entry_as_used(tmp_path, built):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=1 << 20)
+    os.makedirs(store.root)
+    for key, mtime in (('a', 100), ('b', 200)):
+        store.put(key, built, {})
+        age(store, key, mtime)
+    assert store.get('a') == os.path.join(store.root, 'a', ENTRY_FILES)
+    assert store.get('missing') is None
+    store.max_bytes = 2 * store.entries()[0][1]
+    store.put('c', built, {})  # over the bound: b is now the oldest
+    assert keys(store) == ['a', 'c']
+
+
+def test_put_of_an_existing_key_keeps_the_entry(tmp_path, built):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=1 << 20)
+    os.makedirs(store.root)
+    store.put('k', built, {'first': True})
+    store.put('k', built, {'first': False})
+    with open(os.path.join(store.root, 'k', ENTRY_METADATA)) as f:
+        assert json.load(f)['first'] is True
+    assert [n for n in os.listdir(store.root) if n.startswith('.tmp')] == []
+
+
+def test_eviction_waits_for_the_store_lock(tmp_path, built):
+    store = LocalStore(str(tmp_path / 'store'), max_bytes=0)
+    os.makedirs(store.root)
+    store.put('k', built, {})  # evicted right away: nothing fits in 0 bytes
+    assert keys(store) == []
+    store.max_bytes = 1 << 20
+    store.put('k', built, {})
+    store.max_bytes = 0
+    done = threading.Event()
+    with store.guard():  # a restore copying out of the store
+        worker = threading.Thread(target=lambda: (store.evict(), done.set()))
+        worker.start()
+        assert not done.wait(0.2)
+        assert keys(store) == ['k']
+    worker.join(5)
+    assert done.is_set() and keys(store) == []
+
+
+def test_shared_store_evicts_through_trash(tmp_path, built):
+    store = SharedStore(str(tmp_path / 'shared'), max_bytes=1 << 20)
+    os.makedirs(store.root)
+    for key, mtime in (('old', 100), ('new', 200)):
+        store.put(key, built, {})
+        age(store, key, mtime)
+    store.max_bytes = store.entries()[0][1]
+    store.evict()
+    assert keys(store) == ['new']
+    assert os.listdir(store.root) == ['new']
@@ -0,0 +1,80 @@
+import os
+import json
+
+import pytest
+
+pytest.importorskip('git')  # main.py checks out the base component with GitPython
+import main
+from variant_store import METADATA_FILE, read_variant_metadata
+
+
+def details(**counts):
+    d = {'mode': main.UDP, 'publisher_count': 1, 'subscriber_count': 1, 'service_count': 0,
+         'client_count': 0, 'max_history': 4, 'max_timers': 0, 'callback_groups': []}
+    d.update(counts)
+    return d
+
+
+CONFIG = {'ROS_DISTRO': 'humble', 'ROS_DISTRO_BASE_COMMIT': 'abc123', 'ARTIFACT_CACHE': False}
+
+
+def key(**counts):
+    return main.generate_component_code(main.component_params(CONFIG, details(**counts)))
+
+
+def test_keys_separate_counts_that_used_to_concatenate():
+    # "1" + "12" and "11" + "2" once made the same key
+    assert key(publisher_count=1, subscriber_count=12) != \
+        key(publisher_count=11, subscriber_count=2)
+    assert key(max_timers=1) != key(max_timers=2)
+    assert key() == key()
+
+
+def test_key_is_canonical_over_parameter_order():
+    params = main.component_params(CONFIG, details())
+    reordered = dict(reversed(list(params.items())))
+    assert main.generate_component_code(reordered) == main.generate_component_code(params)
+    other = main.component_params({**CONFIG, 'ROS_DISTRO_BASE_COMMIT': 'def456'}, details())
+    assert main.generate_component_code(other) != main.generate_component_code(params)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A generator working directory with a base component and a template."""
+    monkeypatch.chdir(tmp_path)
+    base = tmp_path / 'base'
+    base.mkdir()
+    meta = {'names': {main.RMW_PACKAGE: {'cmake-args': []},
+                      main.CLIENT_PACKAGE: {'cmake-args': []}}}
+    (base / 'colcon.meta').write_text(json.dumps(meta))
+    (base / 'CMakeLists.txt').write_text('project(x)\n')
+    os.makedirs(main.TEMPLATE_PATH)
+    with open(os.path.join(main.TEMPLATE_PATH, 'sdkconfig'), 'w') as f:
+        f.write('CONFIG_IDF_TARGET="esp32"\n')
+    return str(base)
+
+
+def test_variant_metadata_records_the_key_parameters(workdir):
+    dest, code = main.prepare_component(dict(CONFIG), workdir, details())
+    variant_root = os.path.dirname(dest)
+    meta = read_variant_metadata(variant_root)
+    assert meta['key'] == code
+    assert meta['params'] == main.component_params(CONFIG, details())
+    with open(os.path.join(dest, 'colcon.meta')) as f:
+        assert meta['colcon_meta_sha256'] == main.hashlib.sha256(f.read().encode()).hexdigest()
+    # the same parameters reuse the variant
+    assert main.prepare_component(dict(CONFIG), workdir, details()) == (dest, code)
+    with open('.gitignore') as f:
+        assert f.read().splitlines().count(f"{os.path.relpath(dest)}/") == 1
+
+
+def test_variant_whose_metadata_disagrees_with_its_key_is_refused(workdir):
+    dest, _ = main.prepare_component(dict(CONFIG), workdir, details())
+    path = os.path.join(os.path.dirname(dest), METADATA_FILE)
+    with open(path) as f:
+        meta = json.load(f)
+    meta['params']['publishers'] = 99  # a colliding or tampered entry
+    with open(path, 'w') as f:
+        json.dump(meta, f)
+    with pytest.raises(RuntimeError, match="doesn't match its key"):
+        main.prepare_component(dict(CONFIG), workdir, details())
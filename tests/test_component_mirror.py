@@ -0,0 +1,98 @@
+import os
+import subprocess
+
+import pytest
+
+git = pytest.importorskip('git')  # GitPython, as in component_mirror
+from component_mirror import (
+    MANIFEST_FILE, blob_id, checkout_path, ensure_checkout, verify_checkout,
+)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    """A micro_ros_espidf_component stand-in with one commit on its humble branch."""
+    for var in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(var, 'test')
+    for var in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(var, 'test@example.com')
+    path = str(tmp_path / 'upstream')
+    repo = git.Repo.init(path)
+    repo.git.symbolic_ref('HEAD', 'refs/heads/humble')
+    write(os.path.join(path, 'colcon.meta'), '{"names": {}}\n')
+    write(os.path.join(path, 'src', 'lib.c'), 'int x;\n')
+    write(os.path.join(path, '.github', 'ci.yml'), 'on: push\n')
+    repo.git.add('-A')
+    repo.git.commit('-m', 'first')
+    return repo
+
+
+def commit_change(repo, rel, text):
+    write(os.path.join(repo.working_tree_dir, rel), text)
+    repo.git.add('-A')
+    repo.git.commit('-m', f'change {rel}')
+    return repo.head.commit.hexsha
+
+
+def test_blob_id_matches_git(tmp_path):
+    path = tmp_path / 'f'
+    path.write_bytes(b'hello\n')
+    expected = subprocess.run(['git', 'hash-object', str(path)], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    assert blob_id(b'hello\n') == expected
+
+
+def test_checkout_of_the_branch_head(tmp_path, upstream):
+    components = str(tmp_path / 'uros_components')
+    dest, commit = ensure_checkout(components, upstream.working_tree_dir, 'humble')
+    assert commit == upstream.head.commit.hexsha
+    assert dest == checkout_path(components, 'humble', commit)
+    assert read(os.path.join(dest, 'src', 'lib.c')) == 'int x;\n'
+    assert not os.path.exists(os.path.join(dest, '.github'))
+    assert not os.path.exists(os.path.join(dest, '.git'))
+    assert verify_checkout(dest, commit) == []
+    assert verify_checkout(dest, '0' * 40) is None  # a manifest for another commit
+
+
+def test_pinned_revision_survives_upstream_moving_on(tmp_path, upstream):
+    components = str(tmp_path / 'uros_components')
+    _, pinned = ensure_checkout(components, upstream.working_tree_dir, 'humble')
+    head = commit_change(upstream, 'src/lib.c', 'int y;\n')
+    dest, commit = ensure_checkout(components, upstream.working_tree_dir, 'humble', pinned=pinned)
+    assert commit == pinned
+    assert read(os.path.join(dest, 'src', 'lib.c')) == 'int x;\n'
+    # a pin the mirror lacks is fetched; offline, from the mirror only
+    _, commit = ensure_checkout(components, upstream.working_tree_dir, 'humble', pinned=head)
+    assert commit == head
+    _, commit = ensure_checkout(components, '/nonexistent', 'humble', offline=True)
+    assert commit == head
+    with pytest.raises(RuntimeError, match="not in the mirror"):
+        ensure_checkout(components, '/nonexistent', 'humble', pinned='1' * 40, offline=True)
+
+
+def test_modified_checkout_is_detected_and_exported_again(tmp_path, upstream, capsys):
+    components = str(tmp_path / 'uros_components')
+    dest, commit = ensure_checkout(components, upstream.working_tree_dir, 'humble')
+    lib = os.path.join(dest, 'src', 'lib.c')
+    # a new mtime alone is rehashed and accepted
+    st = os.stat(lib)
+    os.utime(lib, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert verify_checkout(dest, commit) == []
+    write(lib, 'int z;\n')  # same size, different blob
+    assert verify_checkout(dest, commit) == ['src/lib.c']
+    again, _ = ensure_checkout(components, '/nonexistent', 'humble', pinned=commit, offline=True)
+    assert again == dest
+    assert "was modified (src/lib.c)" in capsys.readouterr().out
+    assert read(lib) == 'int x;\n'
+    assert os.path.exists(os.path.join(dest, MANIFEST_FILE))
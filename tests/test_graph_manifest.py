@@ -0,0 +1,86 @@
+import os
+
+from generate_interface_graph import (
+    is_up_to_date, load_manifest, save_manifest, update_interfaces, write_graph,
+)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def generate(share, output):
+    """One run of generate_interface_graph.py; returns its update stats."""
+    graph, records, stats = update_interfaces([share], output, jobs=1)
+    write_graph(graph, output)
+    save_manifest(output, [os.path.abspath(share)], records)
+    return graph, stats
+
+
+def make_tree(tmp_path):
+    share = str(tmp_path / 'share')
+    write(os.path.join(share, 'pkg_a', 'msg', 'Foo.msg'), "int32 x\n")
+    write(os.path.join(share, 'pkg_b', 'msg', 'Bar.msg'), "pkg_a/Foo foo\n")
+    write(os.path.join(share, 'pkg_c', 'msg', 'Baz.msg'), "string s\n")
+    return share, str(tmp_path / 'graph.json')
+
+
+def test_unchanged_sources_hit_the_manifest(tmp_path):
+    share, output = make_tree(tmp_path)
+    graph, stats = generate(share, output)
+    assert stats['reparsed'] == 3
+    assert graph['pkg_b']['msg']['Bar']['foo']['type'] == 'pkg_a/msg/Foo'
+    assert is_up_to_date([share], output)
+    again, stats = generate(share, output)
+    assert stats == {'reparsed': 0, 'changed_packages': [], 'manifest_stale': False}
+    assert again == graph
+
+
+def test_touched_file_is_hashed_but_not_reparsed(tmp_path):
+    share, output = make_tree(tmp_path)
+    generate(share, output)
+    path = os.path.join(share, 'pkg_a', 'msg', 'Foo.msg')
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert is_up_to_date([share], output)
+    _, stats = generate(share, output)
+    assert stats == {'reparsed': 0, 'changed_packages': [], 'manifest_stale': True}
+
+
+def test_changed_message_reparses_its_package_and_users(tmp_path):
+    share, output = make_tree(tmp_path)
+    generate(share, output)
+    path = os.path.join(share, 'pkg_a', 'msg', 'Foo.msg')
+    st = os.stat(path)
+    write(path, "int64 x\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert not is_up_to_date([share], output)
+    graph, stats = generate(share, output)
+    # pkg_b names Foo and is relinked; pkg_c is reused as it was
+    assert stats['changed_packages'] == ['pkg_a'] and stats['reparsed'] == 2
+    assert graph['pkg_a']['msg']['Foo']['x']['type'] == 'int64'
+
+
+def test_added_and_removed_files_are_changes(tmp_path):
+    share, output = make_tree(tmp_path)
+    generate(share, output)
+    write(os.path.join(share, 'pkg_d', 'msg', 'New.msg'), "bool b\n")
+    os.remove(os.path.join(share, 'pkg_c', 'msg', 'Baz.msg'))
+    graph, stats = generate(share, output)
+    assert stats['changed_packages'] == ['pkg_c', 'pkg_d'] and stats['reparsed'] == 1
+    assert 'New' in graph['pkg_d']['msg'] and 'pkg_c' not in graph
+
+
+def test_manifest_for_other_roots_or_graph_is_ignored(tmp_path):
+    share, output = make_tree(tmp_path)
+    generate(share, output)
+    roots = [os.path.abspath(share)]
+    assert load_manifest(output, roots) is not None
+    assert load_manifest(output, roots + ['/elsewhere']) is None
+    with open(output, 'a') as f:
+        f.write("\n")  # the graph was rewritten behind the manifest's back
+    assert load_manifest(output, roots) is None
+    _, _, stats = update_interfaces([share], output, jobs=1)
+    assert stats['reparsed'] == 3
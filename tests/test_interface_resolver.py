@@ -0,0 +1,63 @@
+from interface_resolver import InterfaceResolver, expand_type, split_type_name
+
+CYCLE = {
+    'pkg': {
+        'msg': {
+            'A': {'b': {'type': 'pkg/msg/B', 'array': False}},
+            'B': {'a': {'type': 'pkg/msg/A', 'array': True},
+                  'x': {'type': 'int32', 'array': False}},
+        },
+    },
+}
+
+
+def assert_cut_only_on_cycles(tree, path):
+    """Every field marked recursive names a type on its own path from the root."""
+    for entry in tree.values():
+        if entry.get('recursive'):
+            assert entry['type'] in path
+        elif 'fields' in entry:
+            assert_cut_only_on_cycles(entry['fields'], path + (entry['type'],))
+
+
+def test_split_type_name():
+    assert split_type_name('pkg/msg/A') == ('pkg', 'msg', 'A')
+    assert split_type_name('int32') is None
+
+
+def test_expand_cuts_cycles_where_they_close():
+    tree = expand_type(CYCLE, 'pkg/msg/A')
+    b = tree['b']['fields']
+    assert b['a']['recursive'] and 'fields' not in b['a']
+    assert b['x'] == {'type': 'int32', 'array': False}
+
+
+def test_memo_after_a_cycle_starts_from_the_requested_type():
+    resolver = InterfaceResolver(CYCLE)
+    resolver.expand('pkg/msg/A')
+    # B was expanded inside A with its recursion cut at A, which is no cycle from B
+    b = resolver.expand('pkg/msg/B')
+    assert 'fields' in b['a']
+    assert_cut_only_on_cycles(b, ('pkg/msg/B',))
+    assert_cut_only_on_cycles(resolver.expand('pkg/msg/A'), ('pkg/msg/A',))
+
+
+def test_memo_is_shared_for_acyclic_and_self_recursive_types(graph):
+    resolver = InterfaceResolver(graph)
+    polygon = resolver.expand('geometry_msgs/msg/Polygon')
+    assert polygon['points']['fields'] is resolver.expand('geometry_msgs/msg/Point')
+    tree = resolver.expand('demo_msgs/msg/Tree')
+    assert tree['children']['recursive']
+    assert_cut_only_on_cycles(tree, ('demo_msgs/msg/Tree',))
+    assert resolver.expand('demo_msgs/msg/Tree') is tree
+
+
+def test_depth_limit_and_services(graph):
+    resolver = InterfaceResolver(graph)
+    shallow = resolver.expand('sensor_msgs/msg/Imu', max_depth=0)
+    assert 'fields' not in shallow['header']
+    full = resolver.expand('sensor_msgs/msg/Imu')
+    # builtin_interfaces/Time is not in the graph, so it stays a leaf
+    assert 'fields' not in full['header']['fields']['stamp']
+    assert resolver.expand('demo_msgs/srv/Trigger')['request'] == {}
+    assert resolver.expand('demo_msgs/msg/Missing') is None
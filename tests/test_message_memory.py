@@ -0,0 +1,50 @@
+from interface_resolver import InterfaceResolver
+from message_memory import MessageMemory
+
+
+def memory(graph, capacities=None):
+    return MessageMemory(InterfaceResolver(graph), capacities)
+
+
+def test_fixed_size_message_needs_nothing(graph):
+    mem = memory(graph)
+    assert not mem.add('point_msg', graph['geometry_msgs']['msg']['Point'])
+    assert mem.declarations == [] and mem.init_calls == [] and mem.buffers == []
+
+
+def test_unbounded_fields_use_default_capacities(graph):
+    mem = memory(graph)
+    assert mem.add('poly_msg', graph['geometry_msgs']['msg']['Polygon'])
+    assert mem.buffers == [('geometry_msgs/msg/Point', 8)]
+    assert "static geometry_msgs__msg__Point poly_msg_points_buffer[8];" in mem.declarations
+    assert mem.init_calls == ["    poly_msg_init_memory();"]
+
+
+def test_bounded_fields_never_exceed_their_bound(graph):
+    mem = memory(graph, {"sequence": 16, "string": 64})
+    mem.add('b_msg', graph['demo_msgs']['msg']['Bounded'])
+    # max_length 4 -> 4 characters and the NUL; max_size 3
+    assert sorted(mem.buffers) == [('float64', 3), ('uint8', 5)]
+    mem = memory(graph, {"sequence": 2, "string": 2})
+    mem.add('b_msg', graph['demo_msgs']['msg']['Bounded'])
+    assert sorted(mem.buffers) == [('float64', 2), ('uint8', 3)]
+
+
+def test_nested_strings_get_one_buffer_per_element(graph):
+    mem = memory(graph, {"sequence": 4, "string": 10})
+    mem.add('tree_msg', graph['demo_msgs']['msg']['Tree'])
+    body = mem.declarations[-1]
+    assert ('uint8', 11) in mem.buffers
+    assert ('demo_msgs/msg/Tree', 4) in mem.buffers
+    # the children's labels, one per sequence slot; recursion stops at Tree itself
+    assert ('uint8', 4 * 11) in mem.buffers
+    assert "tree_msg.children.data[i0].label.data = tree_msg_children_label_buffer[i0];" in body
+
+
+def test_field_overrides_match_paths_without_indices(graph):
+    capacities = {"fields": {"tree_msg.children": 2, "tree_msg.children.label": 6}}
+    mem = memory(graph, capacities)
+    mem.add('tree_msg', graph['demo_msgs']['msg']['Tree'])
+    assert ('demo_msgs/msg/Tree', 2) in mem.buffers
+    assert ('uint8', 2 * 7) in mem.buffers
+    assert ('uint8', 33) in mem.buffers  # tree_msg.label keeps the default
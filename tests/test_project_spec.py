@@ -0,0 +1,51 @@
+import pytest
+
+from project_spec import SpecError, callback_group, spec_to_project
+
+
+def spec(**entities):
+    return {'project_name': 'node', **entities}
+
+
+def test_entity_names_must_be_c_identifiers(graph):
+    for bad in ('cmd-vel', 'cmd vel', '1cmd', ''):
+        with pytest.raises(SpecError, match=r"publishers\[0\]: name .* is not a C identifier"):
+            spec_to_project(spec(publishers=[{'name': bad, 'type': 'std_msgs/msg/Bool'}]), graph)
+    with pytest.raises(SpecError, match=r"timers\[0\]"):
+        spec_to_project(spec(timers=[{'name': 'tick tock', 'rate_hz': 1}]), graph)
+
+
+def test_entity_names_are_unique_across_kinds(graph):
+    clash = spec(publishers=[{'name': 'cmd', 'type': 'std_msgs/msg/Bool'}],
+                 subscriptions=[{'name': 'cmd', 'type': 'std_msgs/msg/Bool'}])
+    with pytest.raises(SpecError, match=r"subscriptions\[0\]: name 'cmd' is already used by "
+                                        r"publishers\[0\]"):
+        spec_to_project(clash, graph)
+    clash = spec(services=[{'name': 'reset', 'type': 'Trigger'}],
+                 timers=[{'name': 'reset', 'rate_hz': 1}])
+    with pytest.raises(SpecError, match=r"timers\[0\]"):
+        spec_to_project(clash, graph)
+
+
+def test_valid_names_pass(graph):
+    _, pubs, subs, _, _, tmrs = spec_to_project(
+        spec(publishers=[{'name': 'cmd_out', 'type': 'Bool'}],
+             subscriptions=[{'name': 'cmd_in', 'type': 'std_msgs/Bool'}],
+             timers=[{'name': '_tick', 'rate_hz': 2}]), graph)
+    assert pubs == [('cmd_out', 'std_msgs/msg/Bool', 'default', None)]
+    assert subs == [('cmd_in', 'std_msgs/msg/Bool', 'default')]
+    assert tmrs == [('_tick', 2.0)]
+
+
+def test_callback_group_checks():
+    groups = [callback_group({'name': 'sensors', 'core': 0}, 'g', [])]
+    assert groups[0] == {'name': 'sensors', 'members': [], 'core': 0, 'priority': 5,
+                         'stack': 16000}
+    for ent, message in (({'name': 'app'}, "not a usable group name"),
+                         ({'name': 'my-group'}, "not a usable group name"),
+                         ({'name': 'SENSORS'}, "duplicate group"),
+                         ({'name': 'x', 'core': 2}, "core must be 0 or 1"),
+                         ({'name': 'x', 'priority': -1}, "priority must be"),
+                         ({'name': 'x', 'stack': True}, "stack must be")):
+        with pytest.raises(SpecError, match=message):
+            callback_group(ent, 'g', groups)
@@ -0,0 +1,40 @@
+from type_index import TypeIndex
+
+
+def test_resolve_forms(graph):
+    index = TypeIndex(graph)
+    assert 'geometry_msgs/msg/Point' in index
+    assert index.resolve('geometry_msgs/msg/Point', 'msg') == 'geometry_msgs/msg/Point'
+    assert index.resolve('geometry_msgs/Point', 'msg') == 'geometry_msgs/msg/Point'
+    assert index.resolve('point', 'msg') == 'geometry_msgs/msg/Point'
+    assert index.resolve('Trigger', 'srv') == 'demo_msgs/srv/Trigger'
+
+
+def test_resolve_rejects_wrong_kind_and_unknown(graph):
+    index = TypeIndex(graph)
+    assert index.resolve('demo_msgs/srv/Trigger', 'msg') is None
+    assert index.resolve('Point', 'srv') is None
+    assert index.resolve('Pointy', 'msg') is None
+
+
+def test_resolve_ambiguous_bare_name(graph):
+    index = TypeIndex(graph)
+    # two packages define Imu: only the qualified forms name one type
+    assert index.resolve('Imu', 'msg') is None
+    assert index.resolve('sensor_msgs/Imu', 'msg') == 'sensor_msgs/msg/Imu'
+    assert index.resolve('demo_msgs/Imu', 'msg') == 'demo_msgs/msg/Imu'
+
+
+def test_search_ranks_exact_then_prefix_then_fuzzy(graph):
+    index = TypeIndex(graph)
+    assert set(index.search('imu', 'msg')[:2]) == {'sensor_msgs/msg/Imu', 'demo_msgs/msg/Imu'}
+    assert index.search('poi', 'msg')[0] == 'geometry_msgs/msg/Point'
+    assert index.search('polygn', 'msg')[0] == 'geometry_msgs/msg/Polygon'
+    assert index.search('  ', 'msg') == []
+
+
+def test_complete_and_for_graph(graph):
+    index = TypeIndex.for_graph(graph)
+    assert TypeIndex.for_graph(graph) is index
+    assert index.complete('geometry_msgs/msg/P', 'msg') == \
+        ['geometry_msgs/msg/Point', 'geometry_msgs/msg/Polygon']
@@ -0,0 +1,50 @@
+from user_regions import FileState, extract_regions, generated_hash, merge_regions
+
+RENDERED = """#include "a.h"
+void cmd_callback(void) {
+    // USER CODE BEGIN cmd_callback
+    // TODO
+    // USER CODE END cmd_callback
+}
+"""
+
+
+def test_extract_regions():
+    assert extract_regions(RENDERED) == {'cmd_callback': "    // TODO\n"}
+
+
+def test_merge_keeps_user_code():
+    text, kept, orphaned = merge_regions(RENDERED, {'cmd_callback': "    set_led(1);\n"})
+    assert "set_led(1);" in text and "// TODO" not in text
+    assert kept == ['cmd_callback'] and orphaned == []
+
+
+def test_merge_orphans_removed_entities_and_restores_them():
+    regions = {'cmd_callback': "    a();\n", 'old_callback': "    b();\n"}
+    text, _, orphaned = merge_regions(RENDERED, regions)
+    assert orphaned == ['old_callback']
+    assert "#if 0" in text and "b();" in text
+    # the entity comes back: its code returns to its place, out of the #if 0 block
+    rendered = RENDERED + ("void old_callback(void) {\n    // USER CODE BEGIN old_callback\n"
+                           "    // USER CODE END old_callback\n}\n")
+    again, kept, orphaned = merge_regions(rendered, extract_regions(text))
+    assert sorted(kept) == ['cmd_callback', 'old_callback'] and orphaned == []
+    assert "#if 0" not in again
+
+
+def test_generated_hash_ignores_region_bodies():
+    edited = RENDERED.replace("// TODO", "x = 1;")
+    assert generated_hash(edited) == generated_hash(RENDERED)
+    assert generated_hash(edited.replace('"a.h"', '"b.h"')) != generated_hash(RENDERED)
+
+
+def test_file_state_edits(tmp_path):
+    state = FileState(str(tmp_path))
+    # nothing recorded: treated as edited, since it may predate regions
+    assert state.edited('main.c', RENDERED) and not state.tracked('main.c')
+    state.record('main.c', RENDERED)
+    state.save()
+    state = FileState(str(tmp_path))
+    assert state.tracked('main.c')
+    assert not state.edited('main.c', RENDERED.replace("// TODO", "x = 1;"))
+    assert state.edited('main.c', RENDERED + "int hand_written;\n")
@@ -0,0 +1,71 @@
+import os
+
+from variant_store import (
+    COMPONENT_DIR, collect_garbage, live_references, materialize_variant, record_reference,
+)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def make_variant(components, code):
+    variant_root = os.path.join(components, code)
+    write(os.path.join(variant_root, COMPONENT_DIR, 'colcon.meta'), '{}')
+    return variant_root
+
+
+def link_project(tmp_path, name, variant_root):
+    """A project whose component symlink points at `variant_root`, as main.py makes it."""
+    project = str(tmp_path / name)
+    os.makedirs(os.path.join(project, 'components'))
+    os.symlink(os.path.join(variant_root, COMPONENT_DIR),
+               os.path.join(project, 'components', COMPONENT_DIR))
+    record_reference(variant_root, project)
+    return project
+
+
+def test_variant_shares_files_but_owns_colcon_meta(tmp_path):
+    base = str(tmp_path / 'base')
+    write(os.path.join(base, 'colcon.meta'), '{"names": {}}')
+    write(os.path.join(base, 'src', 'lib.c'), 'int x;')
+    dest = str(tmp_path / 'variant')
+    assert materialize_variant(base, dest, modes=('hardlink', 'copy')) == 'hardlink'
+    assert os.path.samefile(os.path.join(base, 'src', 'lib.c'), os.path.join(dest, 'src', 'lib.c'))
+    assert not os.path.samefile(os.path.join(base, 'colcon.meta'),
+                                os.path.join(dest, 'colcon.meta'))
+
+
+def test_gc_keeps_referenced_variants(tmp_path):
+    components = str(tmp_path / 'uros_components')
+    used = make_variant(components, 'used')
+    unused = make_variant(components, 'unused')
+    legacy = make_variant(components, 'legacy')  # from before refs/ existed
+    make_variant(components, 'base')
+    link_project(tmp_path, 'app', used)
+    # moved to another variant since: its reference to `unused` is stale
+    moved = link_project(tmp_path, 'moved', unused)
+    os.unlink(os.path.join(moved, 'components', COMPONENT_DIR))
+    os.symlink(os.path.join(used, COMPONENT_DIR), os.path.join(moved, 'components', COMPONENT_DIR))
+    record_reference(used, moved)
+
+    assert collect_garbage(components, dry_run=True) == ['unused']
+    assert os.path.isdir(unused)
+    assert collect_garbage(components) == ['unused']
+    assert not os.path.exists(unused)
+    assert os.path.isdir(used) and os.path.isdir(legacy)
+    assert os.path.isdir(os.path.join(components, 'base'))
+    assert sorted(live_references(used)) == [str(tmp_path / 'app'), moved]
+
+
+def test_gc_drops_references_of_deleted_projects(tmp_path):
+    components = str(tmp_path / 'uros_components')
+    variant = make_variant(components, 'v')
+    project = link_project(tmp_path, 'gone', variant)
+    assert collect_garbage(components) == []
+    os.unlink(os.path.join(project, 'components', COMPONENT_DIR))
+    assert live_references(variant, prune=False) == []
+    assert os.listdir(os.path.join(variant, 'refs'))  # kept without pruning
+    assert collect_garbage(components) == ['v']
@@ -0,0 +1,81 @@
+from interface_resolver import InterfaceResolver
+from project_spec import MODES
+from wire_budget import CdrSizer, format_budget, verdict, wire_budget, xrce_messages
+
+
+def test_bounded_fields_are_capped_by_their_bound(graph):
+    sizer = CdrSizer(InterfaceResolver(graph))
+    # uint8 | pad, length, 4 chars + NUL | pad, length, pad, 3 float64
+    assert sizer.sizes('demo_msgs/msg/Bounded', 'b_msg') == (48, 32)
+
+
+def test_unbounded_sequences_use_capacities(graph):
+    sizer = CdrSizer(InterfaceResolver(graph), {"sequence": 4})
+    # length, then Points aligned to 8: 4 + 4 + 4 * 24
+    assert sizer.sizes('geometry_msgs/msg/Polygon', 'poly_msg') == (104, 56)
+    sizer = CdrSizer(InterfaceResolver(graph), {"fields": {"poly_msg.points": 1}})
+    assert sizer.sizes('geometry_msgs/msg/Polygon', 'poly_msg') == (32, 32)
+
+
+def test_nested_header_with_external_time(graph):
+    sizer = CdrSizer(InterfaceResolver(graph))
+    # Time (8) | length, 32 chars + NUL at worst, 16 + NUL typically
+    assert sizer.sizes('sensor_msgs/msg/Imu', 'imu_msg') == (45, 29)
+    assert sizer.unknown == set()
+
+
+def test_service_sections_and_unknown_types(graph):
+    sizer = CdrSizer(InterfaceResolver(graph))
+    assert sizer.sizes('demo_msgs/srv/Trigger', 't_request', 'request') == (1, 1)
+    assert sizer.sizes('demo_msgs/srv/Trigger', 't_response', 'response') == (41, 25)
+    assert sizer.sizes('demo_msgs/msg/Missing', 'm_msg') == (0, 0)
+    assert sizer.unknown == {'demo_msgs/msg/Missing'}
+
+
+def test_xrce_fragmentation():
+    assert xrce_messages(100, 512, True, 4) == [112]
+    assert xrce_messages(900, 512, True, 4) == [512, 412]
+    assert xrce_messages(900, 512, False, 4) is None
+    assert xrce_messages(900, 512, True, 1) is None
+
+
+def test_zero_capacity_link_is_overloaded(graph):
+    details = {'mode': MODES['custom'], 'serial': {'baudrate': 0}}
+    pubs = [('imu', 'sensor_msgs/msg/Imu', 'default', 10.0)]
+    report = wire_budget(details, pubs, [], [], [], graph, 4)
+    assert report['capacity_bps'] == 0
+    assert report['utilization'] == {'worst_bps': None, 'typical_bps': None}
+    assert verdict(report) == 'overloaded'
+    assert "no capacity" in format_budget(report)
+    # nothing to carry fits any link
+    report = wire_budget(details, [], [], [], [], graph, 4)
+    assert verdict(report) == 'sustained'
+
+
+def test_publisher_load_against_the_link(graph):
+    details = {'mode': MODES['udp']}
+    pubs = [('imu', 'sensor_msgs/msg/Imu', 'best_effort', 10.0),
+            ('tick', 'std_msgs/msg/Bool', 'default', None)]
+    clis = [('trigger', 'demo_msgs/srv/Trigger', 'default', None)]
+    report = wire_budget(details, pubs, [], [], clis, graph, 4, poll_rate=100)
+    imu, tick = report['entities'][:2]
+    # 12 bytes of XRCE headers and 28 of IPv4 + UDP per datagram
+    assert imu['worst_bps'] == (45 + 12 + 28) * 10
+    assert tick['rate_hz'] == 100 and tick['worst_bps'] == (1 + 12 + 28) * 100
+    request, response = report['entities'][2:]
+    assert (request['kind'], response['kind']) == ('client request', 'client response')
+    # an empty request, and a response carrying the request's sample identity
+    assert request['worst_bps'] == (1 + 12 + 28) * 100
+    assert response['worst_bps'] == (41 + 24 + 12 + 28) * 100
+    assert report['total']['worst_bps'] == sum(r['worst_bps'] for r in report['entities'])
+    assert verdict(report) == 'sustained'
+    assert verdict(report, max_utilization=0.0) == 'overloaded'
+
+
+def test_client_rates_under_timer_scheduling(graph):
+    details = {'mode': MODES['udp'], 'scheduling': 'timer'}
+    clis = [('trigger', 'demo_msgs/srv/Trigger', 'default', 0.5)]
+    report = wire_budget(details, [], [], [], clis, graph, 4)
+    assert [r['rate_hz'] for r in report['entities']] == [0.5, 0.5]
+    assert report['total']['worst_bps'] == ((1 + 12 + 28) + (41 + 24 + 12 + 28)) * 0.5
+    assert report['poll_rate_hz'] is None
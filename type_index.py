@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Name index over the interface graph's types, for picking and checking them.
+
+Built once at startup from the package and type names (a lazy graph's field trees are
+never decoded), it answers:
+
+    "sensor_msgs/msg/Imu" in index          exact canonical name, O(1)
+    index.resolve("sensor_msgs/Imu", "msg") short forms -> canonical name
+    index.search("imu", "msg")              ranked type-ahead matches
+
+search ranks exact matches first, then prefixes of the type name, then
+prefixes of the full name (both by binary search over sorted names), then
+fuzzy matches by the share of the query's trigrams a name contains, so
+typos and substrings ("laserscn", "pose_stamp") still find their type.
+"""
+from bisect import bisect_left
+
+KINDS = ('msg', 'srv', 'action')
+
+
+def trigrams(text):
+    text = f"  {text.lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TypeIndex:
+    """Canonical "pkg/kind/Name" names of an interface graph, indexed for lookup."""
+
+    _last = (None, None)  # (graph, index) of the latest for_graph call
+
+    def __init__(self, interface_graph):
+        self._names  = []   # canonical names; position = id
+        self._ids    = {}   # canonical name -> id
+        self._short  = {}   # (kind, "pkg/Name" or "Name", lowercase) -> ids
+        self._kind   = []   # id -> kind
+        self._sorted = {}   # kind -> sorted [(key, id)], keys: "name" and "pkg/kind/name"
+        self._grams  = {}   # trigram of "pkg/name" -> ids
+        for pkg in interface_graph:
+            kinds = interface_graph[pkg]
+            for kind in KINDS:
+                for name in kinds.get(kind, ()):
+                    self._add(pkg, kind, name)
+        for keys in self._sorted.values():
+            keys.sort()
+
+    @classmethod
+    def for_graph(cls, interface_graph):
+        """The index of `interface_graph`, built once for repeated calls with one graph."""
+        graph, index = cls._last
+        if graph is not interface_graph:
+            index = cls(interface_graph)
+            cls._last = (interface_graph, index)
+        return index
+
+    def _add(self, pkg, kind, name):
+        full = f"{pkg}/{kind}/{name}"
+        tid  = len(self._names)
+        self._names.append(full)
+        self._ids[full] = tid
+        self._kind.append(kind)
+        for short in (f"{pkg}/{name}", name):
+            self._short.setdefault((kind, short.lower()), []).append(tid)
+        keys = self._sorted.setdefault(kind, [])
+        keys.append((name.lower(), tid))
+        keys.append((full.lower(), tid))
+        for gram in trigrams(f"{pkg}/{name}"):
+            self._grams.setdefault(gram, []).append(tid)
+
+    def __contains__(self, type_name):
+        return type_name in self._ids
+
+    def __len__(self):
+        return len(self._names)
+
+    def packages(self, kind):
+        """Packages that define at least one type of `kind`."""
+        return sorted({name.split('/')[0] for name, k in zip(self._names, self._kind) if k == kind})
+
+    def resolve(self, type_name, kind):
+        """
+        The canonical name for `type_name` given as "pkg/kind/Name",
+        "pkg/Name" or a bare "Name" that only one package defines (case
+        insensitive); None if it doesn't name exactly one type of `kind`.
+        """
+        if type_name in self._ids:
+            return type_name if self._kind[self._ids[type_name]] == kind else None
+        ids = self._short.get((kind, type_name.lower()), [])
+        return self._names[ids[0]] if len(ids) == 1 else None
+
+    def search(self, query, kind, limit=10):
+        """Up to `limit` canonical names of `kind` matching `query`, best first."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        ranked, seen = [], set()
+
+        def take(ids):
+            for tid in ids:
+                if tid not in seen and self._kind[tid] == kind:
+                    seen.add(tid)
+                    ranked.append(tid)
+
+        take(self._short.get((kind, query), []))
+        keys = self._sorted.get(kind, [])
+        i = bisect_left(keys, (query, -1))
+        prefixed = []
+        while i < len(keys) and keys[i][0].startswith(query) and len(prefixed) < 4 * limit:
+            prefixed.append(keys[i])
+            i += 1
+        # type-name prefixes before full-name prefixes, shorter names first
+        prefixed.sort(key=lambda k: ('/' in k[0], len(k[0]), k[0]))
+        take(tid for _, tid in prefixed)
+        if len(ranked) < limit and len(query) >= 2:
+            take(self._fuzzy(query, kind, limit - len(ranked)))
+        return [self._names[tid] for tid in ranked[:limit]]
+
+    def _fuzzy(self, query, kind, limit):
+        grams = trigrams(query)
+        scores = {}
+        for gram in grams:
+            for tid in self._grams.get(gram, ()):
+                scores[tid] = scores.get(tid, 0) + 1
+        # at least half the query's trigrams, best share first, then shorter names
+        floor = max(1, len(grams) // 2)
+        best = sorted((tid for tid, n in scores.items() if n >= floor and self._kind[tid] == kind),
+                      key=lambda tid: (-scores[tid], len(self._names[tid]), self._names[tid]))
+        return best[:limit]
+
+    def complete(self, prefix, kind, limit=50):
+        """Canonical names of `kind` starting with `prefix`, for tab completion."""
+        keys = self._sorted.get(kind, [])
+        prefix = prefix.lower()
+        i = bisect_left(keys, (prefix, -1))
+        found = []
+        while i < len(keys) and keys[i][0].startswith(prefix) and len(found) < limit:
+            if '/' in keys[i][0]:
+                found.append(self._names[keys[i][1]])
+            i += 1
+        return found
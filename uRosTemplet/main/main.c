@@ -20,13 +20,16 @@
 
 <||Headers||>
 
+// USER CODE BEGIN includes
+// USER CODE END includes
+
 #ifdef CONFIG_MICRO_ROS_ESP_XRCE_DDS_MIDDLEWARE
     #include <rmw_microros/rmw_microros.h>
 #endif
 #if defined(RMW_UXRCE_TRANSPORT_CUSTOM)
     #include <rmw_microxrcedds_c/config.h>
     #include "esp32_serial_transport.h"
-    static uart_port_t uart_port = UART_NUM_0;
+    static uart_port_t uart_port = CONFIG_MICROROS_UART_PORT;
 #endif
 
 /* Error-checking macros for micro-ROS calls */
@@ -44,6 +47,9 @@
 
 <||Variables||>
 
+// USER CODE BEGIN globals
+// USER CODE END globals
+
 <||Callbacks||>
 
 void micro_ros_task(void * arg) {
@@ -72,15 +78,10 @@ void micro_ros_task(void * arg) {
 <||InitializingThings||>
 
     rclc_executor_t executor;
-    RCCHECK(rclc_executor_init(&executor, &support.context, 1, &allocator));
+    RCCHECK(rclc_executor_init(&executor, &support.context, <||ExecutorHandles||>, &allocator));
 <||AddCallbacks||>
 
-    while (1) {        
-        /* Process any incoming micro-ROS messages */
-        rclc_executor_spin_some(&executor, RCL_MS_TO_NS(10));
-        vTaskDelay(pdMS_TO_TICKS(10));
-<||ExamplePublish||>
-    }
+<||SpinLoop||>
 
 }
 
@@ -101,15 +102,16 @@ void app_main(void)
         #error micro-ROS transports misconfigured
     #endif  
 
-    // Create micro-ROS task pinned to core 1
-    xTaskCreate(
+<||Tasks||>
+
+    // Create micro-ROS task pinned to CONFIG_MICRO_ROS_APP_CORE
+    xTaskCreatePinnedToCore(
         micro_ros_task,                    // Task function.
         "uros_task",                       // Name of the task.
         CONFIG_MICRO_ROS_APP_STACK,        // Stack size.
         NULL,                              // Parameter.
         CONFIG_MICRO_ROS_APP_TASK_PRIO,    // Priority.
-        NULL                               // Task handle (not used).
+        NULL,                              // Task handle (not used).
+        CONFIG_MICRO_ROS_APP_CORE          // Core.
     );
-
-<||Tasks||>
 }
\ No newline at end of file
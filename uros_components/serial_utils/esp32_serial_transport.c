@@ -6,17 +6,62 @@
 #define UART_CTS  (CONFIG_MICROROS_UART_CTS)
 
 // --- micro-ROS Transports ---
-#define UART_BUFFER_SIZE (512)
+// Ring buffers hold several XRCE frames (MTU plus framing), see Kconfig
+#define RX_BUFFER_SIZE (CONFIG_MICROROS_SERIAL_RX_BUFFER_SIZE)
+#define TX_BUFFER_SIZE (CONFIG_MICROROS_SERIAL_TX_BUFFER_SIZE)
+#define WRITE_TIMEOUT  (pdMS_TO_TICKS(CONFIG_MICROROS_SERIAL_WRITE_TIMEOUT_MS))
+
+#define MIN(a, b) ((a) < (b) ? (a) : (b))
+
+// XRCE passes its timeout in ms; never turn a short wait into a busy poll
+static TickType_t timeout_ticks(int timeout)
+{
+    TickType_t ticks = pdMS_TO_TICKS(timeout);
+    return (timeout > 0 && ticks == 0) ? 1 : ticks;
+}
+
+#if defined(CONFIG_MICROROS_SERIAL_USB_JTAG)
 
 bool esp32_serial_open(struct uxrCustomTransport * transport){
-    size_t * uart_port = (size_t*) transport->args;
+    usb_serial_jtag_driver_config_t usb_config = {
+        .rx_buffer_size = RX_BUFFER_SIZE,
+        .tx_buffer_size = TX_BUFFER_SIZE,
+    };
+
+    return usb_serial_jtag_driver_install(&usb_config) == ESP_OK;
+}
+
+bool esp32_serial_close(struct uxrCustomTransport * transport){
+    return usb_serial_jtag_driver_uninstall() == ESP_OK;
+}
+
+size_t esp32_serial_write(struct uxrCustomTransport* transport, const uint8_t * buf, size_t len, uint8_t * err){
+    const int txBytes = usb_serial_jtag_write_bytes(buf, len, WRITE_TIMEOUT);
+    return txBytes > 0 ? txBytes : 0;
+}
+
+size_t esp32_serial_read(struct uxrCustomTransport* transport, uint8_t* buf, size_t len, int timeout, uint8_t* err){
+    // returns as soon as any data is available
+    const int rxBytes = usb_serial_jtag_read_bytes(buf, len, timeout_ticks(timeout));
+    return rxBytes > 0 ? rxBytes : 0;
+}
+
+#else
+
+bool esp32_serial_open(struct uxrCustomTransport * transport){
+    uart_port_t * uart_port = (uart_port_t*) transport->args;
 
     uart_config_t uart_config = {
-        .baud_rate = 1000000,//115200
+        .baud_rate = CONFIG_MICROROS_UART_BAUDRATE,
         .data_bits = UART_DATA_8_BITS,
         .parity    = UART_PARITY_DISABLE,
         .stop_bits = UART_STOP_BITS_1,
+#if defined(CONFIG_MICROROS_UART_HW_FLOWCTRL)
+        .flow_ctrl = UART_HW_FLOWCTRL_CTS_RTS,
+        .rx_flow_ctrl_thresh = SOC_UART_FIFO_LEN - 8,
+#else
         .flow_ctrl = UART_HW_FLOWCTRL_DISABLE,
+#endif
     };
 
     if (uart_param_config(*uart_port, &uart_config) == ESP_FAIL) {
@@ -25,7 +70,8 @@ bool esp32_serial_open(struct uxrCustomTransport * transport){
     if (uart_set_pin(*uart_port, UART_TXD, UART_RXD, UART_RTS, UART_CTS) == ESP_FAIL) {
         return false;
     }
-    if (uart_driver_install(*uart_port, UART_BUFFER_SIZE * 2, 0, 0, NULL, 0) == ESP_FAIL) {
+    // A TX ring buffer lets writes return while the FIFO drains in the ISR
+    if (uart_driver_install(*uart_port, RX_BUFFER_SIZE, TX_BUFFER_SIZE, 0, NULL, 0) == ESP_FAIL) {
         return false;
     }
 
@@ -33,19 +79,35 @@ bool esp32_serial_open(struct uxrCustomTransport * transport){
 }
 
 bool esp32_serial_close(struct uxrCustomTransport * transport){
-    size_t * uart_port = (size_t*) transport->args;
+    uart_port_t * uart_port = (uart_port_t*) transport->args;
 
     return uart_driver_delete(*uart_port) == ESP_OK;
 }
 
 size_t esp32_serial_write(struct uxrCustomTransport* transport, const uint8_t * buf, size_t len, uint8_t * err){
-    size_t * uart_port = (size_t*) transport->args;
+    uart_port_t * uart_port = (uart_port_t*) transport->args;
     const int txBytes = uart_write_bytes(*uart_port, (const char*) buf, len);
-    return txBytes;
+    return txBytes > 0 ? txBytes : 0;
 }
 
 size_t esp32_serial_read(struct uxrCustomTransport* transport, uint8_t* buf, size_t len, int timeout, uint8_t* err){
-    size_t * uart_port = (size_t*) transport->args;
-    const int rxBytes = uart_read_bytes(*uart_port, buf, len, timeout / portTICK_PERIOD_MS);
-    return rxBytes;
-}
\ No newline at end of file
+    uart_port_t * uart_port = (uart_port_t*) transport->args;
+
+    // Wait up to `timeout` for the first byte only, then hand over whatever
+    // is buffered: waiting for all `len` bytes would stall every frame
+    // shorter than the request until the timeout expires.
+    size_t available = 0;
+    uart_get_buffered_data_len(*uart_port, &available);
+    if (available == 0) {
+        if (uart_read_bytes(*uart_port, buf, 1, timeout_ticks(timeout)) <= 0) {
+            return 0;
+        }
+        uart_get_buffered_data_len(*uart_port, &available);
+        const int rxBytes = uart_read_bytes(*uart_port, buf + 1, MIN(available, len - 1), 0);
+        return 1 + (rxBytes > 0 ? rxBytes : 0);
+    }
+    const int rxBytes = uart_read_bytes(*uart_port, buf, MIN(available, len), 0);
+    return rxBytes > 0 ? rxBytes : 0;
+}
+
+#endif
@@ -18,6 +18,10 @@
 #include <uxr/client/transport.h>
 #include <driver/uart.h>
 #include <driver/gpio.h>
+#include "sdkconfig.h"
+#if defined(CONFIG_MICROROS_SERIAL_USB_JTAG)
+#include <driver/usb_serial_jtag.h>
+#endif
 
 #ifdef __cplusplus
 extern "C"
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+User code regions of generated files, kept when a project is regenerated.
+
+Callback bodies and other places meant for hand-written code are wrapped in
+
+    // USER CODE BEGIN imu_callback
+    ...
+    // USER CODE END imu_callback
+
+On regeneration the body of every region in the existing file replaces the
+body of the region with the same name in the new rendering. Regions whose
+entity is gone are not dropped: they are appended in an `#if 0` block at the
+end of the file, and come back into place if the entity returns.
+
+Everything outside regions belongs to the generator. FileState records a
+hash of each generated file with region bodies blanked, so hand edits
+outside regions are noticed and the old file is saved before it is
+overwritten. A file without a recorded hash, such as one generated before
+regions existed, is saved the same way.
+"""
+import os
+import re
+import json
+import hashlib
+
+from locking import write_if_changed
+
+REGION_RE = re.compile(
+    r'^([ \t]*)// USER CODE BEGIN (\S+)[ \t]*\n(.*?)^[ \t]*// USER CODE END \2[ \t]*$',
+    re.M | re.S)
+
+ORPHANS_BEGIN = "/* Regions of entities that are no longer in the spec */\n#if 0\n"
+ORPHANS_END   = "#endif /* orphaned regions */\n"
+
+STATE_FILE = '.uros_generated.json'
+
+
+def extract_regions(text):
+    """name -> body of every region in `text`."""
+    return {m.group(2): m.group(3) for m in REGION_RE.finditer(text)}
+
+
+def merge_regions(rendered, regions):
+    """
+    `rendered` with the body of each region taken from `regions` where it
+    has one. Returns (text, names of kept regions, names of orphaned ones).
+    """
+    kept = []
+
+    def keep(m):
+        indent, name, body = m.groups()
+        if name not in regions:
+            return m.group(0)
+        kept.append(name)
+        return f"{indent}// USER CODE BEGIN {name}\n{regions[name]}{indent}// USER CODE END {name}"
+
+    text = REGION_RE.sub(keep, rendered)
+    orphaned = sorted(set(regions) - set(extract_regions(rendered)))
+    if orphaned:
+        if not text.endswith("\n"):
+            text += "\n"
+        text += "\n" + ORPHANS_BEGIN + "".join(
+            f"// USER CODE BEGIN {name}\n{regions[name]}// USER CODE END {name}\n"
+            for name in orphaned) + ORPHANS_END
+    return text, kept, orphaned
+
+
+def generated_hash(text):
+    """Hash of `text` with region bodies and orphaned regions left out."""
+    if ORPHANS_BEGIN in text:
+        text = text[:text.index(ORPHANS_BEGIN)].rstrip("\n") + "\n"
+    blanked = REGION_RE.sub(lambda m: f"{m.group(1)}// USER CODE {m.group(2)}", text)
+    return hashlib.sha256(blanked.encode()).hexdigest()
+
+
+class FileState:
+    """Hashes of the files last generated into a project, in STATE_FILE."""
+
+    def __init__(self, project_path):
+        self.path = os.path.join(project_path, STATE_FILE)
+        try:
+            with open(self.path) as f:
+                self.hashes = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.hashes = {}
+
+    def tracked(self, name):
+        """True if `name` was generated with its hash recorded."""
+        return name in self.hashes
+
+    def edited(self, name, text):
+        """
+        True if `text` differs from what was generated as `name` outside its
+        regions, or if nothing was recorded for `name`: a file from before
+        user code regions may hold hand-written code anywhere.
+        """
+        return self.hashes.get(name) != generated_hash(text)
+
+    def record(self, name, text):
+        self.hashes[name] = generated_hash(text)
+
+    def save(self):
+        write_if_changed(self.path, json.dumps(self.hashes, indent=4, sort_keys=True) + "\n")
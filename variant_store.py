@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Deduplicated storage for micro-ROS component variants.
+
+Variants only differ from the base micro_ros_espidf_component in their
+colcon.meta, so instead of a full copy each variant is a tree of reflinks
+(copy-on-write clones) or, where the filesystem can't clone, hardlinks to
+the base files. Only the files listed in PRIVATE_FILES are real copies;
+build outputs are created inside the variant as usual. Hardlinked files are
+shared with the base and must not be edited in place.
+
+Each variant directory carries a uros_variant.json with the parameters its
+cache key was derived from. Every project linked to a variant leaves a
+reference file in <variant>/refs/, which collect_garbage uses to drop
+unused variants.
+"""
+import os
+import json
+import shutil
+import hashlib
+import datetime
+
+from locking import file_lock
+
+PRIVATE_FILES = ('colcon.meta',)
+REFS_DIR      = 'refs'
+METADATA_FILE = 'uros_variant.json'
+COMPONENT_DIR = 'micro_ros_espidf_component'
+
+# Reserved directories under uros_components/ that are not variants
+RESERVED = ('base', 'mirror', 'serial_utils')
+
+FICLONE = 0x40049409  # linux/fs.h
+
+
+def variant_lock_path(components_dir, comp_code):
+    return os.path.join(components_dir, f".{comp_code}.lock")
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def link_file(src, dst, modes):
+    """
+    Materialize `dst` from `src` with the first of `modes` that works. Modes
+    that fail are dropped from the list so the rest of the tree skips them.
+    """
+    while True:
+        mode = modes[0]
+        try:
+            if mode == 'reflink':
+                _reflink(src, dst)
+            elif mode == 'hardlink':
+                os.link(src, dst)
+            else:
+                shutil.copy2(src, dst)
+            return
+        except (OSError, ImportError):
+            if mode == 'copy':
+                raise
+            if os.path.lexists(dst):
+                os.unlink(dst)
+            modes.pop(0)
+
+
+def materialize_variant(base_dest, dest, modes=('reflink', 'hardlink', 'copy')):
+    """
+    Build `dest` as a deduplicated clone of `base_dest`. Returns the link mode
+    that ended up being used for shared files.
+    """
+    modes = list(modes)
+    for dirpath, dirnames, filenames in os.walk(base_dest):
+        rel = os.path.relpath(dirpath, base_dest)
+        out_dir = os.path.normpath(os.path.join(dest, rel))
+        os.makedirs(out_dir, exist_ok=True)
+        for name in dirnames + filenames:
+            src = os.path.join(dirpath, name)
+            dst = os.path.join(out_dir, name)
+            if os.path.islink(src):
+                # os.walk doesn't descend into symlinked directories
+                os.symlink(os.readlink(src), dst)
+            elif name in filenames:
+                if os.path.normpath(os.path.join(rel, name)) in PRIVATE_FILES:
+                    shutil.copy2(src, dst)
+                else:
+                    link_file(src, dst, modes)
+    return modes[0]
+
+
+def write_variant_metadata(variant_root, comp_code, params, colcon_meta):
+    """Record what the variant under `variant_root` was built for."""
+    os.makedirs(variant_root, exist_ok=True)
+    metadata = {
+        'key':                comp_code,
+        'params':             params,
+        'colcon_meta_sha256': hashlib.sha256(colcon_meta.encode()).hexdigest(),
+        'created':            datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    with open(os.path.join(variant_root, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=4)
+
+
+def read_variant_metadata(variant_root):
+    """The variant's metadata, or None if it has none or it is unreadable."""
+    try:
+        with open(os.path.join(variant_root, METADATA_FILE)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def record_reference(variant_root, project_path):
+    """Note that `project_path` links to the variant under `variant_root`."""
+    project_path = os.path.abspath(project_path)
+    refs = os.path.join(variant_root, REFS_DIR)
+    os.makedirs(refs, exist_ok=True)
+    ref = hashlib.sha1(project_path.encode()).hexdigest()
+    with open(os.path.join(refs, ref), 'w') as f:
+        f.write(project_path)
+
+
+def live_references(variant_root, prune=True):
+    """Projects that still link to the variant; stale reference files are pruned."""
+    refs = os.path.join(variant_root, REFS_DIR)
+    target = os.path.realpath(os.path.join(variant_root, COMPONENT_DIR))
+    live = []
+    for ref in os.listdir(refs):
+        ref_path = os.path.join(refs, ref)
+        with open(ref_path) as f:
+            project_path = f.read().strip()
+        link = os.path.join(project_path, 'components', COMPONENT_DIR)
+        if os.path.islink(link) and os.path.realpath(link) == target:
+            live.append(project_path)
+        elif prune:
+            os.unlink(ref_path)
+    return live
+
+
+def collect_garbage(components_dir, dry_run=False):
+    """
+    Remove variants no project references anymore and return their codes.
+    Variants created before reference tracking (no refs/ directory) are kept.
+    """
+    removed = []
+    for comp_code in sorted(os.listdir(components_dir)):
+        variant_root = os.path.join(components_dir, comp_code)
+        if (comp_code in RESERVED or comp_code.startswith('.')
+                or not os.path.isdir(os.path.join(variant_root, REFS_DIR))):
+            continue
+        with file_lock(variant_lock_path(components_dir, comp_code)):
+            if live_references(variant_root, prune=not dry_run):
+                continue
+            if not dry_run:
+                shutil.rmtree(variant_root)
+        removed.append(comp_code)
+    return removed
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Serialized message sizes of a node and the link bandwidth they need.
+
+From the field types in the interface graph, CdrSizer computes the XRCE-CDR
+size of each message the node sends or receives, with micro-CDR alignment
+(primitives aligned to their size, at most 8), 4-byte lengths before
+strings and sequences, and NUL-terminated strings:
+
+    worst    strings and sequences filled to their bound, or to the
+             message_memory capacity the static buffers have (nothing
+             larger can be published from them)
+    typical  strings and sequences half full
+
+Each message becomes an XRCE WRITE_DATA submessage. One that doesn't fit
+the MTU is split into FRAGMENT messages on reliable streams, as many as the
+stream has slots (stream_history); best-effort streams can't fragment, so
+such a message is never sent. On top come the UDP/IPv4 headers per
+datagram, or the serial framing per message (the worst case with every
+byte escaped). Publisher and client rates come from the spec (`scheduling:
+timer`); poll scheduling publishes and sends requests once per main loop
+iteration, at most POLL_RATE_HZ. A client's responses come at its request
+rate.
+
+    python3 wire_budget.py --spec specs/imu.yaml
+
+Heartbeats and acknacks of reliable streams and the agent's traffic towards
+the node, other than responses to its clients, are not counted.
+"""
+import sys
+import json
+import math
+import argparse
+
+from memory_footprint import PRIMITIVE_SIZES
+from message_memory import DEFAULT_CAPACITIES
+from interface_resolver import InterfaceResolver, canonical_type_name, split_type_name
+from qos_profiles import is_reliable
+from serial_transport import (CUSTOM_TRANSPORT_MTU, SERIAL_DEFAULTS, FRAME_FLAG, FRAME_FIELDS,
+                              FRAME_CRC, framed_size)
+from interface_graph import load_interface_graph
+from project_spec import MODES, SpecError, load_spec, spec_to_project, stream_history
+
+CDR_MAX_ALIGN = 8
+CDR_LENGTH    = 4  # uint32 length of strings and sequences
+CDR_CHAR_SIZE = {'string': 1, 'wstring': 4}
+
+TYPICAL_FILL = 0.5
+
+# Fields of types referenced by the graph but not defined in it
+EXTERNAL_FIELDS = {
+    'builtin_interfaces/msg/Time':     {'sec': {'type': 'int32'}, 'nanosec': {'type': 'uint32'}},
+    'builtin_interfaces/msg/Duration': {'sec': {'type': 'int32'}, 'nanosec': {'type': 'uint32'}},
+}
+
+# XRCE message header (session id without client key, stream id, sequence
+# number), submessage header and the object id + request id of WRITE_DATA
+XRCE_MESSAGE_HEADER    = 4
+XRCE_SUBMESSAGE_HEADER = 4
+XRCE_OBJECT_REQUEST    = 4
+# replies carry the sample identity of their request
+XRCE_SAMPLE_IDENTITY   = 24
+
+UDP_IP_HEADERS     = 28  # IPv4 + UDP, per datagram
+SERIAL_FRAME_MIN   = FRAME_FLAG + FRAME_FIELDS + FRAME_CRC  # nothing escaped
+UART_BITS_PER_BYTE = 10  # 8N1: start + 8 data + stop
+
+# Sustained throughput assumed for links without a baudrate, in kbit/s;
+# --link-kbps overrides these and the UART baudrate
+LINK_KBPS = {
+    'udp':      10000,  # ESP32 Wi-Fi station, well below the PHY rate
+    'usb_jtag': 4000,   # USB Serial/JTAG bulk endpoint
+}
+
+TRANSPORT_NAMES = {'udp': 'UDP', 'custom': 'serial'}
+
+# The poll loop waits 10 ms per iteration (see spin_poll)
+POLL_RATE_HZ = 100
+
+
+class CdrSizer:
+    """
+    XRCE-CDR serialized sizes from the interface graph. `capacities` are the
+    spec's message_memory capacities; fields are addressed by the message
+    variable name as in MessageMemory ("imu_msg.header.frame_id").
+    """
+
+    def __init__(self, resolver, capacities=None):
+        self._resolver   = resolver
+        self._capacities = {**DEFAULT_CAPACITIES, **(capacities or {})}
+        self._memo       = {}
+        self.unknown     = set()
+
+    def sizes(self, type_name, var, section=None):
+        """(worst, typical) serialized bytes of `var`, a `type_name` message or service section."""
+        block = self._block(type_name)
+        if block is not None and section is not None:
+            block = block[section]
+        if block is None:
+            return 0, 0
+        return tuple(self._block_end(block, 0, var, fill, (type_name,))
+                     for fill in (1.0, TYPICAL_FILL))
+
+    def _block(self, type_name):
+        type_name = canonical_type_name(type_name)
+        if type_name in EXTERNAL_FIELDS:
+            return EXTERNAL_FIELDS[type_name]
+        block = self._resolver.lookup(type_name) if split_type_name(type_name) else None
+        if block is None:
+            self.unknown.add(type_name)
+        return block
+
+    def _count(self, path, kind, bound, fill):
+        cap = self._capacities['fields'].get(path, self._capacities[kind])
+        cap = min(cap, bound) if bound else cap
+        return math.ceil(cap * fill)
+
+    def _block_end(self, block, offset, path, fill, stack):
+        """Offset after serializing `block` from `offset`."""
+        if not block:
+            return offset + 1  # structure_needs_at_least_one_member
+        for field, entry in block.items():
+            offset = self._field_end(entry, offset, f"{path}.{field}", fill, stack)
+        return offset
+
+    def _field_end(self, entry, offset, path, fill, stack):
+        type_name = entry['type']
+        if 'fixed_size' in entry:
+            count = entry['fixed_size']
+        elif entry.get('array'):
+            offset = _align(offset, CDR_LENGTH) + CDR_LENGTH
+            count = self._count(path, 'sequence', entry.get('max_size'), fill)
+        else:
+            count = 1
+        if type_name in PRIMITIVE_SIZES:
+            size = PRIMITIVE_SIZES[type_name]
+            return _align(offset, size) + count * size if count else offset
+        for _ in range(count):
+            offset = self._element_end(type_name, entry.get('max_length'), offset, path,
+                                       fill, stack)
+        return offset
+
+    def _element_end(self, type_name, max_length, offset, path, fill, stack):
+        if type_name in CDR_CHAR_SIZE:
+            chars = self._count(path, 'string', max_length, fill)
+            if type_name == 'string':
+                chars += 1  # NUL
+            return _align(offset, CDR_LENGTH) + CDR_LENGTH + chars * CDR_CHAR_SIZE[type_name]
+        canonical = canonical_type_name(type_name)
+        if canonical in stack:
+            return offset  # a recursive type's nested sequences are counted empty
+        key = (canonical, offset % CDR_MAX_ALIGN, path, fill)
+        if key not in self._memo:
+            block = self._block(type_name)
+            if block is None:
+                return offset
+            start = offset % CDR_MAX_ALIGN
+            self._memo[key] = self._block_end(block, start, path, fill,
+                                              stack + (canonical,)) - start
+        return offset + self._memo[key]
+
+
+def _align(offset, size):
+    size = min(size, CDR_MAX_ALIGN)
+    return (offset + size - 1) // size * size
+
+
+def xrce_messages(payload, mtu, reliable, slots, extra=0):
+    """
+    Sizes of the XRCE messages carrying one `payload` byte sample, or None
+    if it can't be sent: larger than the MTU on a best-effort stream, or
+    needing more fragments than the reliable stream's `slots`.
+    """
+    submessage = XRCE_SUBMESSAGE_HEADER + XRCE_OBJECT_REQUEST + extra + payload
+    if XRCE_MESSAGE_HEADER + submessage <= mtu:
+        return [XRCE_MESSAGE_HEADER + submessage]
+    if not reliable:
+        return None
+    chunk = mtu - XRCE_MESSAGE_HEADER - XRCE_SUBMESSAGE_HEADER
+    count = math.ceil(submessage / chunk)
+    if count > slots:
+        return None
+    last = submessage - (count - 1) * chunk
+    return [mtu] * (count - 1) + [XRCE_MESSAGE_HEADER + XRCE_SUBMESSAGE_HEADER + last]
+
+
+def link_bytes(messages, transport, worst):
+    """Bytes on the link for XRCE `messages`, with UDP headers or serial framing."""
+    if transport == 'udp':
+        return sum(n + UDP_IP_HEADERS for n in messages)
+    if worst:
+        return sum(framed_size(n) for n in messages)
+    return sum(n + SERIAL_FRAME_MIN for n in messages)
+
+
+def link_capacity(details, link_kbps=None):
+    """(description, bytes per second) of the node's link."""
+    if link_kbps:
+        return f"{link_kbps} kbit/s (given)", link_kbps * 1000 / 8
+    if details['mode'] == MODES['udp']:
+        return f"UDP, {LINK_KBPS['udp']} kbit/s assumed", LINK_KBPS['udp'] * 1000 / 8
+    serial = {**SERIAL_DEFAULTS, **(details.get('serial') or {})}
+    if serial['interface'] == 'usb_jtag':
+        return (f"USB Serial/JTAG, {LINK_KBPS['usb_jtag']} kbit/s assumed",
+                LINK_KBPS['usb_jtag'] * 1000 / 8)
+    return f"UART at {serial['baudrate']} baud", serial['baudrate'] / UART_BITS_PER_BYTE
+
+
+def wire_budget(details, pubs, subs, srvs, clis, interface_graph, stream_history,
+                poll_rate=POLL_RATE_HZ, link_kbps=None):
+    """
+    Serialized sizes, fragments and link load of a project's entities.
+    Publishers and clients give bytes per second; subscriptions and services
+    only sizes, since their rates are up to the other side.
+    """
+    sizer     = CdrSizer(InterfaceResolver(interface_graph), details.get('message_memory'))
+    transport = 'udp' if details['mode'] == MODES['udp'] else 'custom'
+    mtu       = details.get('mtu') or CUSTOM_TRANSPORT_MTU
+    link, capacity = link_capacity(details, link_kbps)
+
+    def entry(kind, name, type_name, var, qos, section=None, extra=0, rate=None):
+        worst, typical = sizer.sizes(type_name, var, section)
+        reliable = is_reliable(qos)
+        row = {'kind': kind, 'name': name, 'type': type_name, 'reliable': reliable,
+               'worst': worst, 'typical': typical}
+        messages = xrce_messages(worst, mtu, reliable, stream_history, extra)
+        row['fragments'] = len(messages) if messages else None
+        if rate is not None:
+            row['rate_hz'] = rate
+            typical_messages = xrce_messages(typical, mtu, reliable, stream_history, extra)
+            row['worst_bps'] = (link_bytes(messages, transport, True) * rate
+                                if messages else None)
+            row['typical_bps'] = (link_bytes(typical_messages, transport, False) * rate
+                                  if typical_messages else None)
+        return row
+
+    rows = []
+    for name, typ, qos, rate in pubs:
+        rows.append(entry('publisher', name, typ, f"{name}_msg", qos,
+                          rate=rate if rate is not None else poll_rate))
+    for name, typ, qos in subs:
+        rows.append(entry('subscription', name, typ, f"{name}_msg", qos))
+    for name, typ, qos in srvs:
+        rows.append(entry('service request', name, typ, f"{name}_request", qos, 'request'))
+        rows.append(entry('service response', name, typ, f"{name}_response", qos, 'response',
+                          extra=XRCE_SAMPLE_IDENTITY))
+    for name, typ, qos, rate in clis:
+        rate = rate if rate is not None else poll_rate
+        rows.append(entry('client request', name, typ, f"{name}_request", qos, 'request',
+                          rate=rate))
+        rows.append(entry('client response', name, typ, f"{name}_response", qos, 'response',
+                          extra=XRCE_SAMPLE_IDENTITY, rate=rate))
+
+    rated = [r for r in rows if 'rate_hz' in r]
+    totals = {key: sum(r[key] or 0 for r in rated) for key in ('worst_bps', 'typical_bps')}
+    return {
+        'transport':      transport,
+        'link':           link,
+        'mtu':            mtu,
+        'stream_history': stream_history,
+        'capacity_bps':   capacity,
+        'poll_rate_hz':   None if details.get('scheduling') == 'timer' else poll_rate,
+        'entities':       rows,
+        'total':          totals,
+        'utilization':    {key: _share(value, capacity) for key, value in totals.items()},
+        'unsendable':     [f"{r['kind']} {r['name']}" for r in rows if r['fragments'] is None],
+        'unknown_types':  sorted(sizer.unknown),
+    }
+
+
+def _rate_text(bps):
+    if bps is None:
+        return "-"
+    if bps >= 1000 * 1000:
+        return f"{bps / 1e6:.2f} MB/s"
+    if bps >= 1000:
+        return f"{bps / 1e3:.1f} kB/s"
+    return f"{bps:.0f} B/s"
+
+
+def _share(bps, capacity):
+    """`bps` as a share of the link, None if a load meets a link without capacity."""
+    if not bps:
+        return 0.0
+    return bps / capacity if capacity > 0 else None
+
+
+def _percent(share):
+    return "no capacity" if share is None else f"{100 * share:.0f}%"
+
+
+def verdict(report, max_utilization=1.0):
+    """'sustained', 'typical only' or 'overloaded' for the publishers' and clients' load."""
+    def fits(share):
+        return share is not None and share <= max_utilization
+    if fits(report['utilization']['worst_bps']):
+        return 'sustained'
+    if fits(report['utilization']['typical_bps']):
+        return 'typical only'
+    return 'overloaded'
+
+
+def format_budget(report, max_utilization=1.0):
+    """Human-readable report: one line per entity, then the rated entities' total against the link."""
+    lines = [f"Wire budget ({report['link']}, MTU {report['mtu']}, "
+             f"{report['stream_history']} reliable stream slots):"]
+    width = max([len(f"{r['kind']} {r['name']}") for r in report['entities']] + [5])
+    lines.append(f"  {'':<{width}}  {'worst':>7}  {'typical':>7}  {'frags':>5}  {'rate':>8}"
+                 f"  {'worst load':>11}  {'typical load':>12}")
+    for r in report['entities']:
+        frags = r['fragments'] if r['fragments'] is not None else "drop"
+        rate = f"{r['rate_hz']:g} Hz" if 'rate_hz' in r else "-"
+        lines.append(f"  {r['kind'] + ' ' + r['name']:<{width}}  {r['worst']:>5} B  "
+                     f"{r['typical']:>5} B  {frags:>5}  {rate:>8}"
+                     f"  {_rate_text(r.get('worst_bps')):>11}  {_rate_text(r.get('typical_bps')):>12}")
+    total, util = report['total'], report['utilization']
+    lines.append(f"  publishers and clients: {_rate_text(total['worst_bps'])} worst "
+                 f"({_percent(util['worst_bps'])}), {_rate_text(total['typical_bps'])} typical "
+                 f"({_percent(util['typical_bps'])}) of {_rate_text(report['capacity_bps'])}")
+    if report['poll_rate_hz']:
+        lines.append(f"  poll scheduling: publishers and clients counted at "
+                     f"{report['poll_rate_hz']:g} Hz")
+    status = verdict(report, max_utilization)
+    link = TRANSPORT_NAMES[report['transport']]
+    if status == 'sustained':
+        lines.append(f"  The {link} link sustains the worst-case load.")
+    elif status == 'typical only':
+        lines.append(f"  The {link} link sustains the typical load, "
+                     "but not the worst case.")
+    else:
+        lines.append(f"  The {link} link can't sustain the publishers' and clients' load.")
+    for r in report['entities']:
+        if r['fragments'] is None:
+            why = ("more fragments than the reliable stream's slots" if r['reliable']
+                   else "larger than the MTU on a best-effort stream")
+            lines.append(f"  {r['kind']} {r['name']}: the worst-case message can't be sent ({why})")
+    return "\n".join(lines)
+
+
+def analyze(spec_path, poll_rate=POLL_RATE_HZ, link_kbps=None, interface_graph=None):
+    """wire_budget of the project a spec describes."""
+    spec = load_spec(spec_path)
+    if interface_graph is None:
+        interface_graph = load_interface_graph()
+    details, pubs, subs, srvs, clis, tmrs = spec_to_project(spec, interface_graph)
+    return wire_budget(details, pubs, subs, srvs, clis, interface_graph,
+                       stream_history(details), poll_rate, link_kbps)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serialized message sizes and link bandwidth of a spec's node")
+    parser.add_argument("--spec", required=True, help="Project spec (JSON or YAML)")
+    parser.add_argument("--poll-rate", type=float, default=POLL_RATE_HZ,
+                        help="Publish rate assumed under poll scheduling (Hz)")
+    parser.add_argument("--link-kbps", type=float,
+                        help="Link throughput in kbit/s, instead of the baudrate or the "
+                             "assumed Wi-Fi / USB rate")
+    parser.add_argument("--max-utilization", type=float, default=1.0,
+                        help="Exit non-zero if the worst-case load exceeds this share of the link")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = analyze(args.spec, args.poll_rate, args.link_kbps)
+    except (OSError, SpecError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(format_budget(report, args.max_utilization))
+    if report['unknown_types']:
+        print(f"Warning: {', '.join(report['unknown_types'])} are not in the interface graph")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    failed = report['unsendable'] or verdict(report, args.max_utilization) != 'sustained'
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()